@@ -1,16 +1,23 @@
 import cv2
 import time
-from ultralytics import YOLO
 
-def realtime_hand_detection(model_path="yolo11n_hand_detect.pt", conf_threshold=0.4):
+from hand_renderer import HandRenderer, camera_info_lines, extract_detections
+from model_registry import get_bundle_model, get_model, is_model_bundle
+
+def realtime_hand_detection(model_path="yolo11n_hand_detect.pt", conf_threshold=0.4, latency_budget_ms=None):
     """
     实时手部检测程序（笔记本摄像头）
     按空格键退出
+    model_path 也可以是多分辨率模型包目录（model_bundle.py 生成），此时按 latency_budget_ms 选择输入尺寸
     """
     # 加载模型
     print(f"正在加载模型: {model_path}")
-    model = YOLO(model_path)
+    if is_model_bundle(model_path):
+        model, _ = get_bundle_model(model_path, latency_budget_ms)
+    else:
+        model = get_model(model_path)
     print("模型加载成功！")
+    renderer = HandRenderer(names=model.names, panel_alpha=None)
 
     # 打开摄像头（0通常是内置摄像头）
     cap = cv2.VideoCapture(0)
@@ -40,11 +47,8 @@ def realtime_hand_detection(model_path="yolo11n_hand_detect.pt", conf_threshold=
             results = model(frame, conf=conf_threshold, verbose=False)
 
             # 获取检测结果
-            detections = results[0].boxes
-            num_hands = len(detections)
-
-            # 绘制检测框和信息
-            annotated_frame = results[0].plot()  # 自动绘制框和标签
+            boxes, confidences, classes = extract_detections(results[0])
+            num_hands = len(confidences)
 
             # 计算FPS
             fps_counter += 1
@@ -55,13 +59,9 @@ def realtime_hand_detection(model_path="yolo11n_hand_detect.pt", conf_threshold=
             else:
                 fps = 0
 
-            # 在左上角显示信息
-            cv2.putText(annotated_frame, f"Hands: {num_hands}",
-                       (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
-            cv2.putText(annotated_frame, f"FPS: {fps:.1f}",
-                       (10, 70), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
-            cv2.putText(annotated_frame, "Press SPACE to exit",
-                       (10, 110), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 255), 2)
+            # 绘制检测框和左上角信息（写入复用的输出缓冲区，不再整帧拷贝）
+            annotated_frame = renderer.render(frame, boxes, confidences, classes,
+                                              camera_info_lines(num_hands, fps))
 
             # 显示画面
             cv2.imshow('YOLOv8 Hand Detection - Press SPACE to Exit', annotated_frame)
@@ -89,7 +89,9 @@ if __name__ == "__main__":
     # 配置参数
     # MODEL_PATH = r"D:\Python_Files\Personal_projects\YOLOv8\runs\detect\yolo11n_hand_detect.pt2\weights\last.pt" # 模型路径
     MODEL_PATH = r"D:\Python_Files\Personal_projects\YOLOv8\runs\detect\yolo11n_hand_detect.pt2\weights\best.pt" # 模型路径
+    # MODEL_PATH = "hand_detector_bundle"  # 多分辨率模型包目录
     CONFIDENCE = 0.4  # 置信度阈值（0.2-0.5之间调整）
+    LATENCY_BUDGET_MS = 30  # 使用模型包时每帧 CPU 延迟预算（毫秒）
 
     # 启动实时检测
-    realtime_hand_detection(MODEL_PATH, CONFIDENCE)
+    realtime_hand_detection(MODEL_PATH, CONFIDENCE, LATENCY_BUDGET_MS)
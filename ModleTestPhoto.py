@@ -1,12 +1,30 @@
+import csv
+import heapq
+import json
+import os
+import queue
+import tempfile
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
 import cv2
-from ultralytics import YOLO
+import numpy as np
+
+from hand_renderer import HandRenderer, extract_detections, photo_info_lines
+from model_registry import get_model, weights_hash
+from tiled_inference import detect_tiled
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.bmp', '.tiff', '.webp'}
 
 def detect_hands_and_show(image_path, model_path="yolo11n_hand_detect.pt", conf_threshold=0.4):
     """
     读取本地图片，检测手部，在左上角显示信息，并以500x500窗口显示
     """
     # 加载模型
-    model = YOLO(model_path)
+    model = get_model(model_path)
 
     # 读取图片
     frame = cv2.imread(image_path)
@@ -17,59 +35,63 @@ def detect_hands_and_show(image_path, model_path="yolo11n_hand_detect.pt", conf_
     # 进行检测
     results = model(frame, conf=conf_threshold, verbose=False)
 
-    # 绘制检测框
-    annotated_frame = results[0].plot()
+    # 绘制检测框和左上角信息（直接按500x500显示分辨率渲染，只遮暗信息面板区域）
+    renderer = HandRenderer(display_size=(500, 500), names=model.names)
+    annotated_frame, confidences = renderer.render_result(frame, results[0])
+    num_hands = len(confidences)
 
-    # 获取检测结果
-    detections = results[0].boxes
-    num_hands = len(detections)
+    # 显示结果
+    cv2.imshow('Hand Detection Result - Press any key to close', annotated_frame)
+    print(f"检测完成！共检测到 {num_hands} 个手部")
+    print("窗口大小: 500x500")
+    print("按任意键关闭窗口...")
 
-    # ==================== 在左上角绘制信息 ====================
-    # 绘制半透明黑色背景
-    overlay = annotated_frame.copy()
-    cv2.rectangle(overlay, (5, 5), (280, 70 + num_hands * 25), (0, 0, 0), -1)
-    cv2.addWeighted(overlay, 0.6, annotated_frame, 0.4, 0, annotated_frame)
+    cv2.waitKey(0)
+    cv2.destroyAllWindows()
 
-    # 显示检测数量
-    cv2.putText(annotated_frame, f"Hands: {num_hands}",
-                (15, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 0), 2)
 
-    # 显示每个手部的置信度
-    for i, box in enumerate(detections):
-        conf = box.conf[0].item()
-        cv2.putText(annotated_frame, f"Conf: {conf:.2f}",
-                    (15, 60 + i * 25), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 255), 1)
+def detect_hands_tiled_and_show(image_path, model_path="yolo11n_hand_detect.pt", conf_threshold=0.4,
+                                tile_size=640, overlap=0.2, batch_size=8):
+    """
+    切片推理模式：高分辨率图片切成重叠切片分批检测，适合合影、4K监控截图中的小手部
+    """
+    model = get_model(model_path, imgsz=tile_size)
 
-    if num_hands == 0:
-        cv2.putText(annotated_frame, "No hands detected",
-                    (15, 60), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 255), 1)
+    frame, error = read_image(image_path)
+    if frame is None:
+        print(f"错误：无法读取图片 - {image_path}（{error}）")
+        return
 
-    # ==================== 调整窗口大小为500x500 ====================
-    annotated_frame = cv2.resize(annotated_frame, (500, 500))
+    boxes, confidences, classes, stats = detect_tiled(
+        model, frame, tile_size=tile_size, overlap=overlap,
+        conf_threshold=conf_threshold, batch_size=batch_size)
 
-    # 显示结果
-    cv2.imshow('Hand Detection Result - Press any key to close', annotated_frame)
-    print(f"检测完成！共检测到 {num_hands} 个手部")
-    print("窗口大小: 500x500")
+    h, w = frame.shape[:2]
+    print(f"图片尺寸: {w}x{h}，切片: {stats['tiles']} 块（{tile_size}px，重叠 {overlap:.0%}）")
+    print(f"切片速度: {stats['tiles_per_sec']} 块/秒，单张总耗时: {stats['seconds']} 秒")
+    print(f"检测完成！合并前 {stats['raw_detections']} 个框，合并后共检测到 {stats['detections']} 个手部")
+
+    renderer = HandRenderer(display_size=(500, 500), names=model.names)
+    annotated_frame = renderer.render(frame, boxes, confidences, classes,
+                                      photo_info_lines(confidences))
+    cv2.imshow('Tiled Hand Detection Result - Press any key to close', annotated_frame)
     print("按任意键关闭窗口...")
 
     cv2.waitKey(0)
     cv2.destroyAllWindows()
+    return boxes, confidences, stats
 
 
 def batch_detect(image_folder, model_path="yolo11n_hand_detect.pt", conf_threshold=0.4):
     """
     批量检测文件夹中的所有图片（500x500窗口，逐张显示）
     """
-    import os
-    from pathlib import Path
-
-    model = YOLO(model_path)
+    model = get_model(model_path)
+    renderer = HandRenderer(display_size=(500, 500), names=model.names)
 
     # 获取所有图片
-    image_extensions = {'.jpg', '.jpeg', '.png', '.bmp', '.tiff', '.webp'}
     image_files = [f for f in Path(image_folder).iterdir()
-                   if f.suffix.lower() in image_extensions]
+                   if f.suffix.lower() in IMAGE_EXTENSIONS]
 
     if not image_files:
         print(f"错误：在 {image_folder} 中未找到图片")
@@ -88,31 +110,9 @@ def batch_detect(image_folder, model_path="yolo11n_hand_detect.pt", conf_thresho
 
         # 检测
         results = model(frame, conf=conf_threshold, verbose=False)
-        annotated_frame = results[0].plot()
-
-        # 获取信息
-        detections = results[0].boxes
-        num_hands = len(detections)
-
-        # 在左上角绘制信息
-        overlay = annotated_frame.copy()
-        cv2.rectangle(overlay, (5, 5), (280, 70 + num_hands * 25), (0, 0, 0), -1)
-        cv2.addWeighted(overlay, 0.6, annotated_frame, 0.4, 0, annotated_frame)
-
-        cv2.putText(annotated_frame, f"Hands: {num_hands}",
-                    (15, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 0), 2)
 
-        for i, box in enumerate(detections):
-            conf = box.conf[0].item()
-            cv2.putText(annotated_frame, f"Conf: {conf:.2f}",
-                        (15, 60 + i * 25), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 255), 1)
-
-        if num_hands == 0:
-            cv2.putText(annotated_frame, "No hands detected",
-                        (15, 60), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 255), 1)
-
-        # 调整大小为500x500
-        annotated_frame = cv2.resize(annotated_frame, (500, 500))
+        # 绘制检测框和左上角信息（复用同一块500x500输出缓冲区）
+        annotated_frame, confidences = renderer.render_result(frame, results[0])
 
         # 显示
         cv2.imshow(f'Result {idx}/{len(image_files)} - Press any key or q to skip/quit', annotated_frame)
@@ -126,10 +126,462 @@ def batch_detect(image_folder, model_path="yolo11n_hand_detect.pt", conf_thresho
         cv2.destroyAllWindows()
 
 
+# ==================== 无界面批量推理（bulk 模式） ====================
+
+def find_images(image_folder):
+    """递归查找文件夹中的所有图片，按路径排序保证结果顺序稳定"""
+    return sorted(p for p in Path(image_folder).rglob('*')
+                  if p.is_file() and p.suffix.lower() in IMAGE_EXTENSIONS)
+
+
+def read_image(image_path):
+    """
+    读取一张图片，返回 (图像, 错误信息)
+    用 np.fromfile + imdecode 代替 imread，兼容 Windows 中文路径
+    """
+    try:
+        data = np.fromfile(str(image_path), dtype=np.uint8)
+        frame = cv2.imdecode(data, cv2.IMREAD_COLOR) if data.size else None
+    except Exception as e:
+        return None, f"读取失败: {e}"
+    if frame is None:
+        return None, "无法解码图片"
+    return frame, None
+
+
+def iter_decoded_images(image_paths, num_workers=8, prefetch=64):
+    """
+    用线程池并行解码图片，按输入顺序逐张产出 (路径, 图像, 错误信息)
+    最多同时预取 prefetch 张，避免一次性把整个文件夹读进内存
+    """
+    with ThreadPoolExecutor(max_workers=num_workers) as pool:
+        pending = deque()
+        for image_path in image_paths:
+            pending.append((image_path, pool.submit(read_image, image_path)))
+            if len(pending) >= prefetch:
+                path, future = pending.popleft()
+                yield (path,) + future.result()
+        while pending:
+            path, future = pending.popleft()
+            yield (path,) + future.result()
+
+
+class DetectionWriter:
+    """
+    检测结果写入器，根据文件后缀输出 JSONL（每张图一行）或 CSV（每个检测框一行）
+    """
+    CSV_FIELDS = ['path', 'width', 'height', 'num_hands', 'x1', 'y1', 'x2', 'y2', 'conf', 'error']
+
+    def __init__(self, output_path, append=False):
+        self.output_path = Path(output_path)
+        self.format = 'csv' if self.output_path.suffix.lower() == '.csv' else 'jsonl'
+        os.makedirs(self.output_path.parent, exist_ok=True)
+        write_header = not (append and self.output_path.exists() and self.output_path.stat().st_size > 0)
+        self.file = open(self.output_path, 'a' if append else 'w', encoding='utf-8', newline='')
+        self.csv_writer = None
+        if self.format == 'csv':
+            self.csv_writer = csv.DictWriter(self.file, fieldnames=self.CSV_FIELDS)
+            if write_header:
+                self.csv_writer.writeheader()
+
+    def write(self, record):
+        """写入一张图片的结果（record 格式同 make_record 的返回值）"""
+        if self.format == 'jsonl':
+            self.file.write(json.dumps(record, ensure_ascii=False) + "\n")
+            return
+
+        base = {'path': record['path'], 'width': record.get('width'), 'height': record.get('height'),
+                'num_hands': record.get('num_hands', 0), 'error': record.get('error', '')}
+        if not record.get('boxes'):
+            self.csv_writer.writerow(base)
+            return
+        for box, conf in zip(record['boxes'], record['confidences']):
+            row = dict(base)
+            row.update(x1=box[0], y1=box[1], x2=box[2], y2=box[3], conf=conf)
+            self.csv_writer.writerow(row)
+
+    def flush(self):
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+def make_record(image_path, frame, boxes, confidences):
+    """把一张图片的检测结果整理成可序列化的字典（字段与 Web 服务的返回保持一致）"""
+    h, w = frame.shape[:2]
+    return {
+        'path': str(image_path),
+        'width': w,
+        'height': h,
+        'num_hands': len(confidences),
+        'boxes': [[round(float(v), 2) for v in box] for box in boxes],
+        'confidences': [round(float(c), 4) for c in confidences],
+    }
+
+
+class AnnotatedImageWriter(threading.Thread):
+    """
+    后台保存带标注图片的线程，渲染和 JPEG 编码都不占用推理主循环
+    """
+
+    def __init__(self, output_dir, names=None, max_queue=64):
+        super().__init__(daemon=True)
+        self.output_dir = Path(output_dir)
+        self.renderer = HandRenderer(names=names)
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.num_failed = 0
+
+    def submit(self, out_name, frame, boxes, confidences, classes):
+        self.queue.put((out_name, frame, boxes, confidences, classes))
+
+    def run(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+            out_name, frame, boxes, confidences, classes = item
+            out_path = self.output_dir / out_name
+            try:
+                os.makedirs(out_path.parent, exist_ok=True)
+                annotated = self.renderer.render(frame, boxes, confidences, classes,
+                                                 photo_info_lines(confidences))
+                ok, encoded = cv2.imencode(out_path.suffix or '.jpg', annotated)
+                if not ok:
+                    raise ValueError("图片编码失败")
+                encoded.tofile(str(out_path))
+            except Exception as e:
+                self.num_failed += 1
+                print(f"  保存标注图片失败 {out_path}: {e}")
+
+    def close(self):
+        self.queue.put(None)
+        self.join()
+
+
+def shard_output_path(output_path, shard_index=0, num_shards=1):
+    """分片运行时每个分片写自己的结果文件，如 detections.shard-00001-of-00004.jsonl"""
+    output_path = Path(output_path)
+    if num_shards <= 1:
+        return output_path
+    return output_path.with_name(
+        f"{output_path.stem}.shard-{shard_index:05d}-of-{num_shards:05d}{output_path.suffix}")
+
+
+def manifest_path_for(output_path):
+    """结果文件对应的断点清单路径"""
+    output_path = Path(output_path)
+    return output_path.with_name(output_path.stem + ".manifest.jsonl")
+
+
+def stat_images(image_paths, num_workers=8):
+    """并行获取图片的 (大小, 修改时间)，无法访问的文件返回 None"""
+    def _stat(path):
+        try:
+            st = os.stat(path)
+            return st.st_size, st.st_mtime_ns
+        except OSError:
+            return None
+
+    with ThreadPoolExecutor(max_workers=num_workers) as pool:
+        return list(pool.map(_stat, image_paths, chunksize=256))
+
+
+class BulkManifest:
+    """
+    断点续跑清单（只追加的 JSONL），每行记录一张已完成的图片: 路径、大小、修改时间、模型哈希
+    重跑时大小/修改时间/模型哈希都一致的图片直接跳过
+    """
+
+    def __init__(self, path, model_hash):
+        self.path = Path(path)
+        self.model_hash = model_hash
+        self.done = {}
+        self._pending = []
+        if self.path.exists():
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue  # 中断时可能留下半行，忽略即可
+                    self.done[entry['path']] = (entry['size'], entry['mtime_ns'], entry['model_hash'])
+        os.makedirs(self.path.parent, exist_ok=True)
+        self.file = open(self.path, 'a', encoding='utf-8')
+
+    def is_done(self, image_path, size, mtime_ns):
+        return self.done.get(str(image_path)) == (size, mtime_ns, self.model_hash)
+
+    def add(self, image_path, size, mtime_ns, error=None):
+        entry = {'path': str(image_path), 'size': size, 'mtime_ns': mtime_ns,
+                 'model_hash': self.model_hash}
+        if error:
+            entry['error'] = error
+        self._pending.append(json.dumps(entry, ensure_ascii=False) + "\n")
+
+    def commit(self):
+        """结果文件落盘之后再调用，保证清单里记录的图片结果一定已经写出"""
+        if self._pending:
+            self.file.writelines(self._pending)
+            self.file.flush()
+            self._pending = []
+
+    def close(self):
+        self.commit()
+        os.fsync(self.file.fileno())
+        self.file.close()
+
+
+def bulk_detect(image_folder, model_path="yolo11n_hand_detect.pt", conf_threshold=0.4,
+                output_path="detections.jsonl", batch_size=16, num_workers=8,
+                save_annotated_dir=None, imgsz=640, report_every=500,
+                resume=True, shard_index=0, num_shards=1):
+    """
+    无界面高吞吐批量检测：递归遍历文件夹，线程池解码，按批推理，结果写入 JSONL/CSV
+
+    Args:
+        image_folder: 图片文件夹（递归查找）
+        output_path: 结果文件，后缀为 .csv 时输出 CSV，否则输出 JSONL
+        batch_size: 每批推理的图片数
+        num_workers: 解码线程数
+        save_annotated_dir: 不为 None 时，由后台线程保存带标注的图片到该目录（保持相对路径）
+        report_every: 每处理多少张图片打印一次进度和速度
+        resume: 为 True 时读取断点清单，跳过已完成的图片，结果追加到已有文件；False 则从头开始
+        shard_index, num_shards: 把排序后的图片列表按下标分成 num_shards 份，只处理第 shard_index 份，
+                                 可在多台机器/多个进程上同时运行，最后用 merge_bulk_outputs 合并
+    Returns:
+        统计信息字典
+    """
+    if num_shards < 1 or not 0 <= shard_index < num_shards:
+        raise ValueError(f"分片参数无效：需要 num_shards >= 1 且 0 <= shard_index < num_shards，"
+                         f"实际 shard_index={shard_index}, num_shards={num_shards}")
+    image_folder = Path(image_folder)
+    image_files = find_images(image_folder)[shard_index::num_shards]
+    if not image_files:
+        print(f"错误：在 {image_folder} 中未找到图片")
+        return None
+
+    output_path = shard_output_path(output_path, shard_index, num_shards)
+    manifest_path = manifest_path_for(output_path)
+    # 清单和结果文件必须配套才能续跑：没有清单时追加会把所有结果再写一遍，没有结果文件时跳过的图片会丢失
+    append = resume and manifest_path.exists() and output_path.exists()
+    if not append:
+        if resume and output_path.exists():
+            print(f"提示：没有找到断点清单 {manifest_path}，结果文件将重新生成")
+        if manifest_path.exists():
+            os.remove(manifest_path)
+
+    model = get_model(model_path)
+    manifest = BulkManifest(manifest_path, weights_hash(model_path))
+
+    # 跳过清单中已完成（且文件和模型都没有变化）的图片
+    file_stats = dict(zip(image_files, stat_images(image_files, num_workers)))
+    todo = [p for p in image_files
+            if file_stats[p] is None or not manifest.is_done(p, *file_stats[p])]
+    skipped = len(image_files) - len(todo)
+
+    if num_shards > 1:
+        print(f"\n分片 {shard_index + 1}/{num_shards}：分到 {len(image_files)} 张图片")
+    else:
+        print(f"\n找到 {len(image_files)} 张图片")
+    print(f"已完成 {skipped} 张（断点续跑跳过），本次需要处理 {len(todo)} 张，开始无界面批量检测...")
+    print(f"批大小: {batch_size}，解码线程: {num_workers}，结果文件: {output_path}")
+
+    writer = DetectionWriter(output_path, append=append)
+    image_writer = None
+    if save_annotated_dir is not None:
+        image_writer = AnnotatedImageWriter(save_annotated_dir, names=model.names)
+        image_writer.start()
+
+    stats = {'total': len(todo), 'skipped': skipped, 'processed': 0, 'failed': 0, 'hands': 0}
+    start_time = time.time()
+    last_report = 0
+
+    def run_batch(batch):
+        results = model([frame for _, frame in batch], conf=conf_threshold,
+                        imgsz=imgsz, verbose=False)
+        for (image_path, frame), result in zip(batch, results):
+            boxes, confidences, classes = extract_detections(result)
+            writer.write(make_record(image_path, frame, boxes, confidences))
+            manifest.add(image_path, *file_stats[image_path])
+            stats['hands'] += len(confidences)
+            if image_writer is not None:
+                image_writer.submit(image_path.relative_to(image_folder), frame,
+                                    boxes, confidences, classes)
+        stats['processed'] += len(batch)
+
+        # 先让结果落盘，再记录清单，中断后最多重做最后一批
+        writer.flush()
+        manifest.commit()
+
+    try:
+        batch = []
+        for image_path, frame, error in iter_decoded_images(todo, num_workers,
+                                                            prefetch=batch_size * 4):
+            if frame is None:
+                # 损坏或无法读取的文件只记录，不中断整个任务
+                stats['failed'] += 1
+                writer.write({'path': str(image_path), 'error': error})
+                if file_stats[image_path] is not None:
+                    manifest.add(image_path, *file_stats[image_path], error=error)
+                continue
+
+            batch.append((image_path, frame))
+            if len(batch) >= batch_size:
+                run_batch(batch)
+                batch = []
+
+            if stats['processed'] - last_report >= report_every:
+                last_report = stats['processed']
+                elapsed = time.time() - start_time
+                print(f"  [{stats['processed'] + stats['failed']}/{stats['total']}] "
+                      f"{stats['processed'] / elapsed:.1f} 张/秒")
+
+        if batch:
+            run_batch(batch)
+    finally:
+        writer.close()
+        manifest.close()
+        if image_writer is not None:
+            image_writer.close()
+
+    elapsed = time.time() - start_time
+    stats['seconds'] = round(elapsed, 2)
+    stats['images_per_sec'] = round(stats['processed'] / elapsed, 2) if elapsed > 0 else 0.0
+
+    print("\n--- 批量检测完成 ---")
+    print(f"成功: {stats['processed']} 张，失败: {stats['failed']} 张，跳过: {skipped} 张，"
+          f"共检测到 {stats['hands']} 个手部")
+    print(f"耗时: {elapsed:.1f} 秒，速度: {stats['images_per_sec']} 张/秒")
+    print(f"结果已保存到: {output_path}")
+    return stats
+
+
+def iter_bulk_groups(path):
+    """
+    按文件中的顺序逐组读取结果文件，产出 (路径, [记录/CSV行...])，不把整个文件读入内存
+    同一张图片可能出现多次（断点重做或模型更新后重跑），以最后一次为准
+    """
+    path = Path(path)
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        if path.suffix.lower() == '.csv':
+            group_path, rows = None, []
+            for row in csv.DictReader(f):
+                if row['path'] != group_path:
+                    if rows:
+                        yield group_path, rows
+                    group_path, rows = row['path'], []
+                rows.append(row)
+            if rows:
+                yield group_path, rows
+        else:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                yield record['path'], [record]
+
+
+def read_bulk_output(path):
+    """
+    读取一个结果文件，按图片分组返回 [(路径, [记录/CSV行...]), ...]
+    同一张图片在文件中出现多次时（断点重做或模型更新后重跑），只保留最后一次
+    """
+    groups = {}
+    for image_path, rows in iter_bulk_groups(path):
+        groups.pop(image_path, None)  # 新的一组出现，旧结果作废
+        groups[image_path] = rows
+    return list(groups.items())
+
+
+def _write_sorted_runs(items, run_dir, run_size):
+    """外部排序第一步：每 run_size 组排序后写成一个临时文件，返回文件路径列表"""
+    run_paths, chunk = [], []
+
+    def flush():
+        chunk.sort(key=lambda item: item[0])
+        run_path = os.path.join(run_dir, f"run-{len(run_paths):05d}.jsonl")
+        with open(run_path, 'w', encoding='utf-8') as f:
+            for item in chunk:
+                f.write(json.dumps(item, ensure_ascii=False) + "\n")
+        run_paths.append(run_path)
+        chunk.clear()
+
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= run_size:
+            flush()
+    if chunk:
+        flush()
+    return run_paths
+
+
+def _read_run(run_path):
+    with open(run_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            key, rows = json.loads(line)
+            yield tuple(key), rows
+
+
+def merge_bulk_outputs(output_path, num_shards=1, run_size=100000):
+    """
+    合并各分片的结果文件到 output_path（按图片路径排序、去重）
+    num_shards=1 时相当于压缩单个结果文件中重复的记录
+
+    内存占用与图片数量无关：各分片按 run_size 组切段排序写入临时文件，再用 heapq.merge 流式归并，
+    同一张图片只保留最后一次的结果（分片内按出现顺序，分片之间以编号大的为准）
+    """
+    output_path = Path(output_path)
+    os.makedirs(output_path.parent, exist_ok=True)
+    shard_paths = []
+    for shard_index in range(num_shards):
+        shard_path = shard_output_path(output_path, shard_index, num_shards)
+        if not shard_path.exists():
+            print(f"警告：分片结果不存在，跳过: {shard_path}")
+            continue
+        shard_paths.append((shard_index, shard_path))
+
+    def keyed_groups():
+        for shard_index, shard_path in shard_paths:
+            for seq, (image_path, rows) in enumerate(iter_bulk_groups(shard_path)):
+                yield (image_path, shard_index, seq), rows
+
+    num_images = 0
+    tmp_path = output_path.with_name(output_path.name + ".tmp")
+    with tempfile.TemporaryDirectory(dir=output_path.parent) as run_dir:
+        runs = [_read_run(p) for p in _write_sorted_runs(keyed_groups(), run_dir, run_size)]
+        with open(tmp_path, 'w', encoding='utf-8', newline='') as f:
+            if output_path.suffix.lower() == '.csv':
+                csv_writer = csv.DictWriter(f, fieldnames=DetectionWriter.CSV_FIELDS)
+                csv_writer.writeheader()
+                write_rows = csv_writer.writerows
+            else:
+                def write_rows(records):
+                    for record in records:
+                        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+            # 归并后同一路径的各组相邻且按 (分片, 顺序) 排列，写出每个路径的最后一组
+            current_path, current_rows = None, None
+            for (image_path, _, _), rows in heapq.merge(*runs, key=lambda item: item[0]):
+                if image_path != current_path and current_rows is not None:
+                    write_rows(current_rows)
+                    num_images += 1
+                current_path, current_rows = image_path, rows
+            if current_rows is not None:
+                write_rows(current_rows)
+                num_images += 1
+    os.replace(tmp_path, output_path)
+
+    print(f"已合并 {num_shards} 个分片，共 {num_images} 张图片的结果 -> {output_path}")
+    return num_images
+
+
 def main():
     # ==================== 配置区域 ====================
 
-    # 模式选择: "single" (单张图片) 或 "batch" (批量处理文件夹)
+    # 模式选择: "single" (单张图片)、"tiled" (高分辨率图片切片检测)、
+    #          "batch" (批量处理文件夹，逐张显示) 或 "bulk" (无界面批量推理，结果写文件)
     MODE = "single"
 
     # 模型路径
@@ -150,6 +602,19 @@ def main():
             conf_threshold=CONF_THRESHOLD
         )
 
+    # 切片检测模式（大图中的小手部）
+    elif MODE == "tiled":
+        IMAGE_PATH = r"D:\Python_Files\Personal_projects\YOLOv8\1.jpg"  # 修改为你的图片路径
+
+        detect_hands_tiled_and_show(
+            image_path=IMAGE_PATH,
+            model_path=MODEL_PATH,
+            conf_threshold=CONF_THRESHOLD,
+            tile_size=640,  # 切片边长
+            overlap=0.2,  # 相邻切片重叠比例
+            batch_size=8  # 每批推理的切片数
+        )
+
     # 批量处理模式
     elif MODE == "batch":
         IMAGE_FOLDER = "test_images"  # 修改为你的图片文件夹路径
@@ -161,8 +626,26 @@ def main():
             conf_threshold=CONF_THRESHOLD
         )
 
+    # 无界面批量推理模式
+    elif MODE == "bulk":
+        IMAGE_FOLDER = "test_images"  # 修改为你的图片文件夹路径（会递归查找子目录）
+
+        bulk_detect(
+            image_folder=IMAGE_FOLDER,
+            model_path=MODEL_PATH,
+            conf_threshold=CONF_THRESHOLD,
+            output_path="bulk_results/detections.jsonl",  # 后缀改为 .csv 则输出 CSV
+            batch_size=16,
+            num_workers=8,
+            save_annotated_dir=None,  # 例如 "bulk_results/annotated"，保存带标注的图片
+            resume=True,  # 断点续跑：跳过上次已完成的图片
+            shard_index=0,  # 多机/多进程分片：本进程处理第几份
+            num_shards=1  # 总分片数；全部分片跑完后调用 merge_bulk_outputs 合并结果
+        )
+        # merge_bulk_outputs("bulk_results/detections.jsonl", num_shards=1)
+
     else:
-        print("错误：MODE 必须是 'single' 或 'batch'")
+        print("错误：MODE 必须是 'single'、'tiled'、'batch' 或 'bulk'")
 
 
 if __name__ == "__main__":
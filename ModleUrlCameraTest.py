@@ -532,7 +532,7 @@ from flask import Flask, render_template_string, jsonify, request
 from flask_cors import CORS  # 添加跨域支持
 import cv2
 import numpy as np
-from ultralytics import YOLO
+from model_registry import get_bundle_model, get_model, is_model_bundle
 import io
 import os
 import traceback
@@ -547,12 +547,17 @@ CORS(app)  # 启用跨域支持
 
 # 加载YOLO模型
 MODEL_PATH = r"D:\Python_Files\Personal_projects\YOLOv8\runs\detect\yolo11n_hand_detect.pt2\weights\best.pt"
+# MODEL_PATH = "hand_detector_bundle"  # 多分辨率模型包目录（model_bundle.py 生成）
+LATENCY_BUDGET_MS = 30  # 使用模型包时每帧 CPU 延迟预算（毫秒）
 if not os.path.exists(MODEL_PATH):
     print(f"❌ 错误: 未找到模型文件 {MODEL_PATH}")
     print("请先下载模型或修改MODEL_PATH为正确的路径")
     exit(1)
 
-model = YOLO(MODEL_PATH)
+if is_model_bundle(MODEL_PATH):
+    model, _ = get_bundle_model(MODEL_PATH, LATENCY_BUDGET_MS)
+else:
+    model = get_model(MODEL_PATH)
 print(f"✅ 模型加载成功: {MODEL_PATH}")
 
 # HTML界面模板（增强版，包含绘图功能）
@@ -0,0 +1,145 @@
+"""
+Benchmark for convert_coco_to_yolo.py on a synthetic large COCO annotation file.
+
+Compares the original per-annotation implementation (category list rebuilt and label file
+opened in append mode for every box) against the indexed single-pass converter, and checks
+that both produce identical label files.
+
+Usage:
+    python benchmark_convert_coco.py --images 20000 --boxes-per-image 3 --categories 20
+"""
+
+import argparse
+import filecmp
+import json
+import os
+import random
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+from convert_coco_to_yolo import convert_coco_to_yolo
+
+
+def legacy_convert_coco_to_yolo(coco_json_path, labels_output_dir, target_class_names=None):
+    """The original conversion loop, kept verbatim (minus prints) as the benchmark baseline."""
+    os.makedirs(labels_output_dir, exist_ok=True)
+    with open(coco_json_path, 'r') as f:
+        coco_data = json.load(f)
+
+    categories = coco_data['categories']
+    category_mapping = {}
+    if target_class_names is None:
+        for cat in categories:
+            category_mapping[cat['id']] = len(category_mapping)
+    else:
+        for i, tgt_name in enumerate(target_class_names):
+            for cat in categories:
+                if cat['name'].lower() == tgt_name.lower():
+                    category_mapping[cat['id']] = i
+                    break
+
+    image_info_lookup = {img['id']: img for img in coco_data['images']}
+    for ann in coco_data['annotations']:
+        category_id = ann['category_id']
+        if target_class_names is not None and category_id not in [cat['id'] for cat in categories if
+                                                                  cat['name'] in target_class_names]:
+            continue
+        if category_id not in category_mapping:
+            continue
+        yolo_class_id = category_mapping[category_id]
+        img_info = image_info_lookup.get(ann['image_id'])
+        if not img_info:
+            continue
+
+        img_width = img_info['width']
+        img_height = img_info['height']
+        x_min, y_min, width, height = ann['bbox']
+        x_center = max(0.0, min(1.0, (x_min + width / 2.0) / img_width))
+        y_center = max(0.0, min(1.0, (y_min + height / 2.0) / img_height))
+        norm_width = max(0.0, min(1.0, width / img_width))
+        norm_height = max(0.0, min(1.0, height / img_height))
+
+        label_filename = Path(img_info['file_name']).with_suffix('.txt').name
+        label_path = os.path.join(labels_output_dir, label_filename)
+        label_line = f"{yolo_class_id} {x_center:.6f} {y_center:.6f} {norm_width:.6f} {norm_height:.6f}\n"
+        with open(label_path, 'a') as f_label:
+            f_label.write(label_line)
+
+
+def make_synthetic_coco(path, num_images, boxes_per_image, num_categories, seed=0):
+    """Writes a COCO-style annotation file with 'hand' plus (num_categories - 1) distractor classes."""
+    rng = random.Random(seed)
+    categories = [{'id': 1, 'name': 'hand'}] + [
+        {'id': i + 1, 'name': f'class_{i}'} for i in range(1, num_categories)]
+
+    images, annotations = [], []
+    for image_id in range(1, num_images + 1):
+        width, height = rng.choice([(640, 480), (1280, 720), (1920, 1080)])
+        images.append({'id': image_id, 'file_name': f'images{image_id}.jpg', 'width': width, 'height': height})
+        for _ in range(rng.randint(0, 2 * boxes_per_image)):
+            w = rng.uniform(10, width / 3)
+            h = rng.uniform(10, height / 3)
+            annotations.append({
+                'id': len(annotations) + 1,
+                'image_id': image_id,
+                'category_id': rng.choice(categories)['id'] if rng.random() < 0.3 else 1,
+                'bbox': [rng.uniform(0, width - w), rng.uniform(0, height - h), w, h],
+                'area': w * h,
+                'iscrowd': 0,
+            })
+
+    with open(path, 'w') as f:
+        json.dump({'images': images, 'annotations': annotations, 'categories': categories}, f)
+    return len(images), len(annotations)
+
+
+def same_label_dirs(dir_a, dir_b):
+    """Compares the .txt label files of two directories (other files such as manifests are ignored)."""
+    names_a = sorted(n for n in os.listdir(dir_a) if n.endswith('.txt'))
+    if names_a != sorted(n for n in os.listdir(dir_b) if n.endswith('.txt')):
+        return False
+    _, mismatch, errors = filecmp.cmpfiles(dir_a, dir_b, names_a, shallow=False)
+    return not mismatch and not errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark COCO -> YOLO label conversion")
+    parser.add_argument('--images', type=int, default=20000, help="Number of synthetic images")
+    parser.add_argument('--boxes-per-image', type=int, default=3, help="Average annotations per image")
+    parser.add_argument('--categories', type=int, default=20, help="Number of COCO categories")
+    parser.add_argument('--work-dir', default=None,
+                        help="Where to write the synthetic data and labels (default: system temp dir)")
+    parser.add_argument('--skip-legacy', action='store_true', help="Only time the new converter")
+    args = parser.parse_args()
+
+    work_dir = Path(tempfile.mkdtemp(prefix='coco_bench_', dir=args.work_dir))
+    try:
+        json_path = work_dir / 'instances_synthetic.json'
+        num_images, num_annotations = make_synthetic_coco(
+            json_path, args.images, args.boxes_per_image, args.categories)
+        size_mb = json_path.stat().st_size / 1e6
+        print(f"Synthetic annotation file: {num_images} images, {num_annotations} annotations, "
+              f"{args.categories} categories ({size_mb:.1f} MB)")
+
+        start = time.perf_counter()
+        convert_coco_to_yolo(json_path, None, work_dir / 'labels_new', target_class_names=['hand'])
+        new_seconds = time.perf_counter() - start
+
+        print("\n--- Benchmark Summary ---")
+        print(f"Indexed converter: {new_seconds:.2f} s")
+        if not args.skip_legacy:
+            start = time.perf_counter()
+            legacy_convert_coco_to_yolo(json_path, work_dir / 'labels_legacy', target_class_names=['hand'])
+            legacy_seconds = time.perf_counter() - start
+            identical = same_label_dirs(work_dir / 'labels_new', work_dir / 'labels_legacy')
+            print(f"Legacy converter:  {legacy_seconds:.2f} s")
+            print(f"Speedup:           {legacy_seconds / new_seconds:.1f}x")
+            print(f"Identical output:  {identical}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
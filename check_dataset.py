@@ -8,6 +8,58 @@ import zipfile
 import os
 import json
 import shutil
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import yaml
+
+from coco_stream import read_coco_tables
+from dataset_splits import labels_dir_for
+from zip_dataset import find_member, image_members, open_text_member, probe_image_size
+
+def check_zip_splits(z, sample_size=200):
+    """
+    不解压直接检查压缩包内的各个划分：
+    流式读取标注 JSON，统计图片数量，并抽样读取图片文件头核对宽高
+    """
+    for split in ("train2017", "val2017"):
+        member = find_member(z, f"instances_{split}.json")
+        images = image_members(z, split)
+        print(f"\n📂 {split}: 压缩包内有 {len(images)} 张图片")
+        if member is None:
+            print(f"  ❌ 未找到标注文件 instances_{split}.json")
+            continue
+
+        with open_text_member(z, member) as f:
+            tables = read_coco_tables(f)
+        print(f"  📋 标注文件 {member}: {len(tables['image_ids'])} 张图片, "
+              f"{len(tables['ann_image_ids'])} 个标注, 类别: {[c['name'] for c in tables['categories']]}")
+
+        # 抽样核对图片实际尺寸与标注中的 width/height 是否一致（只读文件头，不解码像素）
+        sizes = {os.path.basename(name): (w, h) for name, w, h in
+                 zip(tables['file_names'], tables['widths'], tables['heights'])}
+        by_name = {os.path.basename(info.filename): info for info in images}
+        missing = [name for name in sizes if name not in by_name]
+        if missing:
+            print(f"  ❌ {len(missing)} 张标注中的图片不在压缩包内，例如: {missing[:5]}")
+
+        names = [name for name in sizes if name in by_name]
+        rng = np.random.default_rng(0)
+        sample = rng.choice(len(names), size=min(sample_size, len(names)), replace=False) if names else []
+        mismatched = []
+        for i in sample:
+            name = names[i]
+            with z.open(by_name[name]) as img_file:
+                actual = probe_image_size(img_file)
+            if actual != tuple(int(v) for v in sizes[name]):
+                mismatched.append((name, actual, sizes[name]))
+        if mismatched:
+            print(f"  ❌ 抽样 {len(sample)} 张中有 {len(mismatched)} 张尺寸与标注不符，例如: {mismatched[:3]}")
+        else:
+            print(f"  ✅ 抽样 {len(sample)} 张图片尺寸与标注一致")
+
 
 def check_dataset():
     dataset_path = "d:/Python_Files/Personal_projects/YOLOv8/hand_detection_dataset"
@@ -27,6 +79,7 @@ def check_dataset():
                     print(f"  {f}")
                 if len(files) > 20:
                     print(f"  ... 还有 {len(files)-20} 个文件")
+                check_zip_splits(z)
         except Exception as e:
             print(f"❌ 读取zip文件出错: {e}")
     else:
@@ -56,5 +109,218 @@ def check_dataset():
     else:
         print(f"\n❌ 配置文件不存在: {config_path}")
 
+# 检查项 -> 严重程度；error 会让检查不通过（可用于训练前把关），warning 只做提示
+ISSUE_SEVERITY = {
+    'unreadable_image': 'error',
+    'size_mismatch': 'error',
+    'malformed_label': 'error',
+    'class_out_of_range': 'error',
+    'box_out_of_range': 'error',
+    'degenerate_box': 'error',
+    'missing_in_annotations': 'warning',
+    # ultralytics 会忽略没有图片的标签文件，不影响训练
+    'orphan_label': 'warning',
+    'image_without_label': 'warning',
+}
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.tif', '.tiff', '.webp')
+
+
+def check_label_lines(text, nc, eps=1e-6):
+    """
+    检查一个 YOLO 标签文件的内容
+    返回 [(检查项, 说明), ...]，没有问题时返回空列表
+    """
+    issues = []
+    for line_no, line in enumerate(text.splitlines(), 1):
+        parts = line.split()
+        if not parts:
+            continue
+        try:
+            if len(parts) != 5:
+                raise ValueError(f"应为 5 个字段，实际 {len(parts)} 个")
+            cls = float(parts[0])
+            cx, cy, w, h = map(float, parts[1:])
+        except ValueError as e:
+            issues.append(('malformed_label', f"第 {line_no} 行: {e}"))
+            continue
+        if cls != int(cls) or not 0 <= cls < nc:
+            issues.append(('class_out_of_range', f"第 {line_no} 行: 类别 {parts[0]} 不在 [0, {nc}) 内"))
+        if w <= 0 or h <= 0:
+            issues.append(('degenerate_box', f"第 {line_no} 行: 宽高为 {w}, {h}"))
+        elif (min(cx - w / 2, cy - h / 2) < -eps or max(cx + w / 2, cy + h / 2) > 1 + eps
+              or not (0 <= cx <= 1 and 0 <= cy <= 1)):
+            issues.append(('box_out_of_range', f"第 {line_no} 行: 框 ({cx}, {cy}, {w}, {h}) 超出图像范围"))
+    return issues
+
+
+def _check_chunk(items, nc, coco_sizes):
+    """
+    子进程中检查一批图片：只读文件头获取尺寸，与 COCO 标注核对，并检查对应的标签文件
+    items: [(图片路径, 标签路径或 None), ...]
+    """
+    issues = []
+    for image_path, label_path in items:
+        name = os.path.basename(image_path)
+        try:
+            size = probe_image_size(image_path)
+        except Exception as e:
+            issues.append(('unreadable_image', image_path, str(e)))
+            size = None
+        if coco_sizes is not None:
+            expected = coco_sizes.get(name)
+            if expected is None:
+                issues.append(('missing_in_annotations', image_path, "COCO 标注中没有这张图片"))
+            elif size is not None and tuple(size) != expected:
+                issues.append(('size_mismatch', image_path, f"实际 {size[0]}x{size[1]}，标注 {expected[0]}x{expected[1]}"))
+        if label_path is not None:
+            try:
+                with open(label_path, 'r', encoding='utf-8') as f:
+                    text = f.read()
+            except (OSError, UnicodeDecodeError) as e:
+                issues.append(('malformed_label', label_path, str(e)))
+                continue
+            issues.extend((kind, label_path, detail) for kind, detail in check_label_lines(text, nc))
+    return issues
+
+
+def load_coco_sizes(annotation_path):
+    """从 COCO 标注文件流式读取 {文件名: (宽, 高)}"""
+    with open(annotation_path, 'r', encoding='utf-8') as f:
+        tables = read_coco_tables(f)
+    return {os.path.basename(name): (int(w), int(h)) for name, w, h in
+            zip(tables['file_names'], tables['widths'].tolist(), tables['heights'].tolist())}
+
+
+def check_split(images_dir, labels_dir, nc, annotation_path=None, num_workers=None, chunk_size=512,
+                image_paths=None):
+    """
+    并行检查一个划分（images/ + labels/）
+
+    Args:
+        images_dir: 图片目录（image_paths 给出时只用于报告）
+        labels_dir: YOLO 标签目录
+        nc: 类别数，类别 id 必须在 [0, nc) 内
+        annotation_path: 可选，COCO 标注文件，用来核对图片宽高
+        num_workers: 进程数（None 表示全部 CPU 核心）
+        chunk_size: 每个任务检查的图片数
+        image_paths: 可选，列表文件划分中的图片路径（可来自多个目录，标签在各自的 labels 目录中查找，
+            不检查孤立标签）
+    Returns:
+        (统计字典, 问题列表 [{'type', 'severity', 'path', 'detail'}, ...])
+    """
+    if image_paths is None:
+        images = {os.path.splitext(e.name)[0]: e.path for e in os.scandir(images_dir)
+                  if e.is_file() and e.name.lower().endswith(IMAGE_EXTENSIONS)}
+        labels = {}
+        if os.path.isdir(labels_dir):
+            labels = {e.name[:-4]: e.path for e in os.scandir(labels_dir) if e.is_file() and e.name.endswith('.txt')}
+        issues = [('orphan_label', labels[stem], "没有对应的图片") for stem in sorted(set(labels) - set(images))]
+        items = sorted((path, labels.get(stem)) for stem, path in images.items())
+    else:
+        items = []
+        for path in sorted(image_paths):
+            stem = os.path.splitext(os.path.basename(path))[0]
+            label_path = os.path.join(labels_dir_for(os.path.dirname(path)), stem + '.txt')
+            items.append((path, label_path if os.path.exists(label_path) else None))
+        issues = []
+        images = {path: path for path, _ in items}
+        labels = {path: label for path, label in items if label is not None}
+    coco_sizes = load_coco_sizes(annotation_path) if annotation_path else None
+
+    issues += [('image_without_label', path, "没有标签文件（训练时作为背景图）") for path, label in items if label is None]
+    chunks = [items[i:i + chunk_size] for i in range(0, len(items), chunk_size)]
+    # 每个任务只带上自己那批图片的标注尺寸，避免把整张表反复传给子进程
+    chunk_sizes = [None if coco_sizes is None else
+                   {n: coco_sizes[n] for n in (os.path.basename(p) for p, _ in chunk) if n in coco_sizes}
+                   for chunk in chunks]
+    with ProcessPoolExecutor(max_workers=num_workers) as pool:
+        for chunk_issues in pool.map(_check_chunk, chunks, [nc] * len(chunks), chunk_sizes):
+            issues.extend(chunk_issues)
+
+    records = [{'type': kind, 'severity': ISSUE_SEVERITY[kind], 'path': path, 'detail': detail}
+               for kind, path, detail in issues]
+    counts = {}
+    for record in records:
+        counts[record['type']] = counts.get(record['type'], 0) + 1
+    stats = {
+        'images_dir': str(images_dir),
+        'labels_dir': str(labels_dir),
+        'images': len(images),
+        'labels': len(labels),
+        'errors': sum(1 for r in records if r['severity'] == 'error'),
+        'warnings': sum(1 for r in records if r['severity'] == 'warning'),
+        'issue_counts': counts,
+    }
+    return stats, records
+
+
+def check_yolo_dataset(dataset_yaml_path, report_path=None, annotations=None, num_workers=None):
+    """
+    按数据集 YAML 检查训练集和验证集，可写出 JSON 报告，供训练前把关
+
+    Args:
+        dataset_yaml_path: 训练用的数据集 YAML（读取 path、train、val、nc）
+        report_path: JSON 报告输出路径，None 表示不写
+        annotations: 可选 {'train': COCO 标注文件, 'val': COCO 标注文件}，用于核对图片宽高
+        num_workers: 检查进程数
+    Returns:
+        dict: 报告（'ok' 为 False 表示存在 error 级别的问题）
+    """
+    with open(dataset_yaml_path, 'r', encoding='utf-8') as f:
+        config = yaml.safe_load(f)
+    root = config.get('path', '')
+    nc = int(config.get('nc', len(config.get('names', []))))
+    annotations = annotations or {}
+
+    start_time = time.time()
+    report = {'dataset_yaml': str(dataset_yaml_path), 'nc': nc, 'splits': {}, 'issues': []}
+    for split in ('train', 'val'):
+        if not config.get(split):
+            continue
+        images_dir = os.path.join(root, config[split])
+        # 与 ultralytics 一致：标签目录是把路径中的 images 换成 labels
+        labels_dir = labels_dir_for(images_dir)
+        image_paths = None
+        if images_dir.endswith('.txt'):
+            # 列表文件划分（见 dataset_splits.py），相对路径相对于列表文件所在目录
+            with open(images_dir, 'r', encoding='utf-8') as f:
+                image_paths = [os.path.join(os.path.dirname(images_dir), line.strip())
+                               for line in f if line.strip()]
+        stats, records = check_split(images_dir, labels_dir, nc, annotations.get(split), num_workers,
+                                     image_paths=image_paths)
+        report['splits'][split] = stats
+        report['issues'].extend(dict(r, split=split) for r in records)
+        print(f"[{split}] {stats['images']} 张图片, {stats['labels']} 个标签文件: "
+              f"{stats['errors']} 个错误, {stats['warnings']} 个警告 {stats['issue_counts'] or ''}")
+
+    report['seconds'] = round(time.time() - start_time, 2)
+    report['ok'] = all(s['errors'] == 0 for s in report['splits'].values())
+    if report_path:
+        with open(report_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"检查报告已保存: {report_path}")
+    print(f"{'✅ 数据集检查通过' if report['ok'] else '❌ 数据集检查未通过'}（耗时 {report['seconds']:.1f}s）")
+    return report
+
+
+def main():
+    # 数据集概览（压缩包、原始目录、配置文件）
+    check_dataset()
+
+    # 转换后数据集的完整性检查
+    dataset_yaml_path = "hand_detection_dataset.yaml"
+    report_path = "dataset_check_report.json"
+    dataset_path = "d:/Python_Files/Personal_projects/YOLOv8/hand_detection_dataset"
+    annotations = {
+        'train': os.path.join(dataset_path, "annotations", "instances_train2017.json"),
+        'val': os.path.join(dataset_path, "annotations", "instances_val2017.json"),
+    }
+    annotations = {k: v for k, v in annotations.items() if os.path.exists(v)}
+
+    print("\n=== 转换后数据集完整性检查 ===\n")
+    report = check_yolo_dataset(dataset_yaml_path, report_path, annotations)
+    return 0 if report['ok'] else 1
+
+
 if __name__ == "__main__":
-    check_dataset()
\ No newline at end of file
+    sys.exit(main())
\ No newline at end of file
@@ -0,0 +1,193 @@
+"""
+Streaming reader for COCO annotation files.
+
+json.load() on a large instances_*.json materializes every image and annotation as Python dicts
+before anything else can happen. This module walks the top-level object incrementally, decodes one
+array element at a time, and keeps only compact arrays (ids, sizes, boxes) plus the file names,
+so peak memory scales with the number of images/boxes rather than with the JSON text.
+"""
+
+import json
+import re
+import sys
+from array import array
+
+import numpy as np
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+
+class JsonStreamError(ValueError):
+    """Raised when the annotation file is not a JSON object of the expected shape."""
+
+
+class _JsonStream:
+    """Minimal incremental JSON scanner over a text file object (top-level object only)."""
+
+    def __init__(self, fileobj, chunk_size=1 << 20):
+        self.fileobj = fileobj
+        self.chunk_size = chunk_size
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self):
+        """Reads another chunk, dropping the already consumed prefix of the buffer."""
+        if self.eof:
+            return False
+        chunk = self.fileobj.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """Returns the next non-whitespace character without consuming it ('' at end of input)."""
+        while True:
+            self.pos = _WHITESPACE.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return ''
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise JsonStreamError(f"Expected '{char}' at offset {self.pos}, got {self.peek()!r}")
+        self.pos += 1
+
+    def value(self):
+        """Decodes the next complete JSON value."""
+        self.peek()
+        while True:
+            try:
+                obj, end = self.decoder.raw_decode(self.buf, self.pos)
+                # A value ending exactly at the buffer end may be a truncated number; read more first
+                if end < len(self.buf) or self.eof:
+                    self.pos = end
+                    return obj
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            if not self._fill():
+                obj, end = self.decoder.raw_decode(self.buf, self.pos)
+                self.pos = end
+                return obj
+
+
+def iter_json_sections(fileobj, array_keys=None, chunk_size=1 << 20):
+    """
+    Iterates a top-level JSON object incrementally.
+
+    Yields (key, element) for every element of each top-level array, and (key, value) for every
+    top-level non-array value. Array sections whose key is not in array_keys (if given) are
+    still scanned, but their elements are not yielded.
+    """
+    stream = _JsonStream(fileobj, chunk_size)
+    stream.expect('{')
+    if stream.peek() == '}':
+        return
+    while True:
+        key = stream.value()
+        stream.expect(':')
+        if stream.peek() == '[':
+            stream.pos += 1
+            wanted = array_keys is None or key in array_keys
+            if stream.peek() == ']':
+                stream.pos += 1
+            else:
+                while True:
+                    element = stream.value()
+                    if wanted:
+                        yield key, element
+                    sep = stream.peek()
+                    stream.pos += 1
+                    if sep == ']':
+                        break
+                    if sep != ',':
+                        raise JsonStreamError(f"Malformed array '{key}' near offset {stream.pos}")
+        else:
+            yield key, stream.value()
+
+        sep = stream.peek()
+        stream.pos += 1
+        if sep == '}':
+            return
+        if sep != ',':
+            raise JsonStreamError(f"Malformed top-level object near offset {stream.pos}")
+
+
+def read_coco_tables(fileobj, chunk_size=1 << 20):
+    """
+    Streams a COCO annotation file into compact column arrays.
+
+    Sections may appear in any order, so annotations are stored raw (image id, category id, box)
+    and resolved against images/categories afterwards.
+
+    Returns:
+        dict with 'categories' (list of dicts), 'image_ids', 'widths', 'heights' (np.ndarray),
+        'file_names' (list), 'ann_image_ids', 'ann_category_ids' (np.ndarray) and 'ann_bboxes' (N, 4).
+    """
+    categories = []
+    image_ids, widths, heights, file_names = array('q'), array('d'), array('d'), []
+    ann_image_ids, ann_category_ids, ann_bboxes = array('q'), array('q'), array('d')
+
+    for key, element in iter_json_sections(fileobj, ('images', 'annotations', 'categories'), chunk_size):
+        if key == 'annotations':
+            ann_image_ids.append(element['image_id'])
+            ann_category_ids.append(element['category_id'])
+            ann_bboxes.extend(element['bbox'][:4])
+        elif key == 'images':
+            image_ids.append(element['id'])
+            widths.append(element['width'])
+            heights.append(element['height'])
+            file_names.append(element['file_name'])
+        elif key == 'categories':
+            categories.append({'id': element['id'], 'name': element['name']})
+
+    return {
+        'categories': categories,
+        'image_ids': np.frombuffer(image_ids, dtype=np.int64),
+        'widths': np.frombuffer(widths, dtype=np.float64),
+        'heights': np.frombuffer(heights, dtype=np.float64),
+        'file_names': file_names,
+        'ann_image_ids': np.frombuffer(ann_image_ids, dtype=np.int64),
+        'ann_category_ids': np.frombuffer(ann_category_ids, dtype=np.int64),
+        'ann_bboxes': np.frombuffer(ann_bboxes, dtype=np.float64).reshape(-1, 4),
+    }
+
+
+def coco_tables_from_dict(coco_data):
+    """Builds the same column arrays from an already loaded COCO dict."""
+    images = coco_data['images']
+    annotations = coco_data['annotations']
+    return {
+        'categories': [{'id': c['id'], 'name': c['name']} for c in coco_data['categories']],
+        'image_ids': np.array([img['id'] for img in images], dtype=np.int64),
+        'widths': np.array([img['width'] for img in images], dtype=np.float64),
+        'heights': np.array([img['height'] for img in images], dtype=np.float64),
+        'file_names': [img['file_name'] for img in images],
+        'ann_image_ids': np.array([ann['image_id'] for ann in annotations], dtype=np.int64),
+        'ann_category_ids': np.array([ann['category_id'] for ann in annotations], dtype=np.int64),
+        'ann_bboxes': np.array([ann['bbox'][:4] for ann in annotations], dtype=np.float64).reshape(-1, 4),
+    }
+
+
+def peak_rss_mb():
+    """Peak resident set size of the current process in MB (None if it cannot be determined)."""
+    try:
+        import psutil
+        info = psutil.Process().memory_info()
+        if hasattr(info, 'peak_wset'):  # Windows
+            return info.peak_wset / 2 ** 20
+    except ImportError:
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes on Linux
+    return peak / 2 ** 20 if sys.platform == 'darwin' else peak / 2 ** 10
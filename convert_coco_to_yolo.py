@@ -1,39 +1,53 @@
+import errno
+import hashlib
 import json
 import os
+import shutil
+import threading
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
 from pathlib import Path
 import numpy as np
 from PIL import Image
 
+from coco_stream import coco_tables_from_dict, peak_rss_mb, read_coco_tables
+from file_hash import file_sha256
+from label_store import label_store_path, read_label_store_meta, write_label_store
+from zip_dataset import extract_images, find_member, member_fingerprint, open_text_member
 
-def convert_coco_to_yolo(coco_json_path, images_dir, labels_output_dir, target_class_names=None):
-    """
-    Converts COCO format annotations to YOLO format label files.
+# Written into each labels directory; records what the labels were generated from
+MANIFEST_NAME = ".conversion_manifest.json"
 
-    Args:
-        coco_json_path (str or Path): Path to the COCO format annotation JSON file (e.g., instances_train2017.json).
-        images_dir (str or Path): Path to the directory containing the corresponding images.
-        labels_output_dir (str or Path): Path to the directory where YOLO format .txt labels will be saved.
-        target_class_names (list, optional): List of class names to include. E.g., ['hand']. If None, includes all.
+# Label outputs: one .txt per image, a packed store (see label_store.py), or both
+LABEL_FORMATS = ('txt', 'packed', 'both')
+
+# Smallest normalized width/height that survives the 6-decimal label format; smaller boxes are dropped
+MIN_BOX_SIZE = 1e-6
+# How boxes are clipped to the image, recorded in the manifest so labels from older conversions
+# (which clipped center and size separately) are regenerated
+BOX_CLIPPING = 'edges'
+
+
+def build_category_mapping(categories, target_class_names=None):
     """
-    # Ensure directories exist
-    os.makedirs(labels_output_dir, exist_ok=True)
+    Builds the mapping from COCO category id to YOLO class id.
 
-    # Load COCO annotations
-    with open(coco_json_path, 'r') as f:
-        coco_data = json.load(f)
+    Args:
+        categories (list): The 'categories' list from a COCO annotation file.
+        target_class_names (list, optional): Class names to keep (case-insensitive). If None, keeps all.
 
-    # Create mapping from category id to index (YOLO class id)
-    # Find categories matching target names (if provided) or use all
-    categories = coco_data['categories']
+    Returns:
+        tuple: (category_mapping {coco_category_id: yolo_class_id}, yolo_class_names list)
+    """
     category_mapping = {}
-    yolo_class_ids = []
     yolo_class_names = []
 
     if target_class_names is None:
         # Include all categories
         for cat in categories:
-            category_mapping[cat['id']] = len(category_mapping)
-            yolo_class_ids.append(len(category_mapping) - 1)
+            category_mapping[cat['id']] = len(yolo_class_names)
             yolo_class_names.append(cat['name'])
     else:
         # Only include specified target classes
@@ -42,80 +56,650 @@ def convert_coco_to_yolo(coco_json_path, images_dir, labels_output_dir, target_c
             for cat in categories:
                 if cat['name'].lower() == tgt_name.lower():  # Case-insensitive match
                     category_mapping[cat['id']] = i
-                    yolo_class_ids.append(i)
                     yolo_class_names.append(tgt_name)
                     found = True
                     break
             if not found:
                 print(
                     f"Warning: Target class '{tgt_name}' not found in COCO categories: {[c['name'] for c in categories]}")
-                # Optionally, raise an error if a target class is missing
-                # raise ValueError(f"Target class '{tgt_name}' not found in COCO categories.")
 
-    print(f"Mapping COCO categories to YOLO IDs: {category_mapping}")
-    print(f"Yolo class names: {yolo_class_names}")
+    return category_mapping, yolo_class_names
 
-    # Create a lookup for image id to image info (width, height, filename)
-    image_info_lookup = {img['id']: img for img in coco_data['images']}
 
-    # Process each annotation
-    for ann in coco_data['annotations']:
-        category_id = ann['category_id']
+def normalize_boxes(bboxes, img_widths, img_heights):
+    """
+    Converts COCO boxes (x_min, y_min, width, height in pixels) to YOLO format
+    (normalized center x, center y, width, height). The box edges are clipped to the image before the
+    center and size are computed, so a box sticking out of the image keeps only its visible part.
+    Vectorized over all boxes.
 
-        # Skip if category is not in target list (if specified)
-        if target_class_names is not None and category_id not in [cat['id'] for cat in categories if
-                                                                  cat['name'] in target_class_names]:
-            continue
+    Args:
+        bboxes (np.ndarray): Array of shape (N, 4).
+        img_widths (np.ndarray): Width of the image each box belongs to, shape (N,).
+        img_heights (np.ndarray): Height of the image each box belongs to, shape (N,).
+
+    Returns:
+        np.ndarray: Array of shape (N, 4) with normalized (x_center, y_center, width, height).
+            Boxes entirely outside the image get zero width or height (see valid_box_mask).
+    """
+    bboxes = np.asarray(bboxes, dtype=np.float64).reshape(-1, 4)
+    scale = np.stack([img_widths, img_heights, img_widths, img_heights], axis=1).astype(np.float64)
+    edges = np.empty_like(bboxes)
+    edges[:, :2] = bboxes[:, :2]
+    edges[:, 2:] = bboxes[:, :2] + bboxes[:, 2:]
+    edges /= scale
+    np.clip(edges, 0.0, 1.0, out=edges)
+    normalized = np.empty_like(edges)
+    normalized[:, :2] = (edges[:, :2] + edges[:, 2:]) / 2.0
+    normalized[:, 2:] = edges[:, 2:] - edges[:, :2]
+    return normalized
+
+
+def valid_box_mask(boxes):
+    """True for normalized boxes whose width and height are still non-zero in the written labels (6 decimals)."""
+    return (boxes[:, 2] >= MIN_BOX_SIZE) & (boxes[:, 3] >= MIN_BOX_SIZE)
 
-            # Map COCO category id to YOLO class id
-        if category_id not in category_mapping:
-            # This can happen if target_class_names was used and an unexpected category appears, or if mapping is wrong
-            print(f"Warning: Annotation with unexpected category_id {category_id} found. Skipping.")
-            continue
-        yolo_class_id = category_mapping[category_id]
 
-        # Get image info for normalization
-        image_id = ann['image_id']
-        img_info = image_info_lookup.get(image_id)
-        if not img_info:
-            print(f"Warning: No image info found for annotation image_id {image_id}. Skipping.")
+def format_label_lines(class_ids, boxes):
+    """Formats YOLO label lines: <class_id> <x_center> <y_center> <width> <height>"""
+    return "".join(f"{c} {x:.6f} {y:.6f} {w:.6f} {h:.6f}\n"
+                   for c, (x, y, w, h) in zip(class_ids.tolist(), boxes.tolist()))
+
+
+def label_filename_for(img_filename):
+    """Label file name for an image (same name, .txt extension; nested paths are flattened)."""
+    return os.path.splitext(os.path.basename(img_filename))[0] + '.txt'
+
+
+def index_coco_tables(tables, target_class_names=None):
+    """
+    Indexes COCO column arrays (see coco_stream.read_coco_tables) into compact per-image arrays.
+
+    Category ids and image ids of all annotations are resolved with vectorized lookups against the
+    precomputed category mapping and image table, then all kept boxes are normalized in a single
+    pass and grouped by image.
+
+    Returns:
+        dict with keys:
+            'class_names': YOLO class names,
+            'category_mapping': {coco_category_id: yolo_class_id},
+            'file_names': list of image file names (one per labeled image),
+            'class_ids': list of np.ndarray (per labeled image),
+            'boxes': list of np.ndarray of shape (n, 4) (per labeled image, normalized),
+            'num_images', 'num_boxes', 'skipped_category', 'skipped_no_image', 'skipped_empty_box': counts.
+    """
+    category_mapping, yolo_class_names = build_category_mapping(tables['categories'], target_class_names)
+
+    # Map category ids -> YOLO class ids (-1 = not kept)
+    ann_category_ids = tables['ann_category_ids']
+    cat_keys = np.array(sorted(category_mapping), dtype=np.int64)
+    cat_values = np.array([category_mapping[k] for k in cat_keys.tolist()], dtype=np.int64)
+    class_ids = np.full(len(ann_category_ids), -1, dtype=np.int64)
+    if len(cat_keys):
+        pos = np.searchsorted(cat_keys, ann_category_ids).clip(max=len(cat_keys) - 1)
+        found = cat_keys[pos] == ann_category_ids
+        class_ids[found] = cat_values[pos[found]]
+    kept_category = class_ids >= 0
+
+    # Map annotation image ids -> rows of the image table (-1 = unknown image)
+    image_ids = tables['image_ids']
+    image_order = np.argsort(image_ids, kind='stable')
+    sorted_ids = image_ids[image_order]
+    ann_image_ids = tables['ann_image_ids']
+    rows = np.full(len(ann_image_ids), -1, dtype=np.int64)
+    if len(sorted_ids):
+        pos = np.searchsorted(sorted_ids, ann_image_ids).clip(max=len(sorted_ids) - 1)
+        found = sorted_ids[pos] == ann_image_ids
+        rows[found] = image_order[pos[found]]
+
+    keep = kept_category & (rows >= 0)
+    return _group_by_image(rows[keep], class_ids[keep], tables['ann_bboxes'][keep],
+                           tables['widths'], tables['heights'], tables['file_names'],
+                           category_mapping, yolo_class_names,
+                           skipped_category=int((~kept_category).sum()),
+                           skipped_no_image=int((kept_category & (rows < 0)).sum()))
+
+
+def index_coco_annotations(coco_data, target_class_names=None):
+    """Same as index_coco_tables, for an already loaded COCO annotation dict."""
+    return index_coco_tables(coco_tables_from_dict(coco_data), target_class_names)
+
+
+def _group_by_image(rows, class_ids, bboxes, widths, heights, file_names, category_mapping,
+                    class_names, skipped_category, skipped_no_image):
+    """
+    Normalizes all boxes at once and groups them by image.
+
+    The result is flat: boxes of labeled image i are class_ids[offsets[i]:offsets[i + 1]] and
+    boxes[offsets[i]:offsets[i + 1]], which keeps it cheap to pickle and to slice into shards.
+    """
+    rows = np.asarray(rows, dtype=np.int64)
+    class_ids = np.asarray(class_ids, dtype=np.int64)
+    boxes = normalize_boxes(np.asarray(bboxes, dtype=np.float64).reshape(-1, 4),
+                            widths[rows], heights[rows])
+    # Boxes outside the image (or of zero size) have nothing left to label after clipping
+    valid = valid_box_mask(boxes)
+    rows, class_ids, boxes = rows[valid], class_ids[valid], boxes[valid]
+
+    # Stable sort keeps the original annotation order inside each image
+    order = np.argsort(rows, kind='stable')
+    rows, class_ids, boxes = rows[order], class_ids[order], boxes[order]
+    unique_rows, starts = np.unique(rows, return_index=True)
+
+    return {
+        'class_names': class_names,
+        'category_mapping': category_mapping,
+        'file_names': [file_names[r] for r in unique_rows.tolist()],
+        'offsets': np.append(starts, len(rows)).astype(np.int64),
+        'class_ids': class_ids,
+        'boxes': boxes,
+        'num_images': len(file_names),
+        'num_boxes': int(len(rows)),
+        'skipped_category': skipped_category,
+        'skipped_no_image': skipped_no_image,
+        'skipped_empty_box': int((~valid).sum()),
+    }
+
+
+@contextmanager
+def _open_annotations(source):
+    """
+    Opens an annotation source as a text stream. A source is either a JSON file path or a
+    (zip_path, member_name) tuple, which is streamed straight out of the archive.
+    """
+    if isinstance(source, tuple):
+        with zipfile.ZipFile(source[0]) as zf, open_text_member(zf, source[1]) as f:
+            yield f
+    else:
+        with open(source, 'r', encoding='utf-8') as f:
+            yield f
+
+
+def annotation_source_name(source):
+    """Printable name of an annotation source ('archive.zip!member' for zip members)."""
+    return '!'.join(map(str, source)) if isinstance(source, tuple) else str(source)
+
+
+def annotation_fingerprint(source):
+    """Content hash of an annotation source (SHA-256 of the file, or CRC-32/size of a zip member)."""
+    if isinstance(source, tuple):
+        with zipfile.ZipFile(source[0]) as zf:
+            return member_fingerprint(zf, source[1])
+    return 'sha256:' + file_sha256(source)
+
+
+def load_coco_index(coco_json_path, target_class_names=None):
+    """
+    Streams a COCO annotation file and returns its per-image label index (see index_coco_tables).
+    coco_json_path may also be a (zip_path, member_name) tuple.
+    """
+    with _open_annotations(coco_json_path) as f:
+        tables = read_coco_tables(f)
+    return index_coco_tables(tables, target_class_names)
+
+
+def shard_index(index, num_shards):
+    """Splits a label index into up to num_shards contiguous image ranges (each a smaller index)."""
+    num_labeled = len(index['file_names'])
+    bounds = np.linspace(0, num_labeled, min(num_shards, num_labeled) + 1).astype(np.int64)
+    shards = []
+    for a, b in zip(bounds[:-1].tolist(), bounds[1:].tolist()):
+        offsets = index['offsets'][a:b + 1]
+        lo, hi = int(offsets[0]), int(offsets[-1])
+        shards.append({
+            'file_names': index['file_names'][a:b],
+            'offsets': offsets - lo,
+            'class_ids': index['class_ids'][lo:hi],
+            'boxes': index['boxes'][lo:hi],
+        })
+    return shards
+
+
+def _atomic_write_text(path, text):
+    """Writes a file via a temporary file + rename, so readers never see a partial file."""
+    # Unique per process and thread: shard workers may write the same flattened label name at once
+    tmp_path = f"{path}.{os.getpid()}-{threading.get_ident()}.tmp"
+    with open(tmp_path, 'w') as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+def write_yolo_labels(index, labels_output_dir, previous_hashes=None):
+    """
+    Writes one label file per labeled image, each opened exactly once. Every label is written
+    atomically (temporary file + rename), so an interrupted run never leaves a truncated label.
+
+    Args:
+        index (dict): Label index (or a shard of one).
+        labels_output_dir (str or Path): Output directory.
+        previous_hashes (dict, optional): {label_name: content hash} from the last conversion; labels whose
+            content hash is unchanged and whose file still exists are not rewritten.
+
+    Returns:
+        dict: {'written': n, 'unchanged': n, 'hashes': {label_name: content hash}}
+    """
+    os.makedirs(labels_output_dir, exist_ok=True)
+    previous_hashes = previous_hashes or {}
+    offsets = index['offsets']
+    hashes = {}
+    written = unchanged = 0
+    for i, file_name in enumerate(index['file_names']):
+        a, b = offsets[i], offsets[i + 1]
+        label_name = label_filename_for(file_name)
+        content = format_label_lines(index['class_ids'][a:b], index['boxes'][a:b])
+        digest = hashlib.sha1(content.encode('ascii')).hexdigest()
+        hashes[label_name] = digest
+        label_path = os.path.join(labels_output_dir, label_name)
+        previous = previous_hashes.get(label_name)
+        if previous == digest and os.path.exists(label_path):
+            unchanged += 1
             continue
+        _atomic_write_text(label_path, content)
+        written += 1
+    return {'written': written, 'unchanged': unchanged, 'hashes': hashes}
+
+
+def _print_index_info(name, index, target_class_names):
+    print(f"[{name}] Mapping COCO categories to YOLO IDs: {index['category_mapping']}")
+    print(f"[{name}] Yolo class names: {index['class_names']}")
+    if index['skipped_no_image']:
+        print(f"[{name}] Warning: {index['skipped_no_image']} annotations reference unknown image ids. Skipped.")
+    if index['skipped_empty_box']:
+        print(f"[{name}] Warning: {index['skipped_empty_box']} boxes are empty after clipping to the image. Skipped.")
+    if index['skipped_category'] and target_class_names is None:
+        print(f"[{name}] Warning: {index['skipped_category']} annotations have unexpected category ids. Skipped.")
+
+
+def _manifest_path(labels_output_dir):
+    return os.path.join(labels_output_dir, MANIFEST_NAME)
 
-        img_width = img_info['width']
-        img_height = img_info['height']
 
-        # Extract bounding box coordinates (x_min, y_min, width, height)
-        bbox = ann['bbox']
-        x_min, y_min, width, height = bbox
+def load_conversion_manifest(labels_output_dir):
+    """Reads the manifest left by the last conversion into labels_output_dir (None if there is none)."""
+    try:
+        with open(_manifest_path(labels_output_dir), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _is_current(record, annotation_hash, target_class_names):
+    return (record is not None and record.get('annotation_hash') == annotation_hash
+            and record.get('target_class_names') == target_class_names
+            and record.get('box_clipping') == BOX_CLIPPING)
+
+
+def _prepare_split(coco_json_path, labels_output_dir, target_class_names, label_format='txt'):
+    """
+    Hashes the annotation file and compares it with the previous manifest (and packed store). Returns
+    the label index, or None for the index when the split is already up to date (same annotation file
+    and classes, all recorded label files present, packed store current).
+
+    In 'packed' mode the .txt manifest is not used; the store's metadata is returned in its place.
+    """
+    annotation_hash = annotation_fingerprint(coco_json_path)
+    manifest = load_conversion_manifest(labels_output_dir)
+    store_meta = read_label_store_meta(label_store_path(labels_output_dir)) if label_format != 'txt' else None
+
+    txt_current = True
+    if label_format != 'packed':
+        txt_current = _is_current(manifest, annotation_hash, target_class_names)
+        if txt_current:
+            existing = set(os.listdir(labels_output_dir))
+            txt_current = all(name in existing for name in manifest['labels'])
+    store_current = label_format == 'txt' or _is_current(store_meta, annotation_hash, target_class_names)
+
+    if label_format == 'packed':
+        manifest = store_meta
+    if txt_current and store_current:
+        return annotation_hash, manifest, None
+    return annotation_hash, manifest, load_coco_index(coco_json_path, target_class_names)
+
+
+def _finish_split(coco_json_path, labels_output_dir, target_class_names, annotation_hash, manifest, index, results,
+                  label_format='txt'):
+    """Writes the packed store, removes stale labels, writes the new manifest and returns the split summary."""
+    store_dir = label_store_path(labels_output_dir) if label_format != 'txt' else None
+    if index is None:
+        num_labels = len(manifest['labels']) if label_format != 'packed' else 0
+        return {
+            'labels_dir': str(labels_output_dir), 'label_format': label_format, 'label_store': store_dir,
+            'up_to_date': True,
+            'images': manifest.get('num_images', 0),
+            'labeled_images': manifest.get('num_labeled_images', num_labels),
+            'label_files_written': 0, 'label_files_unchanged': num_labels, 'label_files_removed': 0,
+            'label_name_collisions': 0, 'boxes': manifest.get('num_boxes', 0),
+            'skipped_category': manifest.get('skipped_category', 0),
+            'skipped_no_image': manifest.get('skipped_no_image', 0),
+            'skipped_empty_box': manifest.get('skipped_empty_box', 0),
+        }
+
+    summary = _split_summary(index, sum(r['written'] for r in results), labels_output_dir)
+    summary.update(up_to_date=False, label_format=label_format, label_store=store_dir,
+                   label_files_unchanged=0, label_files_removed=0)
+    if store_dir is not None:
+        write_label_store(index, store_dir, annotation_file=annotation_source_name(coco_json_path),
+                          annotation_hash=annotation_hash, target_class_names=target_class_names,
+                          num_images=summary['images'], skipped_category=summary['skipped_category'],
+                          skipped_no_image=summary['skipped_no_image'],
+                          skipped_empty_box=summary['skipped_empty_box'], box_clipping=BOX_CLIPPING)
+    if label_format == 'packed':
+        return summary
+
+    hashes = {}
+    for result in results:
+        hashes.update(result['hashes'])
+
+    # Labels produced before but not now: the image disappeared or lost all of its boxes.
+    # Without a manifest, every .txt in the output directory counts as a previous output.
+    if manifest is not None:
+        previous_labels = manifest['labels']
+    else:
+        previous_labels = [n for n in os.listdir(labels_output_dir) if n.endswith('.txt')]
+    removed = 0
+    for label_name in previous_labels:
+        if label_name not in hashes:
+            try:
+                os.remove(os.path.join(labels_output_dir, label_name))
+                removed += 1
+            except FileNotFoundError:
+                pass
+
+    summary.update(label_files_unchanged=sum(r['unchanged'] for r in results), label_files_removed=removed)
+    _atomic_write_text(_manifest_path(labels_output_dir), json.dumps({
+        'annotation_file': annotation_source_name(coco_json_path),
+        'annotation_hash': annotation_hash,
+        'target_class_names': target_class_names,
+        'num_images': summary['images'],
+        'num_boxes': summary['boxes'],
+        'skipped_category': summary['skipped_category'],
+        'skipped_no_image': summary['skipped_no_image'],
+        'skipped_empty_box': summary['skipped_empty_box'],
+        'box_clipping': BOX_CLIPPING,
+        'labels': hashes,
+    }))
+    return summary
+
+
+def _split_summary(index, num_written, labels_output_dir):
+    """Per-split counts plus consistency checks on what was written."""
+    label_names = [label_filename_for(f) for f in index['file_names']]
+    return {
+        'labels_dir': str(labels_output_dir),
+        'images': index['num_images'],
+        'labeled_images': len(index['file_names']),
+        'label_files_written': num_written,
+        # Images whose flattened label names collide overwrite each other's labels
+        'label_name_collisions': len(label_names) - len(set(label_names)),
+        'boxes': index['num_boxes'],
+        'skipped_category': index['skipped_category'],
+        'skipped_no_image': index['skipped_no_image'],
+        'skipped_empty_box': index['skipped_empty_box'],
+    }
+
+
+def convert_splits(splits, target_class_names=None, num_workers=None, shards_per_worker=4, label_format='txt'):
+    """
+    Converts several COCO annotation files (e.g. train and val) concurrently with a process pool.
+
+    Each split is streamed and indexed in its own worker process; as soon as a split's index is
+    ready its images are cut into shards and every worker writes the label files of its own shard,
+    so one split can be writing while another is still being parsed.
 
-        # Convert to YOLO format (normalized center x, center y, width, height)
-        x_center = (x_min + width / 2.0) / img_width
-        y_center = (y_min + height / 2.0) / img_height
-        norm_width = width / img_width
-        norm_height = height / img_height
+    Conversion is incremental: each labels directory keeps a manifest with the annotation file hash
+    and a hash per label file. An unchanged annotation file is skipped entirely, otherwise only labels
+    whose content changed are rewritten (atomically), and labels of images that disappeared are removed.
 
-        # Ensure coordinates are within bounds [0, 1]
-        x_center = max(0.0, min(1.0, x_center))
-        y_center = max(0.0, min(1.0, y_center))
-        norm_width = max(0.0, min(1.0, norm_width))
-        norm_height = max(0.0, min(1.0, norm_height))
+    Args:
+        splits (dict): {split_name: (coco_json_path, labels_output_dir)}; coco_json_path may be a
+            (zip_path, member_name) tuple to read the annotations straight from the dataset archive.
+        target_class_names (list, optional): Class names to keep. If None, keeps all.
+        num_workers (int, optional): Worker processes (default: os.cpu_count()). 1 runs inline.
+        shards_per_worker (int): Label-writing shards per worker, for load balancing.
+        label_format (str): 'txt' (one label file per image), 'packed' (a single memory-mappable
+            store in <labels_dir>.pack, see label_store.py) or 'both'.
+
+    Returns:
+        dict: {split_name: summary dict} (see _split_summary).
+    """
+    if label_format not in LABEL_FORMATS:
+        raise ValueError(f"Unknown label_format '{label_format}', expected one of {LABEL_FORMATS}")
+    write_txt = label_format != 'packed'
+    num_workers = num_workers or os.cpu_count() or 1
+    for _, labels_dir in splits.values():
+        os.makedirs(labels_dir, exist_ok=True)
+
+    if num_workers <= 1:
+        summaries = {}
+        for name, (json_path, labels_dir) in splits.items():
+            print(f"Processing {name} annotations: {annotation_source_name(json_path)}")
+            annotation_hash, manifest, index = _prepare_split(json_path, labels_dir, target_class_names,
+                                                              label_format)
+            results = []
+            if index is not None:
+                _print_index_info(name, index, target_class_names)
+                if write_txt:
+                    results.append(write_yolo_labels(index, labels_dir, manifest and manifest['labels']))
+            summaries[name] = _finish_split(json_path, labels_dir, target_class_names,
+                                            annotation_hash, manifest, index, results, label_format)
+        return summaries
+
+    with ProcessPoolExecutor(max_workers=num_workers) as pool:
+        prepare_futures = {}
+        for name, (json_path, labels_dir) in splits.items():
+            print(f"Processing {name} annotations: {annotation_source_name(json_path)}")
+            future = pool.submit(_with_peak_rss, _prepare_split, json_path, labels_dir, target_class_names,
+                                 label_format)
+            prepare_futures[future] = name
+
+        prepared = {}
+        write_futures = {}
+        worker_rss = []
+        for future in as_completed(prepare_futures):
+            name = prepare_futures[future]
+            prepared[name], rss = future.result()
+            worker_rss.append(rss)
+            annotation_hash, manifest, index = prepared[name]
+            if index is None:
+                continue
+            _print_index_info(name, index, target_class_names)
+            if not write_txt:
+                continue
+            previous_hashes = manifest['labels'] if manifest else {}
+            for shard in shard_index(index, num_workers * shards_per_worker):
+                shard_hashes = {n: previous_hashes[n] for n in map(label_filename_for, shard['file_names'])
+                                if n in previous_hashes}
+                future = pool.submit(_with_peak_rss, write_yolo_labels, shard, splits[name][1], shard_hashes)
+                write_futures[future] = name
+
+        results = {name: [] for name in splits}
+        for future in as_completed(write_futures):
+            result, rss = future.result()
+            results[write_futures[future]].append(result)
+            worker_rss.append(rss)
+
+    summaries = {name: _finish_split(*splits[name], target_class_names, *prepared[name], results[name], label_format)
+                 for name in splits}
+    # Parsing and writing ran in the workers, so the main process' peak RSS alone would miss them
+    worker_peak = max((rss for rss in worker_rss if rss is not None), default=None)
+    for summary in summaries.values():
+        summary['worker_peak_rss_mb'] = worker_peak
+    return summaries
+
+
+def _with_peak_rss(fn, *args):
+    """Runs fn in a pool worker and also returns the worker's peak RSS in MB (not visible to the parent)."""
+    return fn(*args), peak_rss_mb()
+
+
+def print_conversion_summary(summaries):
+    print("\n--- Conversion Consistency Summary ---")
+    for name, summary in summaries.items():
+        # Packed-only conversion writes no label files
+        expected_files = 0 if summary.get('label_format') == 'packed' else summary['labeled_images']
+        ok = (summary['label_files_written'] + summary['label_files_unchanged'] == expected_files
+              and summary['label_name_collisions'] == 0)
+        if summary['up_to_date']:
+            print(f"[{name}] Annotation file unchanged, labels are up to date -> {summary['labels_dir']}")
+        print(f"[{name}] {summary['images']} images, {summary['labeled_images']} labeled, {summary['boxes']} boxes; "
+              f"label files: {summary['label_files_written']} written, {summary['label_files_unchanged']} unchanged, "
+              f"{summary['label_files_removed']} removed -> {summary['labels_dir']}")
+        if summary.get('label_store'):
+            print(f"[{name}] Packed label store -> {summary['label_store']}")
+        print(f"[{name}] skipped annotations: {summary['skipped_category']} (category), "
+              f"{summary['skipped_no_image']} (unknown image id), "
+              f"{summary.get('skipped_empty_box', 0)} (empty after clipping); "
+              f"label name collisions: {summary['label_name_collisions']} "
+              f"{'OK' if ok else 'MISMATCH'}")
+    rss = peak_rss_mb()
+    if rss is not None:
+        print(f"Peak RSS (main process): {rss:.1f} MB")
+    worker_peaks = [s['worker_peak_rss_mb'] for s in summaries.values() if s.get('worker_peak_rss_mb') is not None]
+    if worker_peaks:
+        print(f"Peak RSS (largest worker process): {max(worker_peaks):.1f} MB")
+
+
+def convert_coco_to_yolo(coco_json_path, images_dir, labels_output_dir, target_class_names=None, num_workers=1,
+                         label_format='txt'):
+    """
+    Converts COCO format annotations to YOLO format label files.
 
-        # Determine the output label filename (same as image name, change extension to .txt)
-        img_filename = img_info['file_name']
-        # Handle potential nested paths in file_name
-        img_path_obj = Path(img_filename)
-        label_filename = img_path_obj.with_suffix('.txt').name
-        label_path = os.path.join(labels_output_dir, label_filename)
+    Args:
+        coco_json_path (str or Path): Path to the COCO format annotation JSON file (e.g., instances_train2017.json).
+        images_dir (str or Path): Path to the directory containing the corresponding images.
+        labels_output_dir (str or Path): Path to the directory where YOLO format .txt labels will be saved.
+        target_class_names (list, optional): List of class names to include. E.g., ['hand']. If None, includes all.
+        num_workers (int): Processes used to write label files. 1 (default) converts in this process.
+        label_format (str): 'txt', 'packed' (single store in <labels_output_dir>.pack) or 'both'.
 
-        # Append the label line to the corresponding .txt file
-        # Format: <class_id> <x_center> <y_center> <width> <height>
-        label_line = f"{yolo_class_id} {x_center:.6f} {y_center:.6f} {norm_width:.6f} {norm_height:.6f}\n"
+    Returns:
+        dict: Conversion summary (labeled images, boxes written, skipped annotations).
+    """
+    summary = convert_splits({'labels': (coco_json_path, labels_output_dir)},
+                             target_class_names, num_workers, label_format=label_format)['labels']
+
+    print(f"Conversion complete for {annotation_source_name(coco_json_path)}. Labels saved to: {labels_output_dir}")
+    # With num_workers > 1 the annotations are parsed in a worker process; report the larger peak
+    summary['peak_rss_mb'] = max((rss for rss in (peak_rss_mb(), summary.get('worker_peak_rss_mb'))
+                                  if rss is not None), default=None)
+    if label_format != 'packed':
+        print(f"  {summary['labeled_images']} label files ({summary['label_files_written']} written, "
+              f"{summary['label_files_unchanged']} unchanged, {summary['label_files_removed']} removed), "
+              f"{summary['boxes']} boxes ({summary['images']} images in annotation file)")
+    if summary['label_store']:
+        print(f"  Packed label store: {summary['label_store']} ({summary['labeled_images']} labeled images, "
+              f"{summary['boxes']} boxes)")
+    if summary['peak_rss_mb'] is not None:
+        print(f"  Peak RSS so far: {summary['peak_rss_mb']:.1f} MB")
+    return summary
+
+
+def _reflink(src, dst):
+    """Copy-on-write clone (Linux FICLONE: btrfs, XFS with reflink=1, ...). Raises OSError if unsupported."""
+    try:
+        import fcntl
+    except ImportError:
+        raise OSError(errno.ENOTSUP, "reflink is not supported on this platform")
+    FICLONE = 0x40049409
+    with open(src, 'rb') as f_src, open(dst, 'wb') as f_dst:
+        try:
+            fcntl.ioctl(f_dst.fileno(), FICLONE, f_src.fileno())
+        except OSError:
+            f_dst.close()
+            os.remove(dst)
+            raise
+    shutil.copystat(src, dst)
+
+
+_STAGE_METHODS = {
+    'hardlink': os.link,
+    'reflink': _reflink,
+    'symlink': lambda src, dst: os.symlink(os.path.abspath(src), dst),
+    'copy': shutil.copy2,
+}
+
+# Staging modes and the methods they try, in order
+STAGE_MODES = {
+    'auto': ['hardlink', 'reflink', 'copy'],
+    'hardlink': ['hardlink', 'copy'],
+    'reflink': ['reflink', 'copy'],
+    'symlink': ['symlink', 'copy'],
+    'copy': ['copy'],
+}
+
+
+def _is_staged(src_entry, dst):
+    """True if dst already holds src (same file, a symlink to it, or a copy with equal size and mtime)."""
+    try:
+        if os.path.islink(dst):
+            return os.readlink(dst) == os.path.abspath(src_entry.path)
+        dst_stat = os.stat(dst)
+    except OSError:
+        return False
+    src_stat = src_entry.stat()
+    if (dst_stat.st_dev, dst_stat.st_ino) == (src_stat.st_dev, src_stat.st_ino):
+        return True
+    return dst_stat.st_size == src_stat.st_size and int(dst_stat.st_mtime) == int(src_stat.st_mtime)
+
+
+def stage_images(src_dir, dst_dir, mode='auto', num_workers=16):
+    """
+    Puts the images of src_dir into dst_dir without duplicating them on disk when possible.
 
-        # Use 'a' mode to append if multiple objects exist in one image
-        with open(label_path, 'a') as f_label:
-            f_label.write(label_line)
+    Each file is hardlinked, reflinked or symlinked (depending on mode), falling back to a copy when
+    the filesystem does not allow it. Files already staged (same inode/link target, or equal size and
+    mtime) are skipped, so reruns only touch new or changed images. Work is spread over a thread pool.
 
-    print(f"Conversion complete for {coco_json_path}. Labels saved to: {labels_output_dir}")
+    Args:
+        src_dir (str or Path): Source image directory (e.g. train2017).
+        dst_dir (str or Path): Destination directory (e.g. converted/train/images).
+        mode (str): One of STAGE_MODES: 'auto' (hardlink -> reflink -> copy), 'hardlink', 'reflink',
+            'symlink' or 'copy'.
+        num_workers (int): Threads used for linking/copying.
+
+    Returns:
+        dict: Number of files per method used, plus 'skipped' and 'failed'.
+    """
+    if mode not in STAGE_MODES:
+        raise ValueError(f"Unknown staging mode '{mode}', expected one of {list(STAGE_MODES)}")
+    os.makedirs(dst_dir, exist_ok=True)
+    methods = list(STAGE_MODES[mode])
+    counts = {name: 0 for name in methods}
+    counts.update(skipped=0, failed=0)
+    lock = threading.Lock()
+
+    def stage_one(entry):
+        dst = os.path.join(dst_dir, entry.name)
+        if _is_staged(entry, dst):
+            return 'skipped'
+        if os.path.lexists(dst):
+            os.remove(dst)  # Stale copy or link from an older source file
+        for name in list(methods):
+            try:
+                _STAGE_METHODS[name](entry.path, dst)
+                return name
+            except OSError:
+                if name == 'copy':
+                    raise
+                # Not supported between these locations; stop trying it for the remaining files
+                with lock:
+                    if name in methods and len(methods) > 1:
+                        methods.remove(name)
+        return 'failed'
+
+    with os.scandir(src_dir) as it:
+        entries = [entry for entry in it if entry.is_file()]
+
+    with ThreadPoolExecutor(max_workers=num_workers) as pool:
+        futures = {pool.submit(stage_one, entry): entry for entry in entries}
+        for future in as_completed(futures):
+            try:
+                result = future.result()
+            except OSError as e:
+                print(f"Warning: Failed to stage {futures[future].path}: {e}")
+                result = 'failed'
+            counts[result] += 1
+    return counts
 
 
 def main():
@@ -131,6 +715,9 @@ def main():
     train_images_dir = base_data_dir / "train2017"
     val_images_dir = base_data_dir / "val2017"
 
+    # The original archive; used directly (no manual unzip) when the folders above do not exist
+    zip_path = base_data_dir / "to_coco.zip"
+
     # Output directories for YOLO format labels and images (relative to base_data_dir or absolute)
     # We'll create a new folder structure: converted_yolo/train/images, converted_yolo/train/labels, etc.
     output_base_dir = base_data_dir.parent / "hand_detection_dataset_converted"  # Or wherever you prefer
@@ -143,6 +730,18 @@ def main():
     # Check your instances_*.json file under "categories".
     target_class_names = ["hand"]  # Modify this if the category name in your JSON is different
 
+    # Number of worker processes for conversion (None = all CPU cores)
+    num_workers = None
+
+    # Label output: 'txt' (one file per image, what ultralytics reads), 'packed' (one memory-mappable
+    # store per split in labels.pack, see label_store.py) or 'both'
+    label_format = 'both'
+
+    # How images are put into the output folders: 'auto' (hardlink -> reflink -> copy),
+    # 'hardlink', 'reflink', 'symlink' or 'copy'. Linking uses no extra disk space.
+    stage_mode = 'auto'
+    stage_workers = 16
+
     print("Starting COCO to YOLO conversion...")
     print(f"Output will be saved to: {output_base_dir}")
 
@@ -152,47 +751,60 @@ def main():
     os.makedirs(train_images_output_dir, exist_ok=True)
     os.makedirs(val_images_output_dir, exist_ok=True)
 
-    # Convert Training Annotations
-    print(f"Processing training annotations: {train_annotations_path}")
-    convert_coco_to_yolo(
-        coco_json_path=train_annotations_path,
-        images_dir=train_images_dir,
-        labels_output_dir=train_labels_output_dir,
-        target_class_names=target_class_names
+    # Read annotations and images straight from the archive if it has not been extracted
+    use_zip = not (train_annotations_path.exists() and val_annotations_path.exists()) and zip_path.exists()
+    if use_zip:
+        print(f"Annotation files not found, reading directly from archive: {zip_path}")
+        with zipfile.ZipFile(zip_path) as zf:
+            train_member = find_member(zf, "instances_train2017.json")
+            val_member = find_member(zf, "instances_val2017.json")
+        if train_member is None or val_member is None:
+            print(f"Error: annotation files not found in {zip_path}")
+            return
+        train_annotations_path = (str(zip_path), train_member)
+        val_annotations_path = (str(zip_path), val_member)
+
+    # Convert Training and Validation Annotations concurrently
+    # (set num_workers=1 to convert sequentially in this process)
+    summaries = convert_splits(
+        {
+            'train': (train_annotations_path, train_labels_output_dir),
+            'validation': (val_annotations_path, val_labels_output_dir),
+        },
+        target_class_names=target_class_names,
+        num_workers=num_workers,
+        label_format=label_format,
     )
+    print_conversion_summary(summaries)
 
-    # Convert Validation Annotations
-    print(f"Processing validation annotations: {val_annotations_path}")
-    convert_coco_to_yolo(
-        coco_json_path=val_annotations_path,
-        images_dir=val_images_dir,
-        labels_output_dir=val_labels_output_dir,
-        target_class_names=target_class_names
-    )
-
-    # Copy Images (this part handles moving the images to the expected YOLO structure)
-    import shutil
-    print("\nCopying images to the new YOLO structure...")
-    print(f"Copying train images from {train_images_dir} to {train_images_output_dir}")
-    for img_file in train_images_dir.glob('*'):
-        if img_file.is_file():
-            shutil.copy2(img_file, train_images_output_dir / img_file.name)
-
-    print(f"Copying val images from {val_images_dir} to {val_images_output_dir}")
-    for img_file in val_images_dir.glob('*'):
-        if img_file.is_file():
-            shutil.copy2(img_file, val_images_output_dir / img_file.name)
-
-    print("\n--- Conversion and Copying Summary ---")
-    print(f"Converted labels and copied images are saved in: {output_base_dir}")
+    # Stage Images into the expected YOLO structure (hardlink/reflink when possible, copy otherwise;
+    # files that are already in place are skipped, so reruns finish quickly)
+    if use_zip:
+        print("\nExtracting images from the archive into the new YOLO structure...")
+    else:
+        print(f"\nStaging images into the new YOLO structure (mode: {stage_mode})...")
+    for src_dir, dst_dir in ((train_images_dir, train_images_output_dir), (val_images_dir, val_images_output_dir)):
+        start = time.time()
+        if use_zip:
+            counts = extract_images(zip_path, src_dir.name, dst_dir, num_workers=stage_workers)
+            src_dir = f"{zip_path}!{src_dir.name}"
+        else:
+            counts = stage_images(src_dir, dst_dir, mode=stage_mode, num_workers=stage_workers)
+        done = ", ".join(f"{k}: {v}" for k, v in counts.items() if v)
+        print(f"Staged {src_dir} -> {dst_dir} in {time.time() - start:.1f}s ({done or 'no files'})")
+
+    print("\n--- Conversion and Staging Summary ---")
+    print(f"Converted labels and staged images are saved in: {output_base_dir}")
     print("Final directory structure:")
     print(f"  {output_base_dir}")
     print(f"  ├── train/")
-    print(f"  │   ├── images -> Contains images copied from {train_images_dir}")
-    print(f"  │   └── labels -> Contains .txt files converted from {train_annotations_path}")
+    print(f"  │   ├── images -> Contains images staged from {train_images_dir}")
+    print(f"  │   └── labels -> Contains .txt files converted from {annotation_source_name(train_annotations_path)}")
     print(f"  └── validation/")
-    print(f"      ├── images -> Contains images copied from {val_images_dir}")
-    print(f"      └── labels -> Contains .txt files converted from {val_annotations_path}")
+    print(f"      ├── images -> Contains images staged from {val_images_dir}")
+    print(f"      └── labels -> Contains .txt files converted from {annotation_source_name(val_annotations_path)}")
+    if label_format != 'txt':
+        print(f"  (packed label stores: train/labels.pack, validation/labels.pack)")
     print("\nThis structure is ready for the training script.")
 
 
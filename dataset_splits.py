@@ -0,0 +1,211 @@
+"""
+Train/val splits as image list files instead of physical copies of the dataset.
+
+ultralytics accepts a .txt file with one image path per line wherever a folder is expected, and finds
+each image's labels by swapping the /images/ part of its path for /labels/. A split is therefore just
+two small text files pointing into the existing images folders: new splits and k-fold variants cost
+seconds and no extra disk space.
+
+Splits are seeded and can be stratified by hands per image and typical box size, so every split gets
+the same mix of empty, single-hand and crowded images and of small and large hands.
+"""
+
+import os
+import random
+
+import yaml
+
+from image_shards import IMAGE_EXTENSIONS
+from label_store import LabelStore, label_store_path
+
+# Stratum boundaries: hands per image and the median box area (fraction of the image area)
+HAND_COUNT_BINS = (0, 1, 2, 3)  # 0, 1, 2, 3+ hands
+BOX_AREA_BINS = (0.01, 0.05)  # small < 1% <= medium < 5% <= large
+
+
+def labels_dir_for(images_dir):
+    """Label folder ultralytics uses for an image folder (last /images/ replaced by /labels/)."""
+    head, tail = os.path.split(os.path.normpath(images_dir))
+    return os.path.join(head, 'labels') if tail == 'images' else images_dir
+
+
+def _read_txt_boxes(label_path):
+    """(cx, cy, w, h) of every well-formed line; malformed lines are left to check_dataset.py to report."""
+    boxes = []
+    try:
+        with open(label_path, 'r') as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) != 5:
+                    continue
+                try:
+                    boxes.append(tuple(map(float, parts[1:])))
+                except ValueError:
+                    continue
+    except OSError:
+        pass
+    return boxes
+
+
+def collect_images(images_dirs):
+    """
+    Lists the images of one or more folders with their box sizes.
+
+    Labels are read from the packed label store (<labels>.pack) when it exists, otherwise from the
+    .txt files. Returns a list of (image_path, [box area, ...]) sorted by path.
+    """
+    items = []
+    for images_dir in images_dirs:
+        labels_dir = labels_dir_for(images_dir)
+        store = None
+        if os.path.isdir(label_store_path(labels_dir)):
+            try:
+                store = LabelStore(label_store_path(labels_dir))
+            except FileNotFoundError:
+                store = None
+        for entry in os.scandir(images_dir):
+            if not (entry.is_file() and entry.name.lower().endswith(IMAGE_EXTENSIONS)):
+                continue
+            if store is not None:
+                labels = store.get(entry.name)
+                areas = [] if labels is None else (labels[:, 3] * labels[:, 4]).tolist()
+            else:
+                label_path = os.path.join(labels_dir, os.path.splitext(entry.name)[0] + '.txt')
+                areas = [w * h for _, _, w, h in _read_txt_boxes(label_path)]
+            items.append((os.path.abspath(entry.path), areas))
+    items.sort()
+    return items
+
+
+def stratum_of(areas):
+    """(hand count bin, box size bin) of one image; images without hands form their own size bin."""
+    count_bin = sum(len(areas) >= b for b in HAND_COUNT_BINS[1:])
+    if not areas:
+        return count_bin, -1
+    median = sorted(areas)[len(areas) // 2]
+    return count_bin, sum(median >= b for b in BOX_AREA_BINS)
+
+
+def _strata(items, stratify):
+    groups = {}
+    for path, areas in items:
+        groups.setdefault(stratum_of(areas) if stratify else None, []).append(path)
+    return [groups[key] for key in sorted(groups, key=str)]
+
+
+def split_train_val(items, val_fraction=0.2, seed=0, stratify=True):
+    """
+    Seeded random split. With stratify=True each stratum is split separately, so train and val get
+    the same distribution of hands per image and box sizes.
+
+    Returns:
+        (train_paths, val_paths), both sorted
+    """
+    rng = random.Random(seed)
+    train, val = [], []
+    for paths in _strata(items, stratify):
+        paths = paths[:]
+        rng.shuffle(paths)
+        num_val = int(round(len(paths) * val_fraction))
+        val.extend(paths[:num_val])
+        train.extend(paths[num_val:])
+    return sorted(train), sorted(val)
+
+
+def kfold_splits(items, k=5, seed=0, stratify=True):
+    """
+    Seeded (stratified) k-fold assignment: every image is in the val part of exactly one fold.
+
+    Returns:
+        list of k (train_paths, val_paths) tuples
+    """
+    rng = random.Random(seed)
+    folds = [[] for _ in range(k)]
+    offset = 0
+    for paths in _strata(items, stratify):
+        paths = paths[:]
+        rng.shuffle(paths)
+        # Continue the round robin across strata so fold sizes differ by at most one image
+        for i, path in enumerate(paths):
+            folds[(offset + i) % k].append(path)
+        offset += len(paths)
+    return [(sorted(p for j, fold in enumerate(folds) if j != i for p in fold), sorted(folds[i])) for i in range(k)]
+
+
+def write_image_list(paths, list_path):
+    os.makedirs(os.path.dirname(os.path.abspath(list_path)), exist_ok=True)
+    with open(list_path, 'w', encoding='utf-8') as f:
+        f.write("".join(p.replace('\\', '/') + "\n" for p in paths))
+    return list_path
+
+
+def write_split_lists(train_paths, val_paths, lists_dir, name):
+    """Writes <lists_dir>/<name>_train.txt and <name>_val.txt, returns both paths."""
+    return (write_image_list(train_paths, os.path.join(lists_dir, f"{name}_train.txt")),
+            write_image_list(val_paths, os.path.join(lists_dir, f"{name}_val.txt")))
+
+
+def write_dataset_yaml(yaml_path, data_dir, train, val, names=('hand',), test=''):
+    """Dataset YAML for ultralytics; train/val may be folders or list files (relative to data_dir or absolute)."""
+    dataset_config = {
+        'path': data_dir,
+        'train': train,
+        'val': val,
+        'test': test,
+        'nc': len(names),
+        'names': list(names),
+    }
+    with open(yaml_path, 'w', encoding='utf-8') as f:
+        yaml.dump(dataset_config, f, default_flow_style=False)
+    return yaml_path
+
+
+def split_summary(items, train_paths, val_paths):
+    """Image counts, boxes and stratum shares per split (for checking that a split is balanced)."""
+    areas_of = dict(items)
+    summary = {}
+    for name, paths in (('train', train_paths), ('val', val_paths)):
+        strata = {}
+        for path in paths:
+            key = stratum_of(areas_of[path])
+            strata[key] = strata.get(key, 0) + 1
+        summary[name] = {
+            'images': len(paths),
+            'boxes': sum(len(areas_of[p]) for p in paths),
+            'strata': {f"{c}h/{s}": round(n / max(len(paths), 1), 3) for (c, s), n in sorted(strata.items())},
+        }
+    return summary
+
+
+def main():
+    # --- Configuration ---
+    dataset_root_dir = "D:/Python_Files/Personal_projects/YOLOv8/hand_detection_dataset_converted"
+    # Image folders forming the pool that is split (labels are found next to them)
+    pool_dirs = [os.path.join(dataset_root_dir, 'train', 'images'),
+                 os.path.join(dataset_root_dir, 'validation', 'images')]
+    lists_dir = os.path.join(dataset_root_dir, 'lists')
+    val_fraction = 0.2
+    seed = 0
+    stratify = True
+    num_folds = 5  # Also write k-fold variants (0 = only the single split)
+
+    print(f"Collecting images from {len(pool_dirs)} folder(s)...")
+    items = collect_images(pool_dirs)
+    print(f"Found {len(items)} images")
+
+    train_paths, val_paths = split_train_val(items, val_fraction, seed, stratify)
+    train_list, val_list = write_split_lists(train_paths, val_paths, lists_dir, f"split_seed{seed}")
+    yaml_path = write_dataset_yaml(f"hand_detection_split_seed{seed}.yaml", dataset_root_dir, train_list, val_list)
+    print(f"Split seed={seed}: {len(train_paths)} train / {len(val_paths)} val -> {yaml_path}")
+    for name, stats in split_summary(items, train_paths, val_paths).items():
+        print(f"  {name}: {stats['images']} images, {stats['boxes']} boxes, strata {stats['strata']}")
+
+    for fold, (fold_train, fold_val) in enumerate(kfold_splits(items, num_folds, seed, stratify) if num_folds else []):
+        train_list, val_list = write_split_lists(fold_train, fold_val, lists_dir, f"fold{fold}of{num_folds}")
+        yaml_path = write_dataset_yaml(f"hand_detection_fold{fold}of{num_folds}.yaml", dataset_root_dir,
+                                       train_list, val_list)
+        print(f"Fold {fold}/{num_folds}: {len(fold_train)} train / {len(fold_val)} val -> {yaml_path}")
+
+
+if __name__ == "__main__":
+    main()
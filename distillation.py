@@ -0,0 +1,140 @@
+"""
+Knowledge distillation: a larger trained hand detector (teacher) guides the training of a smaller or
+lower-resolution student.
+
+The teacher runs on the same augmented batch as the student, and the student is additionally trained
+to reproduce the teacher's dense head outputs at every anchor:
+    class KD   BCE between student and teacher class probabilities (temperature-softened), averaged over
+               all anchors, so the student also learns where the teacher sees *no* hand
+    box KD     KL divergence between the student's and teacher's DFL box distributions, weighted by the
+               teacher's confidence, so it concentrates on anchors that cover hands
+Teacher and student must share the head layout (YOLO11/YOLOv8 detect heads, same strides, reg_max and
+number of classes). A reduced-resolution student simply trains at a smaller imgsz; the teacher then
+sees the same small images.
+
+Only the training copy of the student gets the distillation loss; the EMA copy that is validated and
+saved keeps the standard loss, so checkpoints contain no teacher and load like any other weights.
+"""
+
+import torch
+import torch.nn.functional as F
+from ultralytics import YOLO
+from ultralytics.utils.loss import v8DetectionLoss
+
+
+class DistillationLoss(v8DetectionLoss):
+    """Detection loss of the student plus distillation terms against the teacher's outputs."""
+
+    def __init__(self, model, teacher, distill_weight=1.0, temperature=2.0, box_weight=1.0, cls_weight=1.0):
+        super().__init__(model)
+        self.teacher = teacher
+        self.distill_weight = distill_weight
+        self.temperature = temperature
+        self.box_weight = box_weight
+        self.cls_weight = cls_weight
+        self.kd_sum = 0.0
+        self.kd_batches = 0
+
+    def distill(self, student_feats, teacher_feats):
+        """(class KD, box KD) between two lists of raw head outputs (B, 4 * reg_max + nc, H, W)."""
+        if [f.shape for f in student_feats] != [f.shape for f in teacher_feats]:
+            raise ValueError("Teacher and student head outputs differ "
+                             f"({[tuple(f.shape) for f in teacher_feats]} vs {[tuple(f.shape) for f in student_feats]}); "
+                             "they need the same strides, reg_max and number of classes")
+        b, t = student_feats[0].shape[0], self.temperature
+        student = torch.cat([f.view(b, self.no, -1) for f in student_feats], 2).float()
+        teacher = torch.cat([f.view(b, self.no, -1) for f in teacher_feats], 2).float()
+        s_box, s_cls = student.split((self.reg_max * 4, self.nc), 1)
+        t_box, t_cls = teacher.split((self.reg_max * 4, self.nc), 1)
+
+        cls_kd = F.binary_cross_entropy_with_logits(s_cls / t, (t_cls / t).sigmoid(), reduction='none')
+        cls_kd = cls_kd.sum(1).mean() * t * t
+
+        # Box distributions: (B, 4, reg_max, anchors), KL per side, weighted by the teacher's confidence
+        s_box = s_box.view(b, 4, self.reg_max, -1)
+        t_box = t_box.view(b, 4, self.reg_max, -1)
+        kl = F.kl_div(F.log_softmax(s_box / t, 2), F.log_softmax(t_box / t, 2), reduction='none', log_target=True)
+        kl = kl.sum(2).mean(1) * t * t  # (B, anchors)
+        weight = t_cls.sigmoid().amax(1)
+        box_kd = (kl * weight).sum() / weight.sum().clamp(min=1e-6)
+        return cls_kd, box_kd
+
+    def __call__(self, preds, batch):
+        loss, loss_items = super().__call__(preds, batch)
+        student_feats = preds[1] if isinstance(preds, tuple) else preds
+        with torch.no_grad():
+            teacher_out = self.teacher(batch['img'])
+        teacher_feats = teacher_out[1] if isinstance(teacher_out, tuple) else teacher_out
+        cls_kd, box_kd = self.distill(student_feats, teacher_feats)
+        kd = self.distill_weight * (self.cls_weight * cls_kd + self.box_weight * box_kd)
+        self.kd_sum += float(kd.detach())
+        self.kd_batches += 1
+        # The detection loss is scaled by the batch size (and may be per component); add KD once in total
+        batch_size = batch['img'].shape[0]
+        return loss + kd * batch_size / loss.numel(), loss_items
+
+
+class DistillationMixin:
+    """
+    Trainer mixin that trains the model with DistillationLoss against a teacher checkpoint.
+    Configured through class attributes; see distillation_trainer().
+    """
+
+    teacher_weights = None
+    distill_weight = 1.0
+    temperature = 2.0
+    distill_loss = None  # Mean distillation loss of the last epoch (also written to metrics.jsonl)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # After _setup_train: model on its device and EMA already copied (so the EMA copy has no teacher)
+        self.add_callback('on_pretrain_routine_end', DistillationMixin._attach_teacher)
+        self.add_callback('on_train_epoch_end', DistillationMixin._log_distill_loss)
+
+    def _attach_teacher(self):
+        teacher = YOLO(self.teacher_weights).model.float().to(self.device).eval()
+        for p in teacher.parameters():
+            p.requires_grad_(False)
+        if not torch.equal(teacher.stride.cpu(), self.model.stride.cpu()):
+            raise ValueError(f"Teacher strides {teacher.stride.tolist()} differ from student strides "
+                             f"{self.model.stride.tolist()}")
+        self.model.criterion = DistillationLoss(self.model, teacher, self.distill_weight, self.temperature)
+        print(f"Distillation: teacher {self.teacher_weights} "
+              f"({sum(p.numel() for p in teacher.parameters()) / 1e6:.2f}M params), "
+              f"weight={self.distill_weight}, temperature={self.temperature}")
+
+    def _log_distill_loss(self):
+        criterion = self.model.criterion
+        if isinstance(criterion, DistillationLoss) and criterion.kd_batches:
+            self.distill_loss = criterion.kd_sum / criterion.kd_batches
+            criterion.kd_sum, criterion.kd_batches = 0.0, 0
+            print(f"Epoch {self.epoch + 1}: mean distillation loss {self.distill_loss:.4f}")
+
+
+def distillation_trainer(base=None, teacher_weights=None, distill_weight=1.0, temperature=2.0):
+    """
+    Returns a trainer class (subclass of base, default DetectionTrainer) that distills from teacher_weights,
+    e.g. model.train(..., trainer=distillation_trainer(ShardCachedTrainer, "runs/detect/yolo11s_hand/weights/best.pt")).
+    """
+    if teacher_weights is None:
+        raise ValueError("teacher_weights is required")
+    if base is None:
+        from ultralytics.models.yolo.detect import DetectionTrainer
+        base = DetectionTrainer
+    return type(f"Distillation{base.__name__}", (DistillationMixin, base),
+                {'teacher_weights': teacher_weights, 'distill_weight': distill_weight, 'temperature': temperature})
+
+
+def main():
+    # End-to-end check on CPU with tiny models and ultralytics' 8-image coco8 dataset (downloaded
+    # automatically): the COCO-pretrained yolo11s is the teacher, yolo11n trained at imgsz 160 the student.
+    trainer = distillation_trainer(teacher_weights="yolo11s.pt", distill_weight=1.0, temperature=2.0)
+    student = YOLO("yolo11n.pt")
+    student.train(data="coco8.yaml", trainer=trainer, epochs=2, imgsz=160, batch=4, device="cpu", workers=0,
+                  plots=False, name="distillation_smoke_test")
+    metrics = YOLO(student.trainer.best).val(data="coco8.yaml", imgsz=160, device="cpu", plots=False)
+    print(f"Student mAP50-95: {metrics.box.map:.4f}")
+
+
+if __name__ == "__main__":
+    main()
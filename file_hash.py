@@ -0,0 +1,15 @@
+"""
+File content hashing shared by the converter (annotation fingerprints) and the model registry
+(weights cache keys). Kept free of heavy imports so both can use it.
+"""
+
+import hashlib
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    """Hex SHA-256 of a file, read in chunks so large files are not loaded into memory."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
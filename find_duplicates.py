@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+查找重复/近似重复图片，以及训练集与验证集之间的数据泄漏
+
+1. 多进程计算每张图片的 64 位 dHash（感知哈希，缩放、重新压缩后基本不变）
+2. 多索引哈希：把 64 位哈希切成 max_distance + 1 段，汉明距离不超过 max_distance 的两张图
+   至少有一段完全相同（抽屉原理），所以只需比较某一段相同的哈希，不做两两比较
+3. 候选对用 popcount 精确验证距离，再用并查集合并成重复簇，区分集内重复和跨集泄漏
+"""
+
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+import numpy as np
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.tif', '.tiff', '.webp')
+
+
+def dhash(image_path, hash_size=8):
+    """
+    计算图片的 dHash（hash_size * hash_size 位），读取失败返回 None
+    JPEG 用 1/4 尺寸解码，速度快很多，对哈希结果几乎没有影响
+    """
+    data = np.fromfile(image_path, dtype=np.uint8)
+    gray = cv2.imdecode(data, cv2.IMREAD_REDUCED_GRAYSCALE_4) if data.size else None
+    if gray is None:
+        return None
+    small = cv2.resize(gray, (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    return int(np.packbits(bits).view('>u8')[0])
+
+
+def _hash_chunk(paths):
+    hashes = np.zeros(len(paths), dtype=np.uint64)
+    ok = np.zeros(len(paths), dtype=bool)
+    for i, path in enumerate(paths):
+        try:
+            value = dhash(path)
+        except Exception:
+            value = None
+        if value is not None:
+            hashes[i], ok[i] = value, True
+    return hashes, ok
+
+
+def compute_hashes(image_paths, num_workers=None, chunk_size=1024):
+    """多进程计算哈希，返回 (uint64 哈希数组, 是否成功的布尔数组)"""
+    chunks = [image_paths[i:i + chunk_size] for i in range(0, len(image_paths), chunk_size)]
+    if not chunks:
+        return np.zeros(0, dtype=np.uint64), np.zeros(0, dtype=bool)
+    with ProcessPoolExecutor(max_workers=num_workers) as pool:
+        results = list(pool.map(_hash_chunk, chunks))
+    return np.concatenate([h for h, _ in results]), np.concatenate([ok for _, ok in results])
+
+
+def popcount64(values):
+    """uint64 数组逐元素统计 1 的个数"""
+    if hasattr(np, 'bitwise_count'):  # numpy >= 2.0
+        return np.bitwise_count(values).astype(np.int64)
+    as_bytes = values.view(np.uint8).reshape(-1, 8)
+    return np.unpackbits(as_bytes, axis=1).sum(axis=1).astype(np.int64)
+
+
+def _segment_masks(max_distance, bits=64):
+    """把 bits 位切成 max_distance + 1 段，返回每段的 (右移位数, 掩码)"""
+    num_segments = max_distance + 1
+    bounds = np.linspace(0, bits, num_segments + 1).astype(int)
+    return [(int(lo), (1 << int(hi - lo)) - 1) for lo, hi in zip(bounds[:-1], bounds[1:])]
+
+
+def near_duplicate_pairs(hashes, max_distance=4):
+    """
+    多索引哈希查找汉明距离 <= max_distance 的所有哈希对（输入哈希应已去重）
+    返回 (i, j, 距离) 三个数组，i < j
+    """
+    if max_distance >= 64:
+        raise ValueError("max_distance must be < 64")
+    pairs = []
+    for shift, mask in _segment_masks(max_distance):
+        segment = (hashes >> np.uint64(shift)) & np.uint64(mask)
+        order = np.argsort(segment, kind='stable')
+        sorted_segment = segment[order]
+        sorted_hashes = hashes[order]
+        # 排序后同一段值的哈希相邻：第 k 轮比较相隔 k 的位置，直到所有分组都比较完；
+        # 候选对当轮就验证距离，只保留命中的，内存不随候选数量增长
+        active = np.arange(len(order) - 1)
+        k = 1
+        while active.size:
+            active = active[active + k < len(order)]
+            active = active[sorted_segment[active + k] == sorted_segment[active]]
+            hits = active[popcount64(sorted_hashes[active] ^ sorted_hashes[active + k]) <= max_distance]
+            if hits.size:
+                pairs.append(np.stack([order[hits], order[hits + k]], axis=1))
+            k += 1
+    if not pairs:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty, empty
+
+    pairs = np.concatenate(pairs)
+    pairs.sort(axis=1)
+    pairs = np.unique(pairs, axis=0)  # 同一对可能在多段上都相同
+    distances = popcount64(hashes[pairs[:, 0]] ^ hashes[pairs[:, 1]])
+    return pairs[:, 0], pairs[:, 1], distances
+
+
+def _clusters(num_items, left, right):
+    """并查集合并，返回 [[成员下标, ...], ...]（只包含 2 个及以上成员的簇）"""
+    parent = list(range(num_items))
+
+    def find(x):
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    for a, b in zip(left.tolist(), right.tolist()):
+        ra, rb = find(a), find(b)
+        if ra != rb:
+            parent[max(ra, rb)] = min(ra, rb)
+
+    groups = {}
+    for i in range(num_items):
+        groups.setdefault(find(i), []).append(i)
+    return [members for members in groups.values() if len(members) > 1]
+
+
+def list_split_images(images_dir):
+    return sorted(e.path for e in os.scandir(images_dir)
+                  if e.is_file() and e.name.lower().endswith(IMAGE_EXTENSIONS))
+
+
+def find_duplicates(splits, max_distance=4, num_workers=None):
+    """
+    查找所有划分内部以及划分之间的重复图片
+
+    Args:
+        splits: {划分名: 图片目录}，如 {'train': ..., 'validation': ...}
+        max_distance: dHash 汉明距离阈值（0 = 完全相同，约 4-6 = 近似重复）
+        num_workers: 计算哈希的进程数
+    Returns:
+        dict: 报告，clusters 中每个簇为 [{'split', 'path', 'distance'}, ...]（distance 为到簇内第一张图的距离）
+    """
+    start_time = time.time()
+    paths, split_of = [], []
+    for name, images_dir in splits.items():
+        split_paths = list_split_images(images_dir)
+        paths.extend(split_paths)
+        split_of.extend([name] * len(split_paths))
+    print(f"正在计算 {len(paths)} 张图片的感知哈希...")
+    hashes, ok = compute_hashes(paths, num_workers)
+    hash_seconds = time.time() - start_time
+
+    # 完全相同的哈希先合并，近邻搜索只在不同的哈希之间进行
+    valid = np.flatnonzero(ok)
+    unique_hashes, inverse = np.unique(hashes[valid], return_inverse=True)
+    left, right, _ = near_duplicate_pairs(unique_hashes, max_distance)
+    hash_clusters = _clusters(len(unique_hashes), left, right)
+    cluster_of_hash = np.arange(len(unique_hashes))
+    for members in hash_clusters:
+        cluster_of_hash[members] = members[0]
+
+    groups = {}
+    for image_index, root in zip(valid.tolist(), cluster_of_hash[inverse.ravel()].tolist()):
+        groups.setdefault(root, []).append(image_index)
+
+    clusters = []
+    for members in groups.values():
+        if len(members) < 2:
+            continue
+        first = hashes[members[0]]
+        distances = popcount64(hashes[members] ^ first).tolist()
+        clusters.append([{'split': split_of[i], 'path': paths[i], 'distance': d}
+                         for i, d in zip(members, distances)])
+    clusters.sort(key=lambda c: (-len(c), c[0]['path']))
+
+    cross = [c for c in clusters if len({m['split'] for m in c}) > 1]
+    report = {
+        'max_distance': max_distance,
+        'images': {name: split_of.count(name) for name in splits},
+        'unreadable': [paths[i] for i in np.flatnonzero(~ok).tolist()],
+        'clusters': len(clusters),
+        'duplicate_images': sum(len(c) - 1 for c in clusters),
+        'cross_split_clusters': len(cross),
+        'within_split_clusters': len(clusters) - len(cross),
+        'hash_seconds': round(hash_seconds, 2),
+        'seconds': round(time.time() - start_time, 2),
+        'duplicate_clusters': clusters,
+    }
+    return report
+
+
+def deduplicated_lists(report, splits, keep_priority=None):
+    """
+    根据报告生成去重后的文件列表 {划分名: [图片路径, ...]}
+
+    每个重复簇只保留一张：优先保留 keep_priority 中靠前的划分（默认为验证集优先，
+    这样与验证集重复的训练图片会被去掉），同一划分内保留路径排序最靠前的一张；无法读取的图片也会去掉
+    """
+    if keep_priority is None:
+        keep_priority = sorted(splits, key=lambda name: name == 'train')
+    rank = {name: i for i, name in enumerate(keep_priority)}
+    dropped = set(report['unreadable'])
+    for cluster in report['duplicate_clusters']:
+        keep = min(cluster, key=lambda m: (rank.get(m['split'], len(rank)), m['path']))
+        dropped.update(m['path'] for m in cluster if m is not keep)
+    return {name: [p for p in list_split_images(images_dir) if p not in dropped]
+            for name, images_dir in splits.items()}
+
+
+def run_duplicate_check(splits, max_distance=4, report_path=None, lists_dir=None, num_workers=None):
+    """
+    查重、打印摘要，可写出 JSON 报告和去重后的文件列表
+
+    Args:
+        splits: {划分名: 图片目录}
+        report_path: JSON 报告路径，None 表示不写
+        lists_dir: 去重后的文件列表输出目录（<划分名>_dedup.txt），None 表示不写
+    Returns:
+        int: 退出码，存在跨集泄漏时为 1，否则为 0
+    """
+    report = find_duplicates(splits, max_distance, num_workers)
+    if report_path:
+        with open(report_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    print(f"\n=== 重复图片检测报告（汉明距离 <= {max_distance}）===")
+    print(f"图片数量: {report['images']}，无法读取: {len(report['unreadable'])}")
+    print(f"重复簇: {report['clusters']} 个（集内 {report['within_split_clusters']}，"
+          f"跨集泄漏 {report['cross_split_clusters']}），可去除 {report['duplicate_images']} 张")
+    print(f"耗时: {report['seconds']:.1f}s（哈希 {report['hash_seconds']:.1f}s）")
+    for cluster in report['duplicate_clusters'][:5]:
+        print("  " + ", ".join(f"{m['split']}:{os.path.basename(m['path'])}(d={m['distance']})" for m in cluster[:6]))
+    if report_path:
+        print(f"详细报告已保存: {report_path}")
+
+    if lists_dir:
+        os.makedirs(lists_dir, exist_ok=True)
+        for name, kept in deduplicated_lists(report, splits).items():
+            list_path = os.path.join(lists_dir, f"{name}_dedup.txt")
+            with open(list_path, 'w', encoding='utf-8') as f:
+                f.write("".join(p + "\n" for p in kept))
+            print(f"去重后的 {name} 列表: {list_path}（{len(kept)} 张）")
+    return 1 if report['cross_split_clusters'] else 0
+
+
+def main():
+    # --- 配置 ---
+    dataset_root_dir = "D:/Python_Files/Personal_projects/YOLOv8/hand_detection_dataset_converted"
+    splits = {
+        'train': os.path.join(dataset_root_dir, 'train', 'images'),
+        'validation': os.path.join(dataset_root_dir, 'validation', 'images'),
+    }
+    max_distance = 4           # dHash 汉明距离阈值，越大越宽松
+    report_path = "duplicate_report.json"
+    write_dedup_lists = True   # 输出去重后的文件列表（可直接用作数据集 YAML 中的 train/val）
+    lists_dir = os.path.join(dataset_root_dir, 'lists')
+
+    return run_duplicate_check(splits, max_distance, report_path, lists_dir if write_dedup_lists else None)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
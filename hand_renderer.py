@@ -0,0 +1,154 @@
+import cv2
+import numpy as np
+
+
+def extract_detections(result):
+    """
+    从YOLO单张结果中取出检测框、置信度和类别（numpy数组）
+    返回: (xyxy[N,4] float32, conf[N] float32, cls[N] int)
+    """
+    boxes = result.boxes
+    if boxes is None or len(boxes) == 0:
+        return (np.zeros((0, 4), dtype=np.float32),
+                np.zeros((0,), dtype=np.float32),
+                np.zeros((0,), dtype=np.int64))
+    return (boxes.xyxy.cpu().numpy().astype(np.float32, copy=False),
+            boxes.conf.cpu().numpy().astype(np.float32, copy=False),
+            boxes.cls.cpu().numpy().astype(np.int64, copy=False))
+
+
+def photo_info_lines(confidences):
+    """
+    图片检测的左上角信息（与原 ModleTestPhoto 显示一致）
+    每行格式: (文字, 颜色, 字号, 线宽)
+    """
+    lines = [(f"Hands: {len(confidences)}", (0, 255, 0), 0.8, 2)]
+    for conf in confidences:
+        lines.append((f"Conf: {float(conf):.2f}", (0, 255, 255), 0.6, 1))
+    if len(confidences) == 0:
+        lines.append(("No hands detected", (0, 0, 255), 0.6, 1))
+    return lines
+
+
+def camera_info_lines(num_hands, fps):
+    """
+    摄像头检测的左上角信息（与原 ModleTestCamera 显示一致）
+    """
+    return [
+        (f"Hands: {num_hands}", (0, 255, 0), 1.0, 2),
+        (f"FPS: {fps:.1f}", (0, 255, 0), 1.0, 2),
+        ("Press SPACE to exit", (0, 255, 255), 0.7, 2),
+    ]
+
+
+class HandRenderer:
+    """
+    轻量级检测结果渲染器（替代 results[0].plot() + overlay.copy() + 全图 addWeighted + resize）
+
+    - 检测框和信息面板直接画在一块复用的输出缓冲区上，不再产生额外的整帧拷贝
+    - 半透明背景只对面板所在区域(ROI)做混合
+    - 指定 display_size 时，原图只缩放一次写入缓冲区，之后按显示分辨率绘制
+    """
+
+    def __init__(self, display_size=None, names=None, box_color=(0, 0, 255),
+                 panel_alpha=0.6, line_spacing=8, font=cv2.FONT_HERSHEY_SIMPLEX):
+        """
+        Args:
+            display_size: (宽, 高)，如 (500, 500)；None 表示按原图分辨率绘制
+            names: 类别名字典 {类别id: 名称}，用于框上的标签
+            box_color: 检测框颜色 (BGR)
+            panel_alpha: 面板背景的遮暗程度（0-1），None 表示不画背景
+            line_spacing: 面板文字行间距（像素）
+        """
+        self.display_size = tuple(display_size) if display_size else None
+        self.names = names or {0: "hand"}
+        self.box_color = box_color
+        self.panel_alpha = panel_alpha
+        self.line_spacing = line_spacing
+        self.font = font
+        self._buffer = None
+
+    def _prepare_buffer(self, frame):
+        """把输入帧写入复用缓冲区，返回 (缓冲区, x缩放, y缩放)"""
+        h, w = frame.shape[:2]
+        out_w, out_h = self.display_size if self.display_size else (w, h)
+        shape = (out_h, out_w) + frame.shape[2:]
+        if self._buffer is None or self._buffer.shape != shape or self._buffer.dtype != frame.dtype:
+            self._buffer = np.empty(shape, dtype=frame.dtype)
+
+        if (out_w, out_h) == (w, h):
+            np.copyto(self._buffer, frame)
+        else:
+            cv2.resize(frame, (out_w, out_h), dst=self._buffer, interpolation=cv2.INTER_AREA)
+        return self._buffer, out_w / w, out_h / h
+
+    def _draw_boxes(self, canvas, boxes, confidences, classes, sx, sy):
+        """绘制检测框和 '类别 置信度' 标签"""
+        if len(boxes) == 0:
+            return
+        h, w = canvas.shape[:2]
+        thickness = max(1, round((h + w) / 2 * 0.003))
+        scaled = np.asarray(boxes, dtype=np.float32) * np.array([sx, sy, sx, sy], dtype=np.float32)
+        for i, (x1, y1, x2, y2) in enumerate(scaled.round().astype(np.int32)):
+            cv2.rectangle(canvas, (int(x1), int(y1)), (int(x2), int(y2)), self.box_color, thickness)
+
+            cls_id = int(classes[i]) if classes is not None else 0
+            label = f"{self.names.get(cls_id, cls_id)} {float(confidences[i]):.2f}"
+            (tw, th), baseline = cv2.getTextSize(label, self.font, 0.5, 1)
+            ty = int(y1) - th - baseline if int(y1) - th - baseline >= 0 else int(y1)
+            cv2.rectangle(canvas, (int(x1), ty), (int(x1) + tw + 4, ty + th + baseline + 2),
+                          self.box_color, -1)
+            cv2.putText(canvas, label, (int(x1) + 2, ty + th + 1), self.font, 0.5,
+                        (255, 255, 255), 1, cv2.LINE_AA)
+
+    def _draw_panel(self, canvas, lines, origin=(10, 10), padding=5):
+        """绘制左上角信息面板，只遮暗面板区域"""
+        if not lines:
+            return
+        h, w = canvas.shape[:2]
+
+        # 先计算每行文字位置和面板范围
+        x0, y = origin
+        placed = []
+        panel_w = 0
+        for text, color, scale, thickness in lines:
+            (tw, th), baseline = cv2.getTextSize(text, self.font, scale, thickness)
+            y += th
+            placed.append((text, (x0, y), color, scale, thickness))
+            y += baseline + self.line_spacing
+            panel_w = max(panel_w, tw)
+
+        if self.panel_alpha:
+            px1, py1 = max(0, x0 - padding), max(0, origin[1] - padding)
+            px2, py2 = min(w, x0 + panel_w + padding), min(h, y - self.line_spacing + padding)
+            if px2 > px1 and py2 > py1:
+                roi = canvas[py1:py2, px1:px2]
+                roi[...] = cv2.convertScaleAbs(roi, alpha=1.0 - self.panel_alpha)
+
+        for text, org, color, scale, thickness in placed:
+            cv2.putText(canvas, text, org, self.font, scale, color, thickness)
+
+    def render(self, frame, boxes, confidences, classes=None, info_lines=None):
+        """
+        渲染一帧
+
+        Args:
+            frame: 原始BGR图像（不会被修改）
+            boxes: 原图坐标下的检测框 [N,4] (x1, y1, x2, y2)
+            confidences: 置信度 [N]
+            classes: 类别id [N]，None 表示全部为 0
+            info_lines: 左上角信息行，见 photo_info_lines / camera_info_lines
+        Returns:
+            绘制好的图像（复用的内部缓冲区，下一次 render 会被覆盖）
+        """
+        canvas, sx, sy = self._prepare_buffer(frame)
+        self._draw_boxes(canvas, boxes, confidences, classes, sx, sy)
+        self._draw_panel(canvas, info_lines)
+        return canvas
+
+    def render_result(self, frame, result, info_lines=None):
+        """直接渲染YOLO单张结果，返回 (绘制好的图像, 置信度数组)"""
+        boxes, confidences, classes = extract_detections(result)
+        if info_lines is None:
+            info_lines = photo_info_lines(confidences)
+        return self.render(frame, boxes, confidences, classes, info_lines), confidences
@@ -0,0 +1,291 @@
+"""
+Parallel hyperparameter sweep with early stopping of weak trials.
+
+Each trial is a separate process running model.train() with one combination of hyperparameters, so a
+crashing or out-of-memory trial cannot take the others down and GPU memory is released when it ends.
+At most max_parallel trials run at a time (slots are spread over the given devices). The runner polls
+every trial's results.csv while it grows and stops weak trials with asynchronous successive halving:
+rungs sit at min_epochs, min_epochs * eta, min_epochs * eta^2, ... epochs, and a trial reaching a rung
+is stopped unless its best fitness so far is in the top 1/eta of all trials that reached that rung.
+Fitness is ultralytics' own: 0.1 * mAP50 + 0.9 * mAP50-95.
+
+Output in sweep_dir: one folder per trial (ultralytics run: results.csv, weights, ...), trial_XXX.json
+(the trial's arguments), trial_XXX.log (its console output), leaderboard.csv and sweep.json.
+"""
+
+import csv
+import itertools
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import time
+
+FITNESS_WEIGHTS = {'metrics/mAP50(B)': 0.1, 'metrics/mAP50-95(B)': 0.9}
+# With optimizer='auto' ultralytics picks these itself and ignores the given values
+AUTO_OPTIMIZER_ARGS = ('lr0', 'momentum')
+
+
+def sample_trials(search_space, num_trials=None, seed=0):
+    """
+    Hyperparameter combinations from {name: [values, ...]}: the full grid if num_trials is None or
+    not smaller than the grid, otherwise num_trials distinct random combinations.
+    """
+    names = sorted(search_space)
+    grid = list(itertools.product(*(search_space[n] for n in names)))
+    if num_trials is not None and num_trials < len(grid):
+        grid = random.Random(seed).sample(grid, num_trials)
+    return [dict(zip(names, values)) for values in grid]
+
+
+def rung_epochs(min_epochs, max_epochs, eta=3):
+    """Epochs at which successive halving compares trials."""
+    rungs, epoch = [], min_epochs
+    while epoch < max_epochs:
+        rungs.append(epoch)
+        epoch *= eta
+    return rungs
+
+
+def read_results(results_csv):
+    """
+    Rows of a (possibly still growing) ultralytics results.csv as dicts of floats with the fitness added.
+    Incomplete last lines are ignored; older ultralytics versions pad the column names with spaces.
+    """
+    try:
+        with open(results_csv, 'r', newline='', encoding='utf-8') as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return []
+    if not lines:
+        return []
+    header = [h.strip() for h in next(csv.reader(lines[:1]))]
+    rows = []
+    for values in csv.reader(lines[1:]):
+        if len(values) != len(header):
+            continue
+        try:
+            row = {k: float(v) for k, v in zip(header, values)}
+        except ValueError:
+            continue
+        row['fitness'] = sum(w * row.get(k, 0.0) for k, w in FITNESS_WEIGHTS.items())
+        rows.append(row)
+    return rows
+
+
+class SuccessiveHalving:
+    """Asynchronous successive halving: decides at each rung whether a trial may continue."""
+
+    def __init__(self, rungs, eta=3):
+        self.rungs = rungs
+        self.eta = eta
+        self.records = {rung: {} for rung in rungs}
+
+    def report(self, trial_id, rows):
+        """Records the trial at every rung it has reached; returns False if it should be stopped."""
+        epochs = len(rows)
+        keep = True
+        for rung in self.rungs:
+            if epochs < rung or trial_id in self.records[rung]:
+                continue
+            fitness = max(r['fitness'] for r in rows[:rung])
+            recorded = self.records[rung]
+            recorded[trial_id] = fitness
+            if len(recorded) >= self.eta:
+                top = sorted(recorded.values(), reverse=True)
+                cutoff = top[max(1, len(top) // self.eta) - 1]
+                keep = keep and fitness >= cutoff
+        return keep
+
+
+def trial_command(spec_path):
+    """Command that runs one trial (this script in trial mode)."""
+    return [sys.executable, os.path.abspath(__file__), '--trial', spec_path]
+
+
+def run_trial(spec_path):
+    """Trial process: trains one model with the arguments in the spec file."""
+    from ultralytics import YOLO
+
+    with open(spec_path, 'r', encoding='utf-8') as f:
+        spec = json.load(f)
+    YOLO(spec['model']).train(**spec['train_args'])
+
+
+def _stop_process(process, timeout=60):
+    """Terminates a trial process, killing it if it does not exit within timeout seconds."""
+    if process.poll() is not None:
+        return
+    process.terminate()
+    try:
+        process.wait(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+def _summarize(trial):
+    rows = trial['rows']
+    best = max(rows, key=lambda r: r['fitness']) if rows else {}
+    return {
+        'trial': trial['id'],
+        'status': trial['status'],
+        'epochs': len(rows),
+        'fitness': round(best.get('fitness', 0.0), 5),
+        'mAP50': round(best.get('metrics/mAP50(B)', 0.0), 5),
+        'mAP50-95': round(best.get('metrics/mAP50-95(B)', 0.0), 5),
+        'best_epoch': int(best['epoch']) if best else 0,
+        'seconds': round(trial['seconds'], 1),
+        **trial['params'],
+    }
+
+
+def run_sweep(model, base_args, search_space, sweep_dir, num_trials=None, devices=('cpu',), trials_per_device=1,
+              min_epochs=3, eta=3, poll_interval=10.0, seed=0):
+    """
+    Runs the sweep and returns the leaderboard (list of dicts, best first).
+
+    Args:
+        model: Model to start each trial from (e.g. "yolo11n.pt").
+        base_args: model.train() arguments shared by all trials (data, epochs, fraction, ...).
+        search_space: {argument: [values, ...]} of the hyperparameters to tune.
+        sweep_dir: Output folder.
+        num_trials: Number of random combinations (None = full grid).
+        devices: Devices to run trials on, e.g. ('0', '1') or ('cpu',).
+        trials_per_device: Concurrent trials per device; max_parallel = len(devices) * trials_per_device.
+        min_epochs: First successive halving rung.
+        eta: Halving rate (only the top 1/eta of the trials at a rung continue).
+        poll_interval: Seconds between results.csv polls.
+    """
+    ignored = [k for k in AUTO_OPTIMIZER_ARGS if k in search_space]
+    if ignored and 'auto' in search_space.get('optimizer', [base_args.get('optimizer', 'auto')]):
+        raise ValueError(f"optimizer='auto' ignores {ignored}; set an explicit optimizer (e.g. 'SGD' or 'AdamW') "
+                         f"in base_args or search only over explicit optimizers")
+    sweep_dir = os.path.abspath(sweep_dir)
+    os.makedirs(sweep_dir, exist_ok=True)
+    max_epochs = int(base_args.get('epochs', 100))
+    halving = SuccessiveHalving(rung_epochs(min_epochs, max_epochs, eta), eta)
+    slots = [device for device in devices for _ in range(trials_per_device)]
+    cores = os.cpu_count() or 1
+    threads_per_trial = max(1, cores // len(slots))
+
+    trials = [{'id': f"trial_{i:03d}", 'params': params, 'status': 'pending', 'rows': [], 'seconds': 0.0}
+              for i, params in enumerate(sample_trials(search_space, num_trials, seed))]
+    print(f"Sweep: {len(trials)} trials, {len(slots)} parallel on {list(devices)}, "
+          f"halving rungs at epochs {halving.rungs} (eta={eta})")
+
+    pending, running = list(trials), {}
+    try:
+        while pending or running:
+            while pending and len(running) < len(slots):
+                trial = pending.pop(0)
+                busy = [t['device'] for t in running.values()]
+                device = next(d for d in devices if busy.count(d) < trials_per_device)
+                train_args = dict(base_args, **trial['params'], device=device, project=sweep_dir, name=trial['id'],
+                                  exist_ok=True, plots=False)
+                train_args.setdefault('workers', max(0, min(8, threads_per_trial - 1)))
+                # A rerun reuses the trial names; results.csv of an old run would be appended to
+                shutil.rmtree(os.path.join(sweep_dir, trial['id']), ignore_errors=True)
+                spec_path = os.path.join(sweep_dir, f"{trial['id']}.json")
+                with open(spec_path, 'w', encoding='utf-8') as f:
+                    json.dump({'model': model, 'train_args': train_args}, f, indent=2)
+                # Limit math library threads so concurrent CPU trials do not oversubscribe the cores
+                env = dict(os.environ, OMP_NUM_THREADS=str(threads_per_trial), MKL_NUM_THREADS=str(threads_per_trial))
+                log = open(os.path.join(sweep_dir, f"{trial['id']}.log"), 'w', encoding='utf-8')
+                trial.update(status='running', device=device, start=time.time(), log=log,
+                             results=os.path.join(sweep_dir, trial['id'], 'results.csv'),
+                             process=subprocess.Popen(trial_command(spec_path), stdout=log, stderr=subprocess.STDOUT,
+                                                      env=env))
+                running[trial['id']] = trial
+                print(f"Started {trial['id']} on {device}: {trial['params']}")
+
+            time.sleep(poll_interval)
+
+            for trial_id, trial in list(running.items()):
+                trial['rows'] = read_results(trial['results'])
+                exit_code = trial['process'].poll()
+                if exit_code is None and not halving.report(trial_id, trial['rows']):
+                    _stop_process(trial['process'])
+                    trial['status'] = 'stopped'
+                elif exit_code is not None:
+                    halving.report(trial_id, trial['rows'])
+                    trial['status'] = 'completed' if exit_code == 0 else f'failed ({exit_code})'
+                else:
+                    continue
+                trial['seconds'] = time.time() - trial['start']
+                trial['log'].close()
+                del running[trial_id]
+                best = max((r['fitness'] for r in trial['rows']), default=0.0)
+                print(f"{trial_id} {trial['status']} after {len(trial['rows'])} epochs, best fitness {best:.4f}")
+    finally:
+        # Interrupted (Ctrl+C) or failed: do not leave trainings running without the runner
+        if running:
+            print(f"Stopping {len(running)} running trials...")
+        for trial in running.values():
+            trial['process'].terminate()
+        for trial in running.values():
+            _stop_process(trial['process'])
+            trial['log'].close()
+
+    leaderboard = sorted((_summarize(t) for t in trials), key=lambda r: (-r['fitness'], r['trial']))
+    with open(os.path.join(sweep_dir, 'leaderboard.csv'), 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=list(leaderboard[0]) if leaderboard else ['trial'])
+        writer.writeheader()
+        writer.writerows(leaderboard)
+    with open(os.path.join(sweep_dir, 'sweep.json'), 'w', encoding='utf-8') as f:
+        json.dump({'model': model, 'base_args': base_args, 'search_space': search_space, 'rungs': halving.rungs,
+                   'eta': eta, 'leaderboard': leaderboard}, f, indent=2)
+    return leaderboard
+
+
+def print_leaderboard(leaderboard, top=10):
+    print("\n--- Sweep Leaderboard ---")
+    for rank, row in enumerate(leaderboard[:top], 1):
+        params = {k: v for k, v in row.items() if k not in ('trial', 'status', 'epochs', 'fitness', 'mAP50',
+                                                              'mAP50-95', 'best_epoch', 'seconds')}
+        print(f"{rank:>2}. {row['trial']}  fitness={row['fitness']:.4f}  mAP50={row['mAP50']:.4f}  "
+              f"mAP50-95={row['mAP50-95']:.4f}  epochs={row['epochs']} ({row['status']})  {params}")
+
+
+def main():
+    # --- Configuration ---
+    dataset_yaml_path = "hand_detection_dataset.yaml"  # Written by train_hand_detector.py
+    sweep_dir = "runs/sweep"
+    model = "yolo11n.pt"
+    # Small CPU run to try the sweep itself: 5% of the images, small images, few epochs
+    smoke_test = False
+
+    search_space = {
+        'lr0': [0.002, 0.005, 0.01, 0.02],
+        'lrf': [0.01, 0.1],
+        'imgsz': [480, 640],
+        'batch': [8, 16],
+        'fliplr': [0.0, 0.5],
+        'mosaic': [0.5, 1.0],
+        'mixup': [0.0, 0.1],
+    }
+    # Explicit optimizer: with 'auto' ultralytics chooses lr0 itself and the lr0 dimension would do nothing
+    base_args = {'data': dataset_yaml_path, 'epochs': 30, 'optimizer': 'SGD', 'val': True, 'save_period': -1}
+    num_trials = 16
+    devices = ('0',)
+    trials_per_device = 2
+    min_epochs, eta = 3, 3
+
+    if smoke_test:
+        base_args.update(epochs=6, fraction=0.05, workers=0)
+        search_space = {'lr0': [0.005, 0.02], 'imgsz': [256, 320], 'batch': [4]}
+        num_trials, devices, trials_per_device, min_epochs, eta = None, ('cpu',), 2, 2, 2
+
+    leaderboard = run_sweep(model, base_args, search_space, sweep_dir, num_trials, devices, trials_per_device,
+                            min_epochs, eta)
+    print_leaderboard(leaderboard)
+    print(f"Leaderboard saved to {os.path.join(sweep_dir, 'leaderboard.csv')}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3 and sys.argv[1] == '--trial':
+        run_trial(sys.argv[2])
+    else:
+        main()
@@ -0,0 +1,295 @@
+"""
+Pre-resized image shard cache for training.
+
+Every epoch ultralytics decodes each full-resolution JPEG and resizes it to imgsz before any
+augmentation runs. This module does that work once: images are decoded, resized exactly the way
+ultralytics' BaseDataset.load_image does it (long side -> imgsz, INTER_LINEAR), and appended as raw
+uint8 pixels to a few large shard files with an index. ShardCachedTrainer then serves load_image from
+memory-mapped shards, so augmentation (mosaic, HSV, flips, ...) sees the same pixels as before while
+the per-epoch decode cost disappears.
+
+Layout of a cache directory (default: <images_dir>.shards-<imgsz>, e.g. train/images.shards-640):
+    shard-00000.bin, ...  raw HWC uint8 pixels, images back to back
+    index.npy             one record per image: shard, offset, h, w, c, h0, w0
+    meta.json             imgsz, image names (index order) and a fingerprint of the source folder
+"""
+
+import hashlib
+import json
+import math
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+CACHE_VERSION = 1
+INDEX_FILE = 'index.npy'
+META_FILE = 'meta.json'
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.tif', '.tiff', '.webp')
+INDEX_DTYPE = np.dtype([('shard', np.int32), ('offset', np.int64), ('h', np.int32), ('w', np.int32),
+                        ('c', np.int32), ('h0', np.int32), ('w0', np.int32)])
+
+
+def image_shard_dir(images_dir, imgsz):
+    """Default cache location for an images folder: <images_dir>.shards-<imgsz>"""
+    return f"{os.path.normpath(os.fspath(images_dir))}.shards-{imgsz}"
+
+
+def _shard_name(shard):
+    return f"shard-{shard:05d}.bin"
+
+
+def list_images(images_dir):
+    """Image files of a folder as sorted os.DirEntry objects (YOLO image folders are flat)."""
+    return sorted((e for e in os.scandir(images_dir) if e.is_file() and e.name.lower().endswith(IMAGE_EXTENSIONS)),
+                  key=lambda e: e.name)
+
+
+def folder_fingerprint(entries):
+    """Hash of (name, size, mtime) of every image; changes whenever an image is added, removed or edited."""
+    digest = hashlib.sha1()
+    for entry in entries:
+        st = entry.stat()
+        digest.update(f"{entry.name}\0{st.st_size}\0{st.st_mtime_ns}\n".encode('utf-8'))
+    return digest.hexdigest()
+
+
+def resize_for_training(im, imgsz):
+    """Same resize as ultralytics BaseDataset.load_image(rect_mode=True): long side to imgsz, INTER_LINEAR."""
+    h0, w0 = im.shape[:2]
+    r = imgsz / max(h0, w0)
+    if r != 1:
+        w, h = (min(math.ceil(w0 * r), imgsz), min(math.ceil(h0 * r), imgsz))
+        im = cv2.resize(im, (w, h), interpolation=cv2.INTER_LINEAR)
+    if im.ndim == 2:
+        im = im[..., None]
+    return im, (h0, w0)
+
+
+def _load_resized(path, imgsz):
+    # np.fromfile + imdecode is what ultralytics' imread does (and works with non-ASCII paths on Windows)
+    im = cv2.imdecode(np.fromfile(path, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if im is None:
+        return None, None
+    return resize_for_training(im, imgsz)
+
+
+def read_cache_meta(cache_dir):
+    """meta.json of a complete cache, or None."""
+    try:
+        with open(os.path.join(cache_dir, META_FILE), 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return meta if meta.get('version') == CACHE_VERSION else None
+
+
+def build_image_shards(images_dir, imgsz=640, cache_dir=None, shard_size_mb=1024, num_workers=8, prefetch=64):
+    """
+    Decodes and resizes every image of images_dir once and writes them into sequential shard files.
+
+    Decoding runs on a thread pool (OpenCV releases the GIL) with a bounded prefetch; the main thread
+    appends the pixels in order, so shards are written strictly sequentially. If the cache already
+    matches the folder (same images, sizes and modification times, same imgsz) nothing is done.
+
+    Returns:
+        dict: {'cache_dir', 'images', 'failed', 'bytes', 'seconds', 'up_to_date'}
+    """
+    cache_dir = cache_dir or image_shard_dir(images_dir, imgsz)
+    entries = list_images(images_dir)
+    fingerprint = folder_fingerprint(entries)
+    meta = read_cache_meta(cache_dir)
+    if meta is not None and meta['imgsz'] == imgsz and meta['fingerprint'] == fingerprint:
+        return {'cache_dir': cache_dir, 'images': len(meta['names']), 'failed': meta['failed'],
+                'bytes': meta['bytes'], 'seconds': 0.0, 'up_to_date': True}
+
+    start = time.time()
+    os.makedirs(cache_dir, exist_ok=True)
+    meta_path = os.path.join(cache_dir, META_FILE)
+    if os.path.exists(meta_path):
+        os.remove(meta_path)
+    for name in os.listdir(cache_dir):
+        if name.startswith('shard-'):
+            os.remove(os.path.join(cache_dir, name))
+
+    shard_limit = shard_size_mb * 2 ** 20
+    records, names, failed = [], [], []
+    shard, offset, total = 0, 0, 0
+    out = open(os.path.join(cache_dir, _shard_name(shard)), 'wb')
+    try:
+        with ThreadPoolExecutor(max_workers=num_workers) as pool:
+            pending = deque()
+
+            def write_next():
+                nonlocal shard, offset, total, out
+                entry, future = pending.popleft()
+                im, hw0 = future.result()
+                if im is None:
+                    failed.append(entry.name)
+                    return
+                if offset and offset + im.nbytes > shard_limit:
+                    out.close()
+                    shard, offset = shard + 1, 0
+                    out = open(os.path.join(cache_dir, _shard_name(shard)), 'wb')
+                out.write(np.ascontiguousarray(im).data)
+                records.append((shard, offset) + im.shape + hw0)
+                names.append(entry.name)
+                offset += im.nbytes
+                total += im.nbytes
+
+            for entry in entries:
+                pending.append((entry, pool.submit(_load_resized, entry.path, imgsz)))
+                if len(pending) >= prefetch:
+                    write_next()
+            while pending:
+                write_next()
+    finally:
+        out.close()
+
+    np.save(os.path.join(cache_dir, INDEX_FILE), np.array(records, dtype=INDEX_DTYPE))
+    tmp_path = f"{meta_path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'version': CACHE_VERSION, 'imgsz': imgsz, 'fingerprint': fingerprint, 'bytes': total,
+                   'failed': len(failed), 'failed_names': failed, 'names': names}, f)
+    os.replace(tmp_path, meta_path)
+    return {'cache_dir': cache_dir, 'images': len(names), 'failed': len(failed), 'bytes': total,
+            'seconds': round(time.time() - start, 2), 'up_to_date': False}
+
+
+class ImageShardCache:
+    """
+    Read access to a shard cache. get(path) returns (image, (h0, w0)) or None if the image is not cached.
+
+    Shards are memory-mapped lazily and the maps are not pickled, so the cache can be handed to
+    DataLoader worker processes (each worker opens its own maps).
+    """
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        self.meta = read_cache_meta(cache_dir)
+        if self.meta is None:
+            raise FileNotFoundError(f"No complete image shard cache in {cache_dir}")
+        self.imgsz = self.meta['imgsz']
+        self.index = np.load(os.path.join(cache_dir, INDEX_FILE))
+        self.positions = {name: i for i, name in enumerate(self.meta['names'])}
+        self._maps = {}
+
+    @classmethod
+    def open_if_current(cls, images_dir, imgsz, cache_dir=None):
+        """Opens the cache of images_dir if it exists and still matches the folder, otherwise returns None."""
+        cache_dir = cache_dir or image_shard_dir(images_dir, imgsz)
+        meta = read_cache_meta(cache_dir)
+        if meta is None or meta['imgsz'] != imgsz or meta['fingerprint'] != folder_fingerprint(list_images(images_dir)):
+            return None
+        return cls(cache_dir)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_maps'] = {}
+        return state
+
+    def __len__(self):
+        return len(self.index)
+
+    def _shard(self, shard):
+        mm = self._maps.get(shard)
+        if mm is None:
+            mm = self._maps[shard] = np.memmap(os.path.join(self.cache_dir, _shard_name(shard)),
+                                               dtype=np.uint8, mode='r')
+        return mm
+
+    def get(self, path):
+        i = self.positions.get(os.path.basename(os.fspath(path)))
+        if i is None:
+            return None
+        shard, offset, h, w, c, h0, w0 = self.index[i].tolist()
+        # Copy out of the read-only map: some augmentations write into the image in place
+        im = np.array(self._shard(shard)[offset:offset + h * w * c]).reshape(h, w, c)
+        return im, (h0, w0)
+
+
+try:
+    from ultralytics.data.dataset import YOLODataset
+    from ultralytics.models.yolo.detect import DetectionTrainer
+except ImportError:  # building shards does not need ultralytics
+    YOLODataset = DetectionTrainer = None
+else:
+    class ShardCachedYOLODataset(YOLODataset):
+        """
+        YOLODataset whose load_image reads pre-resized images from shard caches (decodes on a miss).
+        shard_caches maps an image folder to its ImageShardCache; list-file datasets can span several folders.
+        """
+
+        shard_caches = {}
+
+        def load_image(self, i, rect_mode=True):
+            hit = None
+            if self.ims[i] is None and rect_mode:
+                shard_cache = self.shard_caches.get(os.path.dirname(self.im_files[i]))
+                if shard_cache is not None:
+                    hit = shard_cache.get(self.im_files[i])
+            if hit is None:
+                return super().load_image(i, rect_mode)
+            im, (h0, w0) = hit
+
+            # Same buffer bookkeeping as BaseDataset.load_image (mosaic draws from recently loaded images)
+            if self.augment:
+                self.ims[i], self.im_hw0[i], self.im_hw[i] = im, (h0, w0), im.shape[:2]
+                self.buffer.append(i)
+                if 1 < len(self.buffer) >= self.max_buffer_length:
+                    j = self.buffer.pop(0)
+                    if self.cache != "ram":
+                        self.ims[j], self.im_hw0[j], self.im_hw[j] = None, None, None
+            return im, (h0, w0), im.shape[:2]
+
+    class ShardCachedTrainer(DetectionTrainer):
+        """
+        DetectionTrainer whose train/val datasets read pre-resized images from shard caches.
+
+        For every folder the dataset's images come from (one folder, or several for list-file splits) the
+        trainer looks for <images_dir>.shards-<imgsz> (see build_image_shards); folders without an
+        up-to-date cache are decoded from the original files as usual.
+        Use it with model.train(..., trainer=ShardCachedTrainer).
+        """
+
+        def build_dataset(self, img_path, mode="train", batch=None):
+            dataset = super().build_dataset(img_path, mode=mode, batch=batch)
+            if type(dataset) is not YOLODataset:
+                return dataset
+            shard_caches = {}
+            for images_dir in sorted({os.path.dirname(f) for f in dataset.im_files}):
+                shard_cache = ImageShardCache.open_if_current(images_dir, self.args.imgsz)
+                if shard_cache is None:
+                    print(f"Image shard cache: none or outdated for {images_dir} ({mode}), decoding original images")
+                else:
+                    print(f"Image shard cache: {mode} images from {shard_cache.cache_dir} ({len(shard_cache)} images)")
+                    shard_caches[images_dir] = shard_cache
+            if shard_caches:
+                # Only load_image changes; labels, transforms and collate stay those of the built dataset
+                dataset.__class__ = ShardCachedYOLODataset
+                dataset.shard_caches = shard_caches
+            return dataset
+
+
+def main():
+    # --- Configuration ---
+    dataset_root_dir = "D:/Python_Files/Personal_projects/YOLOv8/hand_detection_dataset_converted"
+    imgsz = 640  # Must match the imgsz used for training
+    num_workers = 8
+
+    for split in ('train', 'validation'):
+        images_dir = os.path.join(dataset_root_dir, split, 'images')
+        print(f"Building image shard cache for {images_dir} (imgsz={imgsz})...")
+        stats = build_image_shards(images_dir, imgsz=imgsz, num_workers=num_workers)
+        if stats['up_to_date']:
+            print(f"  Up to date: {stats['images']} images in {stats['cache_dir']}")
+        else:
+            print(f"  {stats['images']} images ({stats['bytes'] / 2 ** 30:.2f} GiB) written to {stats['cache_dir']} "
+                  f"in {stats['seconds']:.1f}s, {stats['failed']} failed")
+
+
+if __name__ == "__main__":
+    main()
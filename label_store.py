@@ -0,0 +1,134 @@
+"""
+Packed label store: all YOLO labels of a split in one memory-mappable array.
+
+Layout of a store directory (e.g. train/labels.pack next to train/labels):
+    labels.npy   float32 (num_boxes, 5): class, x_center, y_center, width, height, grouped by image
+    offsets.npy  int64 (num_images + 1,): labels of image i are labels[offsets[i]:offsets[i + 1]]
+    meta.json    image file names (in offset order), class names, annotation hash and counts
+
+Opening a store maps the two arrays instead of reading them, so the labels of a whole epoch cost
+one mmap instead of one open() per image, and per-image label arrays are views into that map.
+"""
+
+import json
+import os
+
+import numpy as np
+
+STORE_VERSION = 1
+LABELS_FILE = 'labels.npy'
+OFFSETS_FILE = 'offsets.npy'
+META_FILE = 'meta.json'
+
+
+def label_store_path(labels_dir):
+    """Default store location for a labels directory: <labels_dir>.pack"""
+    return os.path.normpath(os.fspath(labels_dir)) + '.pack'
+
+
+def _replace_npy(path, array):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        np.save(f, array)
+    os.replace(tmp_path, path)
+
+
+def write_label_store(index, store_dir, **meta):
+    """
+    Writes a label index (see convert_coco_to_yolo.index_coco_tables) as a packed store.
+
+    The metadata file is removed first and written last, so an interrupted write never leaves a
+    store that looks complete. Extra keyword arguments are recorded in meta.json.
+    """
+    os.makedirs(store_dir, exist_ok=True)
+    meta_path = os.path.join(store_dir, META_FILE)
+    if os.path.exists(meta_path):
+        os.remove(meta_path)
+
+    labels = np.empty((len(index['class_ids']), 5), dtype=np.float32)
+    labels[:, 0] = index['class_ids']
+    # Rounded to the 6 decimals of the .txt format first, so exporting reproduces the same text
+    labels[:, 1:] = np.round(index['boxes'], 6)
+    _replace_npy(os.path.join(store_dir, LABELS_FILE), labels)
+    _replace_npy(os.path.join(store_dir, OFFSETS_FILE), np.asarray(index['offsets'], dtype=np.int64))
+
+    meta = dict(meta, version=STORE_VERSION, class_names=index['class_names'],
+                num_labeled_images=len(index['file_names']), num_boxes=len(labels),
+                file_names=index['file_names'])
+    tmp_path = f"{meta_path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(meta, f)
+    os.replace(tmp_path, meta_path)
+    return store_dir
+
+
+def read_label_store_meta(store_dir):
+    """meta.json of a complete store, or None if there is no (complete) store in store_dir."""
+    try:
+        with open(os.path.join(store_dir, META_FILE), 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return meta if meta.get('version') == STORE_VERSION else None
+
+
+class LabelStore:
+    """
+    Read-only view of a packed label store.
+
+    store[i] returns the (n, 5) float32 labels of the i-th image (a view into the memory map, no copy);
+    store.get(name) looks an image up by file name, path or label file name.
+    """
+
+    def __init__(self, store_dir):
+        self.store_dir = store_dir
+        self.meta = read_label_store_meta(store_dir)
+        if self.meta is None:
+            raise FileNotFoundError(f"No complete label store in {store_dir}")
+        self.labels = np.load(os.path.join(store_dir, LABELS_FILE), mmap_mode='r')
+        self.offsets = np.load(os.path.join(store_dir, OFFSETS_FILE), mmap_mode='r')
+        self.file_names = self.meta['file_names']
+        self.class_names = self.meta['class_names']
+        self._positions = None
+
+    def __len__(self):
+        return len(self.file_names)
+
+    def __getitem__(self, i):
+        return self.labels[self.offsets[i]:self.offsets[i + 1]]
+
+    def __iter__(self):
+        for i, file_name in enumerate(self.file_names):
+            yield file_name, self[i]
+
+    @staticmethod
+    def _key(name):
+        return os.path.splitext(os.path.basename(os.fspath(name)))[0]
+
+    def position(self, name):
+        """Index of an image by file name, path or label name (None if it has no labels)."""
+        if self._positions is None:
+            self._positions = {self._key(f): i for i, f in enumerate(self.file_names)}
+        return self._positions.get(self._key(name))
+
+    def get(self, name, default=None):
+        i = self.position(name)
+        return default if i is None else self[i]
+
+
+def export_yolo_txt(store, labels_dir):
+    """
+    Writes the store back out as one YOLO .txt file per image (same text as the direct .txt conversion).
+
+    Returns:
+        int: Number of label files written.
+    """
+    if not isinstance(store, LabelStore):
+        store = LabelStore(store)
+    os.makedirs(labels_dir, exist_ok=True)
+    for file_name, labels in store:
+        label_path = os.path.join(labels_dir, os.path.splitext(os.path.basename(file_name))[0] + '.txt')
+        with open(label_path, 'w') as f_label:
+            f_label.write("".join(f"{int(c)} {x:.6f} {y:.6f} {w:.6f} {h:.6f}\n"
+                                  for c, x, y, w, h in labels.tolist()))
+    return len(store)
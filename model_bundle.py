@@ -0,0 +1,137 @@
+"""
+Multi-resolution model bundle: the hand detector at several input sizes with a latency/accuracy table.
+
+Hands close to the camera are large enough that 320 or 416 pixels find them as well as 640, at a
+fraction of the CPU time. The build step takes trained weights and, for every input size,
+    1. optionally fine-tunes a few epochs at that size (otherwise the weights are used as they are;
+       the detector is fully convolutional, so it runs at any size that is a multiple of 32),
+    2. evaluates mAP50 / mAP50-95 on the validation set at that size,
+    3. benchmarks CPU latency per frame (preprocess + inference + postprocess) with the serving backend,
+and writes everything into one folder:
+    manifest.json        source, backend and one entry per variant: imgsz, weights, mAP50, mAP50-95, cpu_ms
+    hand.pt              weights shared by all variants when they are not fine-tuned, or
+    hand_<imgsz>.pt      weights of each fine-tuned variant
+Exports for other backends are created next to the weights, one per input size (see model_registry).
+
+model_registry.get_bundle_model(bundle_dir, latency_budget_ms) picks the most accurate variant that fits
+the budget; the camera and web tools accept a bundle folder instead of a weights file.
+"""
+
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+from ultralytics import YOLO
+
+from model_registry import BUNDLE_MANIFEST, get_model
+
+BUNDLE_VERSION = 1
+
+
+def benchmark_cpu_latency(model, imgsz, frame_shape=(480, 640, 3), runs=30, warmup=5):
+    """Median CPU time per frame (ms) of model.predict, including pre- and postprocessing."""
+    frame = np.zeros(frame_shape, dtype=np.uint8)
+    times = []
+    for i in range(warmup + runs):
+        result = model.predict(frame, imgsz=imgsz, device='cpu', verbose=False)[0]
+        if i >= warmup:
+            times.append(sum(result.speed.values()))
+    return float(np.median(times))
+
+
+def build_model_bundle(weights, data, bundle_dir, sizes=(320, 416, 512, 640), fine_tune_epochs=0,
+                       backend='pytorch', device=None, frame_shape=(480, 640, 3), train_args=None):
+    """
+    Builds a bundle folder and returns its manifest.
+
+    Args:
+        weights: Trained weights (.pt) to derive the variants from.
+        data: Dataset YAML used for fine-tuning and validation.
+        sizes: Input sizes (multiples of 32).
+        fine_tune_epochs: Epochs of fine-tuning per size (0 = evaluate the weights as they are).
+        backend: Serving backend the latency is measured with ('pytorch', 'onnx', 'openvino', ...).
+        device: Device for fine-tuning and validation (latency is always measured on CPU).
+        frame_shape: Frame size (h, w, c) used for the latency benchmark, e.g. the camera resolution.
+        train_args: Extra model.train() arguments for fine-tuning.
+    """
+    bundle_dir = os.path.abspath(bundle_dir)
+    os.makedirs(bundle_dir, exist_ok=True)
+    for imgsz in sizes:
+        if imgsz % 32:
+            raise ValueError(f"imgsz must be a multiple of 32, got {imgsz}")
+    if fine_tune_epochs <= 0:
+        # Same weights at every size: one copy, the registry keeps exports apart by input size
+        shared_weights = os.path.join(bundle_dir, "hand.pt")
+        shutil.copyfile(weights, shared_weights)
+
+    variants = []
+    for imgsz in sorted(sizes):
+        if fine_tune_epochs > 0:
+            variant_weights = os.path.join(bundle_dir, f"hand_{imgsz}.pt")
+            print(f"\nFine-tuning at imgsz={imgsz} for {fine_tune_epochs} epochs...")
+            model = YOLO(weights)
+            # Explicit optimizer: with 'auto' ultralytics ignores lr0 and picks its own learning rate
+            model.train(**{'data': data, 'imgsz': imgsz, 'epochs': fine_tune_epochs, 'optimizer': 'AdamW',
+                           'lr0': 0.002, 'warmup_epochs': 0, 'device': device,
+                           'project': os.path.join(bundle_dir, 'runs'), 'name': f"imgsz{imgsz}", 'exist_ok': True,
+                           'plots': False, **(train_args or {})})
+            shutil.copyfile(model.trainer.best, variant_weights)
+        else:
+            variant_weights = shared_weights
+
+        print(f"\nEvaluating imgsz={imgsz}...")
+        metrics = YOLO(variant_weights).val(data=data, imgsz=imgsz, device=device, plots=False, verbose=False)
+        # Latency with the serving path: the registry loads (and for other backends exports) the model
+        served = get_model(variant_weights, device='cpu', backend=backend, imgsz=imgsz)
+        variant = {
+            'imgsz': imgsz,
+            'weights': os.path.basename(variant_weights),
+            'mAP50': round(float(metrics.box.map50), 4),
+            'mAP50-95': round(float(metrics.box.map), 4),
+            'cpu_ms': round(benchmark_cpu_latency(served, imgsz, frame_shape), 2),
+            'fine_tuned': fine_tune_epochs > 0,
+        }
+        variants.append(variant)
+        print(f"imgsz={imgsz}: mAP50-95={variant['mAP50-95']:.4f}, {variant['cpu_ms']:.1f} ms/frame (CPU, {backend})")
+
+    manifest = {
+        'version': BUNDLE_VERSION,
+        'source': os.path.abspath(weights),
+        'data': data,
+        'backend': backend,
+        'frame_shape': list(frame_shape),
+        'cpu_threads': os.cpu_count(),
+        'created': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'variants': variants,
+    }
+    with open(os.path.join(bundle_dir, BUNDLE_MANIFEST), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def print_bundle_table(manifest):
+    print(f"\n--- Model Bundle ({manifest['backend']}, CPU latency per {manifest['frame_shape'][1]}x"
+          f"{manifest['frame_shape'][0]} frame) ---")
+    print(f"{'imgsz':>6} {'mAP50-95':>9} {'mAP50':>7} {'ms/frame':>9}  weights")
+    for v in manifest['variants']:
+        print(f"{v['imgsz']:>6} {v['mAP50-95']:>9.4f} {v['mAP50']:>7.4f} {v['cpu_ms']:>9.1f}  {v['weights']}")
+
+
+def main():
+    # --- Configuration ---
+    weights = r"D:\Python_Files\Personal_projects\YOLOv8\runs\detect\yolo11n_hand_detect.pt2\weights\best.pt"
+    dataset_yaml_path = "hand_detection_dataset.yaml"  # Written by train_hand_detector.py
+    bundle_dir = "hand_detector_bundle"
+    sizes = (320, 416, 512, 640)
+    fine_tune_epochs = 0     # e.g. 5 to adapt each variant to its input size
+    backend = 'pytorch'      # Backend the tools serve with ('onnx', 'openvino', ...)
+
+    manifest = build_model_bundle(weights, dataset_yaml_path, bundle_dir, sizes, fine_tune_epochs, backend)
+    print_bundle_table(manifest)
+    print(f"Bundle written to {os.path.abspath(bundle_dir)}")
+
+
+if __name__ == "__main__":
+    main()
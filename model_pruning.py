@@ -0,0 +1,266 @@
+"""
+Structured channel pruning and fine-tuning of the trained hand detector for faster CPU inference.
+
+Workflow (main):
+    1. Measure the trained model: validation mAP, MACs, CPU latency.
+    2. Prune convolution channels step by step until a MAC or CPU latency budget is met. Channels are
+       ranked by weight magnitude over whole dependency groups (torch_pruning), so every layer that
+       consumes a pruned channel shrinks with it and the result is a normal dense, smaller network.
+    3. Fine-tune the pruned model for a few epochs to recover accuracy.
+    4. Measure again and write a before/after report.
+
+torch_pruning is only needed for step 2 (pip install torch-pruning). The pruned checkpoint is a regular
+ultralytics checkpoint with the smaller modules pickled in, so YOLO(path), model_registry.get_model and
+the camera/photo tools load it like any other weights file (this module must be importable, which it
+is when they run from the project folder).
+
+C2f / C3k2 blocks split their first convolution with chunk(2), which cannot lose channels unevenly.
+Before pruning they are replaced by the equivalent C2fSplit (two convolutions), and the Detect head and
+attention blocks (C2PSA) are excluded from pruning.
+"""
+
+import copy
+import json
+import time
+
+import numpy as np
+import torch
+import torch.nn as nn
+from ultralytics import YOLO
+from ultralytics.models.yolo.detect import DetectionTrainer
+from ultralytics.nn.modules import C2f, C2PSA, Detect
+
+
+def _slice_conv(conv, start, stop):
+    """Copy of an ultralytics Conv (conv + bn + act) keeping output channels start:stop."""
+    part = copy.deepcopy(conv)
+    part.conv.weight = nn.Parameter(conv.conv.weight.data[start:stop].clone())
+    part.conv.out_channels = stop - start
+    if part.conv.bias is not None:
+        part.conv.bias = nn.Parameter(conv.conv.bias.data[start:stop].clone())
+    if hasattr(part, 'bn'):
+        part.bn.weight = nn.Parameter(conv.bn.weight.data[start:stop].clone())
+        part.bn.bias = nn.Parameter(conv.bn.bias.data[start:stop].clone())
+        part.bn.running_mean = conv.bn.running_mean[start:stop].clone()
+        part.bn.running_var = conv.bn.running_var[start:stop].clone()
+        part.bn.num_features = stop - start
+    return part
+
+
+class C2fSplit(nn.Module):
+    """C2f / C3k2 with cv1 split into two convolutions (same output), so both halves can be pruned independently."""
+
+    def __init__(self, c2f):
+        super().__init__()
+        half = c2f.cv1.conv.out_channels // 2
+        self.cv0 = _slice_conv(c2f.cv1, 0, half)
+        self.cv1 = _slice_conv(c2f.cv1, half, 2 * half)
+        self.cv2 = c2f.cv2
+        self.m = c2f.m
+        # Layer bookkeeping used by DetectionModel._predict_once and model.info()
+        for attr in ('f', 'i', 'type', 'np'):
+            if hasattr(c2f, attr):
+                setattr(self, attr, getattr(c2f, attr))
+
+    def forward(self, x):
+        y = [self.cv0(x), self.cv1(x)]
+        y.extend(m(y[-1]) for m in self.m)
+        return self.cv2(torch.cat(y, 1))
+
+
+def split_c2f_blocks(model):
+    """Replaces the C2f / C3k2 layers of a DetectionModel by C2fSplit (in place); returns the number replaced."""
+    replaced = 0
+    for i, layer in enumerate(model.model):
+        if isinstance(layer, C2f):
+            model.model[i] = C2fSplit(layer)
+            replaced += 1
+    return replaced
+
+
+def is_pruned_model(model):
+    return any(isinstance(m, C2fSplit) for m in model.modules())
+
+
+def count_macs(model, imgsz=640):
+    """Multiply-accumulates of one forward pass at imgsz (convolutions and linear layers)."""
+    macs = []
+
+    def hook(module, inputs, output):
+        if isinstance(module, nn.Conv2d):
+            kernel = module.kernel_size[0] * module.kernel_size[1] * module.in_channels // module.groups
+            macs.append(output.numel() * kernel)
+        elif isinstance(module, nn.Linear):
+            macs.append(output.numel() * module.in_features)
+
+    handles = [m.register_forward_hook(hook) for m in model.modules() if isinstance(m, (nn.Conv2d, nn.Linear))]
+    was_training = model.training
+    try:
+        model.eval()
+        with torch.no_grad():
+            model(torch.zeros(1, 3, imgsz, imgsz, device=next(model.parameters()).device))
+    finally:
+        for handle in handles:
+            handle.remove()
+        model.train(was_training)
+    return int(sum(macs))
+
+
+def measure_cpu_latency(model, imgsz=640, runs=30, warmup=5):
+    """Median CPU latency (ms) of one fused, eval-mode forward pass at imgsz, batch 1."""
+    model = copy.deepcopy(model).float().cpu().eval()
+    if hasattr(model, 'fuse'):
+        model = model.fuse(verbose=False)
+    x = torch.zeros(1, 3, imgsz, imgsz)
+    times = []
+    with torch.inference_mode():
+        for i in range(warmup + runs):
+            start = time.perf_counter()
+            model(x)
+            if i >= warmup:
+                times.append((time.perf_counter() - start) * 1000)
+    return float(np.median(times))
+
+
+def prune_model(model, imgsz=640, target_macs_ratio=0.5, target_latency_ms=None, max_pruning_ratio=0.8,
+                steps=16, round_to=8):
+    """
+    Prunes a DetectionModel in place until its MACs drop to target_macs_ratio of the original, or (if
+    target_latency_ms is set) its CPU latency drops below that many milliseconds.
+
+    Args:
+        max_pruning_ratio: Upper limit for the share of channels removed from any prunable layer.
+        steps: Pruning steps from 0 to max_pruning_ratio; the budget is checked after each step.
+        round_to: Keep channel counts multiples of this (SIMD-friendly on CPU).
+    Returns:
+        list of {'step', 'macs', 'params', 'latency_ms'} after each step
+    """
+    try:
+        import torch_pruning as tp
+    except ImportError as e:
+        raise ImportError("Channel pruning needs torch_pruning: pip install torch-pruning") from e
+
+    split_c2f_blocks(model)
+    model.eval()
+    for p in model.parameters():
+        p.requires_grad_(True)
+    ignored = [m for m in model.modules() if isinstance(m, (Detect, C2PSA))]
+    importance_cls = getattr(tp.importance, 'GroupMagnitudeImportance', None) or tp.importance.MagnitudeImportance
+    example_inputs = torch.zeros(1, 3, imgsz, imgsz, device=next(model.parameters()).device)
+    pruner = tp.pruner.MetaPruner(model, example_inputs, importance=importance_cls(p=2), iterative_steps=steps,
+                                  pruning_ratio=max_pruning_ratio, ignored_layers=ignored, round_to=round_to)
+
+    base_macs = count_macs(model, imgsz)
+    history = []
+    for step in range(1, steps + 1):
+        pruner.step()
+        record = {'step': step, 'macs': count_macs(model, imgsz), 'params': sum(p.numel() for p in model.parameters())}
+        if target_latency_ms is not None:
+            record['latency_ms'] = round(measure_cpu_latency(model, imgsz), 2)
+            done = record['latency_ms'] <= target_latency_ms
+        else:
+            done = record['macs'] <= base_macs * target_macs_ratio
+        history.append(record)
+        print(f"Pruning step {step}/{steps}: {record['macs'] / 1e9:.2f} GMACs "
+              f"({record['macs'] / base_macs:.0%} of original), {record['params'] / 1e6:.2f}M params"
+              + (f", {record['latency_ms']:.1f} ms" if 'latency_ms' in record else ""))
+        if done:
+            break
+    else:
+        print("Budget not reached at max_pruning_ratio; raise it or relax the target")
+    for p in model.parameters():
+        p.requires_grad_(False)
+    return history
+
+
+def save_pruned_checkpoint(yolo, model, path, **info):
+    """Saves model as an ultralytics checkpoint (based on yolo.ckpt), loadable with YOLO(path)."""
+    ckpt = dict(yolo.ckpt or {})
+    ckpt.update(model=copy.deepcopy(model).half(), ema=None, optimizer=None, updates=None, epoch=-1,
+                best_fitness=None, pruning=info)
+    torch.save(ckpt, path)
+    return path
+
+
+class PrunedModelTrainer(DetectionTrainer):
+    """
+    DetectionTrainer that trains the loaded model as it is. The default get_model rebuilds the network
+    from its YAML and copies matching weights over, which would undo the pruning.
+    """
+
+    def get_model(self, cfg=None, weights=None, verbose=True):
+        if isinstance(weights, nn.Module) and is_pruned_model(weights):
+            return weights
+        return super().get_model(cfg=cfg, weights=weights, verbose=verbose)
+
+
+def pruned_model_trainer(base=None):
+    """PrunedModelTrainer behaviour on top of another trainer class (e.g. ShardCachedTrainer)."""
+    if base is None or base is DetectionTrainer:
+        return PrunedModelTrainer
+    return type(f"Pruned{base.__name__}", (PrunedModelTrainer, base), {})
+
+
+def evaluate(weights, data, imgsz=640, device=None):
+    """Validation mAP, MACs and CPU latency of a weights file."""
+    model = YOLO(weights)
+    metrics = model.val(data=data, imgsz=imgsz, device=device, plots=False, verbose=False)
+    return {
+        'weights': str(weights),
+        'mAP50': round(float(metrics.box.map50), 4),
+        'mAP50-95': round(float(metrics.box.map), 4),
+        'gmacs': round(count_macs(model.model, imgsz) / 1e9, 3),
+        'params_m': round(sum(p.numel() for p in model.model.parameters()) / 1e6, 3),
+        'cpu_ms': round(measure_cpu_latency(model.model, imgsz), 2),
+    }
+
+
+def main():
+    # --- Configuration ---
+    weights = r"D:\Python_Files\Personal_projects\YOLOv8\runs\detect\yolo11n_hand_detect.pt2\weights\best.pt"
+    dataset_yaml_path = "hand_detection_dataset.yaml"  # Written by train_hand_detector.py
+    pruned_path = "yolo11n_hand_detect_pruned.pt"
+    report_path = "pruning_report.json"
+    imgsz = 640
+    target_macs_ratio = 0.5      # Keep at most 50% of the original MACs ...
+    target_latency_ms = None     # ... or prune until CPU latency (ms, batch 1) is below this instead
+    fine_tune_epochs = 10
+    device = None                # Device for validation and fine-tuning (None = automatic)
+
+    before = evaluate(weights, dataset_yaml_path, imgsz, device)
+    print(f"Before pruning: {before}")
+
+    yolo = YOLO(weights)
+    model = yolo.model.float().cpu()
+    history = prune_model(model, imgsz, target_macs_ratio, target_latency_ms)
+    save_pruned_checkpoint(yolo, model, pruned_path, source=str(weights), imgsz=imgsz, history=history)
+    pruned = evaluate(pruned_path, dataset_yaml_path, imgsz, device)
+    print(f"After pruning (no fine-tuning): {pruned}")
+
+    # Fine-tuning: short run starting from the pruned weights with the usual training arguments.
+    # For a longer run set base_weights in train_hand_detector.py to the pruned checkpoint instead.
+    # The optimizer is explicit because optimizer='auto' ignores lr0 and picks its own learning rate.
+    tuned_model = YOLO(pruned_path)
+    tuned_model.train(data=dataset_yaml_path, trainer=pruned_model_trainer(), epochs=fine_tune_epochs,
+                      imgsz=imgsz, device=device, optimizer='AdamW', lr0=0.002, warmup_epochs=0,
+                      name="yolo11n_hand_detect_pruned")
+    tuned_path = str(tuned_model.trainer.best)
+    after = evaluate(tuned_path, dataset_yaml_path, imgsz, device)
+    print(f"After fine-tuning: {after}")
+
+    report = {'before': before, 'pruned': pruned, 'fine_tuned': after, 'history': history}
+    with open(report_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print("\n--- Pruning Report ---")
+    for name, row in (('original', before), ('pruned', pruned), ('fine-tuned', after)):
+        print(f"  {name:<11} mAP50-95={row['mAP50-95']:.4f}  mAP50={row['mAP50']:.4f}  "
+              f"{row['gmacs']:.2f} GMACs  {row['params_m']:.2f}M params  {row['cpu_ms']:.1f} ms/frame (CPU)")
+    print(f"Fine-tuned weights: {tuned_path}")
+    print(f"Report saved to {report_path}")
+
+
+if __name__ == "__main__":
+    # Run through the importable module, so pickled C2fSplit layers refer to model_pruning.C2fSplit
+    # rather than __main__.C2fSplit (which other scripts could not load)
+    import model_pruning
+    model_pruning.main()
@@ -0,0 +1,213 @@
+import json
+import os
+import shutil
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+from ultralytics import YOLO
+
+from file_hash import file_sha256
+
+# 导出后端 -> ultralytics 导出文件相对于权重文件的命名
+# 导出模型的输入尺寸是固定的，导出后改名为 <权重名>_<imgsz><后缀>，按尺寸分别复用
+EXPORT_SUFFIXES = {
+    'onnx': '.onnx',
+    'torchscript': '.torchscript',
+    'openvino': '_openvino_model',
+    'engine': '.engine',
+    'ncnn': '_ncnn_model',
+}
+
+# 多分辨率模型包（model_bundle.py 生成）目录中的清单文件
+BUNDLE_MANIFEST = 'manifest.json'
+
+
+class ModelRegistry:
+    """
+    进程级模型缓存
+
+    按 (权重路径, 文件哈希, 设备, 后端, 输入尺寸) 缓存已加载并预热过的模型，
+    同一个进程内重复调用不会再次读取权重；超过 max_models 时淘汰最久未使用的模型；
+    权重文件被修改（大小或修改时间变化）后，旧模型自动失效并重新加载。
+    """
+
+    def __init__(self, max_models=4):
+        self.max_models = max_models
+        self._models = OrderedDict()  # key -> YOLO
+        self._hashes = {}  # 权重路径 -> (size, mtime_ns, sha256)
+        self._lock = threading.RLock()
+
+    def weights_hash(self, weights):
+        """返回权重文件的哈希；文件未变化时直接使用缓存值，不重复读取"""
+        path = str(Path(weights).resolve())
+        st = os.stat(path)
+        with self._lock:
+            cached = self._hashes.get(path)
+            if cached and cached[:2] == (st.st_size, st.st_mtime_ns):
+                return cached[2]
+
+        digest = file_sha256(path)
+        with self._lock:
+            if cached and cached[2] != digest:
+                # 权重文件内容变了，丢弃所有基于旧内容加载的模型
+                self._drop(path)
+            self._hashes[path] = (st.st_size, st.st_mtime_ns, digest)
+        return digest
+
+    def get(self, weights, device=None, backend='pytorch', imgsz=640, warmup=True):
+        """
+        获取模型（已缓存则直接返回）
+
+        Args:
+            weights: 权重文件路径（.pt）
+            device: 推理设备，如 'cpu'、'0'；None 表示由 ultralytics 自动选择
+            backend: 'pytorch' 或 ultralytics 支持的导出格式（'onnx'、'openvino'、'torchscript' 等）
+            imgsz: 推理输入尺寸
+            warmup: 首次加载后是否用空白图预热一次
+        """
+        path = str(Path(weights).resolve())
+        key = (path, self.weights_hash(path), str(device), backend, imgsz)
+
+        with self._lock:
+            model = self._models.get(key)
+            if model is not None:
+                self._models.move_to_end(key)
+                return model
+
+            model = self._load(path, device, backend, imgsz)
+            if warmup:
+                model.predict(np.zeros((imgsz, imgsz, 3), dtype=np.uint8), imgsz=imgsz, verbose=False)
+
+            self._models[key] = model
+            while len(self._models) > self.max_models:
+                evicted_key, _ = self._models.popitem(last=False)
+                print(f"模型缓存已满，释放: {evicted_key[0]} ({evicted_key[3]}, device={evicted_key[2]})")
+            return model
+
+    def _load(self, path, device, backend, imgsz):
+        """加载（必要时导出）模型，并把设备和尺寸固定到模型的默认参数中"""
+        print(f"正在加载模型: {path} (backend={backend}, device={device}, imgsz={imgsz})")
+        if backend == 'pytorch':
+            model = YOLO(path)
+        else:
+            exported = self._exported_path(path, backend, imgsz)
+            if exported is None:
+                exported = YOLO(path).export(format=backend, imgsz=imgsz, device=device)
+                target = self._export_target(path, backend, imgsz)
+                if target is not None:
+                    exported = self._move_export(exported, target)
+            model = YOLO(exported, task='detect')
+
+        model.overrides['imgsz'] = imgsz
+        if device is not None:
+            model.overrides['device'] = device
+        return model
+
+    @staticmethod
+    def _export_target(path, backend, imgsz):
+        """该后端、该输入尺寸的导出结果应存放的位置；不认识的后端返回 None（每次重新导出）"""
+        suffix = EXPORT_SUFFIXES.get(backend)
+        if suffix is None:
+            return None
+        weights = Path(path)
+        return weights.with_name(f"{weights.stem}_{imgsz}{suffix}")
+
+    @classmethod
+    def _exported_path(cls, path, backend, imgsz):
+        """已有同一输入尺寸、且比权重文件更新的导出结果时直接复用，否则返回 None"""
+        exported = cls._export_target(path, backend, imgsz)
+        if exported is not None and exported.exists() and exported.stat().st_mtime >= Path(path).stat().st_mtime:
+            return str(exported)
+        return None
+
+    @staticmethod
+    def _move_export(exported, target):
+        """把 ultralytics 的导出结果（<权重名><后缀>）改名为带输入尺寸的名字，覆盖旧的同名导出"""
+        if target.is_dir():
+            shutil.rmtree(target)
+        os.replace(exported, target)
+        return str(target)
+
+    def _drop(self, path):
+        for key in [k for k in self._models if k[0] == path]:
+            del self._models[key]
+
+    def invalidate(self, weights=None):
+        """手动失效指定权重的所有缓存模型；weights 为 None 时清空整个缓存"""
+        with self._lock:
+            if weights is None:
+                self._models.clear()
+                self._hashes.clear()
+                return
+            path = str(Path(weights).resolve())
+            self._drop(path)
+            self._hashes.pop(path, None)
+
+
+# 进程内共享的默认缓存
+_registry = ModelRegistry()
+
+
+def get_model(weights, device=None, backend='pytorch', imgsz=640, warmup=True):
+    """从进程级缓存获取模型，参数见 ModelRegistry.get"""
+    return _registry.get(weights, device=device, backend=backend, imgsz=imgsz, warmup=warmup)
+
+
+def weights_hash(weights):
+    """权重文件哈希（带缓存，文件不变时不重复读取）"""
+    return _registry.weights_hash(weights)
+
+
+def invalidate_model(weights=None):
+    """失效进程级缓存中的模型，参数见 ModelRegistry.invalidate"""
+    _registry.invalidate(weights)
+
+
+def is_model_bundle(path):
+    """path 是否为多分辨率模型包目录"""
+    return os.path.isdir(path) and os.path.isfile(os.path.join(path, BUNDLE_MANIFEST))
+
+
+def load_bundle_manifest(bundle_dir):
+    with open(os.path.join(bundle_dir, BUNDLE_MANIFEST), 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def select_bundle_variant(manifest, latency_budget_ms=None):
+    """
+    按延迟预算选择模型包中的变体：CPU 延迟不超过预算的变体中 mAP50-95 最高的一个；
+    没有变体满足预算时选最快的；latency_budget_ms 为 None 时选精度最高的
+    注意：清单中的延迟是在构建模型包的机器上测得的，其他机器上应按比例调整预算
+    """
+    variants = manifest['variants']
+    if latency_budget_ms is None:
+        return max(variants, key=lambda v: (v['mAP50-95'], -v['cpu_ms']))
+    fitting = [v for v in variants if v['cpu_ms'] <= latency_budget_ms]
+    if not fitting:
+        fastest = min(variants, key=lambda v: v['cpu_ms'])
+        print(f"没有变体满足 {latency_budget_ms}ms 的延迟预算，使用最快的 imgsz={fastest['imgsz']} "
+              f"({fastest['cpu_ms']}ms)")
+        return fastest
+    return max(fitting, key=lambda v: (v['mAP50-95'], -v['cpu_ms']))
+
+
+def get_bundle_model(bundle_dir, latency_budget_ms=None, device=None, backend=None, warmup=True):
+    """
+    从多分辨率模型包中按延迟预算选择变体并加载（经过进程级缓存）
+
+    Args:
+        bundle_dir: 模型包目录（含 manifest.json）
+        latency_budget_ms: 每帧 CPU 延迟预算（毫秒），None 表示选精度最高的变体
+        device: 推理设备
+        backend: 推理后端，None 表示使用构建模型包时测速所用的后端
+    Returns:
+        (model, variant)：model 的默认输入尺寸已设为变体的 imgsz；variant 为清单中的条目
+    """
+    manifest = load_bundle_manifest(bundle_dir)
+    variant = select_bundle_variant(manifest, latency_budget_ms)
+    print(f"模型包变体: imgsz={variant['imgsz']}, mAP50-95={variant['mAP50-95']}, {variant['cpu_ms']}ms/帧")
+    model = get_model(os.path.join(bundle_dir, variant['weights']), device=device,
+                      backend=backend or manifest.get('backend', 'pytorch'), imgsz=variant['imgsz'], warmup=warmup)
+    return model, variant
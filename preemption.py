@@ -0,0 +1,187 @@
+"""
+Preemption-safe training: signal handling, checkpoint backup and retention, automatic resume.
+
+ultralytics saves weights/last.pt after every epoch and can resume from it, so a killed job should
+lose at most the epoch in progress. This module makes that hold in practice:
+
+- PreemptionGuard traps SIGTERM / SIGINT (SIGBREAK on Windows). On the first signal training finishes
+  the current epoch (validation, last.pt) and stops without the final evaluation, leaving last.pt
+  resumable. If a grace period is given and the rest of the epoch would not fit into it, training is
+  interrupted at the next batch instead (raising Preempted); last.pt of the previous epoch is kept.
+  A second signal interrupts immediately.
+- last.pt is written in place by ultralytics, so a kill during the write corrupts it. After every save
+  the guard copies it atomically to last_backup.pt, which is used when last.pt cannot be loaded.
+- Periodic checkpoints (save_period -> weights/epochN.pt) are pruned to the newest keep_last, plus
+  every keep_every-th epoch if set.
+- find_resumable_run() finds an unfinished run of the same name, so the next launch resumes it.
+"""
+
+import os
+import re
+import shutil
+import signal
+import time
+from pathlib import Path
+
+BACKUP_NAME = 'last_backup.pt'
+PERIODIC_CHECKPOINT = re.compile(r'^epoch(\d+)\.pt$')
+
+
+class Preempted(Exception):
+    """Training was interrupted by a termination signal before the current epoch could finish."""
+
+
+def _trap_signals():
+    names = ['SIGTERM', 'SIGINT', 'SIGBREAK']
+    return [getattr(signal, n) for n in names if hasattr(signal, n)]
+
+
+def prune_periodic_checkpoints(weights_dir, keep_last=3, keep_every=None):
+    """Deletes epochN.pt files except the newest keep_last and multiples of keep_every. Returns the deleted names."""
+    checkpoints = []
+    for entry in os.scandir(weights_dir):
+        match = PERIODIC_CHECKPOINT.match(entry.name)
+        if match:
+            checkpoints.append((int(match.group(1)), entry.path))
+    checkpoints.sort()
+    keep = {epoch for epoch, _ in checkpoints[-keep_last:]} if keep_last > 0 else set()
+    if keep_every:
+        keep.update(epoch for epoch, _ in checkpoints if epoch % keep_every == 0)
+    deleted = []
+    for epoch, path in checkpoints:
+        if epoch not in keep:
+            os.remove(path)
+            deleted.append(os.path.basename(path))
+    return deleted
+
+
+class PreemptionGuard:
+    """
+    Trainer callbacks for preemption-safe training; see add_preemption_guard.
+
+    Args:
+        grace_seconds: Time the machine allows between the signal and the kill (None = always finish the epoch).
+        keep_last: Periodic checkpoints (epochN.pt) to keep.
+        keep_every: Additionally keep every keep_every-th epoch's checkpoint (None = no extra ones).
+    """
+
+    def __init__(self, grace_seconds=None, keep_last=3, keep_every=None):
+        self.grace_seconds = grace_seconds
+        self.keep_last = keep_last
+        self.keep_every = keep_every
+        self.preempted = None  # Name of the signal that stopped training
+        self._signal_time = None
+        self._trainer = None
+        self._previous_handlers = {}
+        self._batches = 0
+        self._epoch_start = self._last_batch_end = 0.0
+        self._epoch_overhead = 0.0  # validation + saving after the last batch of the previous epoch
+
+    def _handle(self, signum, frame):
+        name = signal.Signals(signum).name
+        if self.preempted is not None:
+            print(f"\n{name} received again, interrupting training now")
+            raise Preempted(name)
+        self.preempted, self._signal_time = name, time.time()
+        print(f"\n{name} received: finishing the current epoch and saving last.pt, then stopping "
+              f"(send again to stop immediately)")
+        trainer = self._trainer
+        if trainer is not None:
+            trainer.stop = True
+            # The final evaluation of best.pt would also strip last.pt and make it non-resumable
+            trainer.final_eval = lambda: None
+
+    def on_train_start(self, trainer):
+        self._trainer = trainer
+        for sig in _trap_signals():
+            try:
+                self._previous_handlers[sig] = signal.signal(sig, self._handle)
+            except (ValueError, OSError):  # not in the main thread
+                pass
+
+    def on_train_epoch_start(self, trainer):
+        self._batches = 0
+        self._epoch_start = self._last_batch_end = time.time()
+
+    def on_train_batch_end(self, trainer):
+        self._batches += 1
+        self._last_batch_end = now = time.time()
+        if self.preempted is None or self.grace_seconds is None:
+            return
+        remaining_batches = len(trainer.train_loader) - self._batches
+        needed = (now - self._epoch_start) / self._batches * remaining_batches + self._epoch_overhead
+        if now - self._signal_time + needed > self.grace_seconds:
+            print(f"Rest of the epoch needs ~{needed:.1f}s, more than the grace period allows; "
+                  f"interrupting (last.pt of the previous epoch is kept)")
+            raise Preempted(self.preempted)
+
+    def on_model_save(self, trainer):
+        weights_dir = Path(trainer.wdir)
+        last = weights_dir / 'last.pt'
+        if last.exists():
+            tmp = weights_dir / (BACKUP_NAME + '.tmp')
+            shutil.copyfile(last, tmp)
+            os.replace(tmp, weights_dir / BACKUP_NAME)
+        deleted = prune_periodic_checkpoints(weights_dir, self.keep_last, self.keep_every)
+        if deleted:
+            print(f"Checkpoint retention: removed {', '.join(deleted)}")
+
+    def on_fit_epoch_end(self, trainer):
+        self._epoch_overhead = time.time() - self._last_batch_end
+
+    def on_train_end(self, trainer):
+        for sig, handler in self._previous_handlers.items():
+            signal.signal(sig, handler)
+        self._previous_handlers = {}
+        self._trainer = None
+
+
+def add_preemption_guard(model, grace_seconds=None, keep_last=3, keep_every=None):
+    """Registers a PreemptionGuard on a YOLO model (before model.train) and returns it."""
+    guard = PreemptionGuard(grace_seconds, keep_last, keep_every)
+    for event in ('on_train_start', 'on_train_epoch_start', 'on_train_batch_end', 'on_model_save',
+                  'on_fit_epoch_end', 'on_train_end'):
+        model.add_callback(event, getattr(guard, event))
+    return guard
+
+
+def _checkpoint_epoch(path):
+    """Epoch stored in a checkpoint (-1 for finished, stripped checkpoints), None if it cannot be loaded."""
+    import torch
+
+    try:
+        ckpt = torch.load(path, map_location='cpu', weights_only=False)
+    except Exception:
+        return None
+    if not isinstance(ckpt, dict) or ckpt.get('optimizer') is None:
+        return -1
+    return ckpt.get('epoch', -1)
+
+
+def find_resumable_run(project, name):
+    """
+    last.pt of the most recent unfinished run named name (or name2, name3, ... as ultralytics numbers
+    repeated runs) under project, or None. Falls back to last_backup.pt when last.pt is corrupt, in
+    which case the backup is copied over last.pt first.
+    """
+    project = Path(project)
+    if not project.is_dir():
+        return None
+    pattern = re.compile(re.escape(name) + r'\d*$')
+    runs = [d for d in project.iterdir() if d.is_dir() and pattern.match(d.name) and (d / 'weights').is_dir()]
+    checkpoints = [d / 'weights' / f for d in runs for f in ('last.pt', BACKUP_NAME) if (d / 'weights' / f).exists()]
+    if not checkpoints:
+        return None
+    weights_dir = max(checkpoints, key=lambda p: p.stat().st_mtime).parent
+    last, backup = weights_dir / 'last.pt', weights_dir / BACKUP_NAME
+
+    epoch = _checkpoint_epoch(last) if last.exists() else None
+    if epoch is None and backup.exists():
+        epoch = _checkpoint_epoch(backup)
+        if epoch is not None and epoch >= 0:
+            print(f"{last} is missing or unreadable, restoring it from {BACKUP_NAME}")
+            shutil.copyfile(backup, last)
+    if epoch is None or epoch < 0:
+        return None
+    print(f"Found unfinished run {weights_dir.parent} (last completed epoch {epoch + 1})")
+    return str(last)
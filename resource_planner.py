@@ -0,0 +1,171 @@
+"""
+Resource planner for training: picks device, batch size, dataloader workers and image caching.
+
+Inspects the machine (GPUs and their free memory, CPU cores, free RAM, free disk) and the dataset
+(image count and size on disk, average image size from a sample of headers) and returns training
+arguments plus the reasoning behind them. On a box without a usable GPU it falls back to CPU.
+"""
+
+import os
+import random
+import shutil
+
+from image_shards import IMAGE_EXTENSIONS, image_shard_dir
+from zip_dataset import probe_image_size
+
+GIB = 2 ** 30
+# Share of GPU memory ultralytics AutoBatch may plan for (batch=<fraction> in model.train)
+AUTOBATCH_FRACTION = 0.70
+# Share of the currently free RAM image caching may use; the rest is left to workers and the OS
+RAM_CACHE_FRACTION = 0.5
+# Rough resident memory per dataloader worker process (torch + dataset copy)
+WORKER_RAM_BYTES = 0.6 * GIB
+
+
+def free_ram_bytes():
+    """Available RAM in bytes (None if it cannot be determined)."""
+    try:
+        import psutil
+        return psutil.virtual_memory().available
+    except ImportError:
+        pass
+    try:
+        return os.sysconf('SC_AVPHYS_PAGES') * os.sysconf('SC_PAGE_SIZE')
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+def gpu_devices():
+    """[(index, name, free bytes, total bytes), ...] of usable CUDA devices."""
+    try:
+        import torch
+    except ImportError:
+        return []
+    if not torch.cuda.is_available():
+        return []
+    devices = []
+    for i in range(torch.cuda.device_count()):
+        try:
+            free, total = torch.cuda.mem_get_info(i)
+        except RuntimeError:
+            continue
+        devices.append((i, torch.cuda.get_device_name(i), free, total))
+    return devices
+
+
+def dataset_stats(images_dirs, imgsz=640, sample_size=64, seed=0):
+    """
+    Image count, bytes on disk and an estimate of the decoded size once resized to imgsz
+    (the size ultralytics' RAM cache and the image shard cache need), from a sample of image headers.
+    """
+    paths, disk_bytes = [], 0
+    for images_dir in images_dirs:
+        if not os.path.isdir(images_dir):
+            continue
+        for entry in os.scandir(images_dir):
+            if entry.is_file() and entry.name.lower().endswith(IMAGE_EXTENSIONS):
+                paths.append(entry.path)
+                disk_bytes += entry.stat().st_size
+
+    sample = random.Random(seed).sample(paths, min(sample_size, len(paths)))
+    resized = []
+    for path in sample:
+        try:
+            w, h = probe_image_size(path)
+        except Exception:
+            continue
+        r = imgsz / max(w, h)
+        resized.append(round(w * r) * round(h * r) * 3)
+    per_image = sum(resized) / len(resized) if resized else imgsz * imgsz * 3
+    return {'images': len(paths), 'disk_bytes': disk_bytes, 'decoded_bytes': int(per_image * len(paths))}
+
+
+def plan_training_resources(images_dirs, imgsz=640, prefer_device=None):
+    """
+    Chooses training resources for this machine.
+
+    Args:
+        images_dirs: Image folders used for training and validation.
+        imgsz: Training image size.
+        prefer_device: Force a device ('cpu', '0', ...); None picks automatically.
+    Returns:
+        dict: {'device', 'batch', 'workers', 'cache', 'use_image_shards', 'reasons': [str, ...]}
+    """
+    reasons = []
+    cores = os.cpu_count() or 1
+    ram = free_ram_bytes()
+    stats = dataset_stats(images_dirs, imgsz)
+    reasons.append(f"Dataset: {stats['images']} images, {stats['disk_bytes'] / GIB:.2f} GiB on disk, "
+                   f"~{stats['decoded_bytes'] / GIB:.2f} GiB decoded at imgsz={imgsz}")
+    reasons.append(f"Machine: {cores} CPU cores, "
+                   f"{'unknown' if ram is None else f'{ram / GIB:.1f} GiB'} free RAM")
+
+    # --- Device and batch ---
+    gpus = gpu_devices()
+    for index, name, free, total in gpus:
+        reasons.append(f"GPU {index}: {name}, {free / GIB:.1f} / {total / GIB:.1f} GiB free")
+    if prefer_device is not None:
+        device = prefer_device
+        reasons.append(f"Device {device} requested explicitly")
+    elif gpus:
+        index, name, free, _ = max(gpus, key=lambda g: g[2])
+        device = str(index)
+        reasons.append(f"Using GPU {index} ({name}), the one with the most free memory")
+    else:
+        device = 'cpu'
+        reasons.append("No usable CUDA GPU found, falling back to CPU")
+
+    if device != 'cpu':
+        # AutoBatch measures memory use of a few batch sizes and picks the largest that fits the fraction
+        batch = AUTOBATCH_FRACTION
+        reasons.append(f"Batch: ultralytics AutoBatch for {AUTOBATCH_FRACTION:.0%} of GPU memory")
+    else:
+        batch = 8 if ram is None or ram >= 8 * GIB else 4
+        reasons.append(f"Batch: {batch} (CPU training; larger batches only add latency per step)")
+
+    # --- Image caching ---
+    decoded = stats['decoded_bytes']
+    ram_budget = None if ram is None else ram * RAM_CACHE_FRACTION
+    if ram_budget is not None and decoded <= ram_budget:
+        cache, use_image_shards = 'ram', False
+        reasons.append(f"Cache: 'ram' (~{decoded / GIB:.2f} GiB fits in {RAM_CACHE_FRACTION:.0%} of free RAM)")
+    else:
+        cache = False
+        disk_free = min((shutil.disk_usage(os.path.dirname(os.path.abspath(d))).free
+                         for d in images_dirs if os.path.isdir(d)), default=0)
+        have_shards = all(os.path.isdir(image_shard_dir(d, imgsz)) for d in images_dirs if os.path.isdir(d))
+        use_image_shards = have_shards or decoded <= disk_free * 0.8
+        if use_image_shards:
+            reasons.append(f"Cache: pre-resized image shards on disk (~{decoded / GIB:.2f} GiB, too large for RAM)")
+        else:
+            reasons.append("Cache: none (neither RAM nor free disk space is sufficient)")
+
+    # --- Dataloader workers ---
+    if device == 'cpu':
+        # Workers compete with the training computation itself for the same cores
+        workers = max(0, min(cores // 2, 4))
+    else:
+        workers = max(0, min(cores - 1, 16))
+    if ram is not None:
+        spare = ram - (decoded if cache == 'ram' else 0)
+        workers = max(0, min(workers, int(spare // WORKER_RAM_BYTES)))
+    if cache == 'ram':
+        workers = min(workers, 4)  # decoding is done once up front; workers only run augmentation
+    reasons.append(f"Workers: {workers}")
+
+    return {'device': device, 'batch': batch, 'workers': workers, 'cache': cache,
+            'use_image_shards': use_image_shards, 'reasons': reasons}
+
+
+def print_plan(plan):
+    print("\n--- Training Resource Plan ---")
+    for reason in plan['reasons']:
+        print(f"  {reason}")
+    print(f"=> device={plan['device']}, batch={plan['batch']}, workers={plan['workers']}, "
+          f"cache={plan['cache']}, image shards={'on' if plan['use_image_shards'] else 'off'}")
+
+
+if __name__ == "__main__":
+    dataset_root_dir = "D:/Python_Files/Personal_projects/YOLOv8/hand_detection_dataset_converted"
+    print_plan(plan_training_resources([os.path.join(dataset_root_dir, 'train', 'images'),
+                                        os.path.join(dataset_root_dir, 'validation', 'images')]))
@@ -0,0 +1,57 @@
+import numpy as np
+from PIL import Image
+
+from check_dataset import check_label_lines, check_split
+from convert_coco_to_yolo import format_label_lines, index_coco_annotations, normalize_boxes
+
+
+def _coco(bboxes, width=100, height=100):
+    return {
+        'images': [{'id': 1, 'file_name': 'a.jpg', 'width': width, 'height': height}],
+        'categories': [{'id': 7, 'name': 'hand'}],
+        'annotations': [{'id': i, 'image_id': 1, 'category_id': 7, 'bbox': list(b)} for i, b in enumerate(bboxes)],
+    }
+
+
+def test_box_past_right_edge_is_clipped_to_visible_part():
+    boxes = normalize_boxes(np.array([[90, 10, 30, 20]]), np.array([100]), np.array([100]))
+    np.testing.assert_allclose(boxes, [[0.95, 0.2, 0.1, 0.2]])
+
+
+def test_converter_output_passes_label_check():
+    bboxes = [
+        (10, 10, 20, 20),     # inside
+        (90, 10, 30, 20),     # past the right edge
+        (-15, -5, 30, 40),    # past the top-left corner
+        (0, 0, 100, 100),     # whole image
+        (99.99999, 50, 5, 5), # sliver that rounds to zero width
+        (120, 10, 10, 10),    # entirely outside
+        (40, 40, 0, 10),      # zero width
+    ]
+    index = index_coco_annotations(_coco(bboxes))
+    assert index['num_boxes'] == 4
+    assert index['skipped_empty_box'] == 3
+    text = format_label_lines(index['class_ids'], index['boxes'])
+    assert len(text.splitlines()) == 4
+    assert check_label_lines(text, nc=1) == []
+
+
+def test_random_boxes_pass_label_check():
+    rng = np.random.default_rng(0)
+    xy = rng.uniform(-50, 650, size=(500, 2))
+    wh = rng.uniform(0, 200, size=(500, 2))
+    index = index_coco_annotations(_coco(np.hstack([xy, wh]).tolist(), width=640, height=480))
+    text = format_label_lines(index['class_ids'], index['boxes'])
+    assert check_label_lines(text, nc=1) == []
+
+
+def test_orphan_label_is_only_a_warning(tmp_path):
+    images_dir, labels_dir = tmp_path / 'images', tmp_path / 'labels'
+    images_dir.mkdir()
+    labels_dir.mkdir()
+    Image.new('RGB', (32, 24)).save(images_dir / 'a.jpg')
+    (labels_dir / 'a.txt').write_text("0 0.5 0.5 0.2 0.2\n")
+    (labels_dir / 'missing.txt').write_text("0 0.5 0.5 0.2 0.2\n")
+    stats, records = check_split(str(images_dir), str(labels_dir), nc=1, num_workers=1)
+    assert [(r['type'], r['severity']) for r in records] == [('orphan_label', 'warning')]
+    assert stats['errors'] == 0 and stats['warnings'] == 1
@@ -0,0 +1,89 @@
+import os
+import random
+from collections import Counter
+
+import pytest
+
+from dataset_splits import collect_images, kfold_splits, split_train_val, stratum_of
+
+
+def _synthetic_items(n=1000, seed=0):
+    """(path, [box areas]) with an uneven mix of hand counts and box sizes."""
+    rng = random.Random(seed)
+    items = []
+    for i in range(n):
+        count = rng.choices([0, 1, 2, 4], weights=[10, 55, 25, 10])[0]
+        size = rng.choice([0.002, 0.02, 0.2])
+        items.append((f"/data/images/{i:05d}.jpg", [size * rng.uniform(0.8, 1.2)] * count))
+    return items
+
+
+def _stratum_shares(items, paths):
+    areas_of = dict(items)
+    counts = Counter(stratum_of(areas_of[p]) for p in paths)
+    return {key: n / len(paths) for key, n in counts.items()}
+
+
+def test_split_partitions_images_and_keeps_class_ratios():
+    items = _synthetic_items()
+    train, val = split_train_val(items, val_fraction=0.2, seed=3)
+    assert set(train).isdisjoint(val)
+    assert sorted(train + val) == sorted(p for p, _ in items)
+    # Each stratum rounds its own val share, so the total may be off by up to one image per stratum
+    num_strata = len({stratum_of(areas) for _, areas in items})
+    assert abs(len(val) - 200) <= num_strata
+
+    overall = _stratum_shares(items, [p for p, _ in items])
+    for paths in (train, val):
+        shares = _stratum_shares(items, paths)
+        assert set(shares) == set(overall)
+        for key, share in overall.items():
+            assert shares[key] == pytest.approx(share, abs=0.01)
+
+
+def test_split_is_reproducible():
+    items = _synthetic_items()
+    assert split_train_val(items, seed=1) == split_train_val(items, seed=1)
+    assert split_train_val(items, seed=1) != split_train_val(items, seed=2)
+
+
+def test_kfold_partitions_images_and_keeps_class_ratios():
+    items = _synthetic_items()
+    all_paths = sorted(p for p, _ in items)
+    folds = kfold_splits(items, k=5, seed=0)
+    assert len(folds) == 5
+
+    # Every image is in the val part of exactly one fold, and train is the rest
+    val_parts = [val for _, val in folds]
+    assert sorted(p for val in val_parts for p in val) == all_paths
+    for train, val in folds:
+        assert set(train).isdisjoint(val)
+        assert sorted(train + val) == all_paths
+    sizes = [len(val) for val in val_parts]
+    assert max(sizes) - min(sizes) <= 1
+
+    overall = _stratum_shares(items, all_paths)
+    for val in val_parts:
+        shares = _stratum_shares(items, val)
+        for key, share in overall.items():
+            assert shares.get(key, 0.0) == pytest.approx(share, abs=0.01)
+
+
+def test_unstratified_split_still_partitions():
+    items = _synthetic_items(101)
+    train, val = split_train_val(items, val_fraction=0.3, stratify=False)
+    assert len(val) == 30 and len(train) == 71
+    assert set(train).isdisjoint(val)
+
+
+def test_collect_images_reads_txt_labels(tmp_path):
+    images, labels = tmp_path / 'train' / 'images', tmp_path / 'train' / 'labels'
+    images.mkdir(parents=True)
+    labels.mkdir()
+    for name in ('a.jpg', 'b.jpg', 'notes.txt'):
+        (images / name).write_bytes(b'')
+    (labels / 'a.txt').write_text("0 0.5 0.5 0.1 0.2\n0 0.2 0.2 0.5 0.5\nbad line\n")
+    items = collect_images([str(images)])
+    assert [os.path.basename(p) for p, _ in items] == ['a.jpg', 'b.jpg']
+    assert items[0][1] == pytest.approx([0.02, 0.25])
+    assert items[1][1] == []
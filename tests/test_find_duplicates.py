@@ -0,0 +1,83 @@
+import cv2
+import numpy as np
+
+from find_duplicates import _clusters, near_duplicate_pairs, popcount64, run_duplicate_check
+
+
+def _flip_bits(value, bits):
+    for bit in bits:
+        value ^= 1 << bit
+    return value
+
+
+def _brute_force_pairs(hashes, max_distance):
+    return {(i, j) for i in range(len(hashes)) for j in range(i + 1, len(hashes))
+            if bin(int(hashes[i]) ^ int(hashes[j])).count('1') <= max_distance}
+
+
+def test_pairs_at_threshold():
+    base = 0x0123456789ABCDEF
+    hashes = np.array([
+        base,
+        _flip_bits(base, [0, 13, 27, 63]),        # distance 4 (= threshold): found
+        _flip_bits(base, [1, 14, 28, 40, 62]),    # distance 5: not found
+        _flip_bits(base, [5, 6, 7]),              # distance 3: found
+    ], dtype=np.uint64)
+    left, right, distances = near_duplicate_pairs(hashes, max_distance=4)
+    found = {(i, j): d for i, j, d in zip(left.tolist(), right.tolist(), distances.tolist())}
+    assert found[(0, 1)] == 4
+    assert found[(0, 3)] == 3
+    assert (0, 2) not in found
+    assert set(found) == _brute_force_pairs(hashes, 4)
+
+
+def test_pairs_match_brute_force():
+    rng = np.random.default_rng(0)
+    seeds = rng.integers(0, 2 ** 63, size=40, dtype=np.uint64)
+    hashes = [int(s) for s in seeds]
+    # Variants of the seeds at distances 1..7 around the threshold of 4
+    for k in range(1, 8):
+        hashes += [_flip_bits(h, rng.choice(64, size=k, replace=False).tolist()) for h in hashes[:10]]
+    hashes = np.unique(np.array(hashes, dtype=np.uint64))
+    left, right, distances = near_duplicate_pairs(hashes, max_distance=4)
+    assert set(zip(left.tolist(), right.tolist())) == _brute_force_pairs(hashes, 4)
+    assert (distances == popcount64(hashes[left] ^ hashes[right])).all()
+    assert (distances <= 4).all()
+
+
+def test_clusters_follow_chains():
+    left, right = np.array([0, 1, 5]), np.array([1, 2, 6])
+    assert sorted(_clusters(8, left, right)) == [[0, 1, 2], [5, 6]]
+    assert _clusters(3, np.array([], dtype=np.int64), np.array([], dtype=np.int64)) == []
+
+
+def _write_images(folder, images):
+    folder.mkdir()
+    for name, image in images.items():
+        cv2.imwrite(str(folder / name), image)
+
+
+def _noise(seed):
+    return np.random.default_rng(seed).integers(0, 256, size=(64, 64), dtype=np.uint8)
+
+
+def test_cross_split_leakage_exit_code(tmp_path):
+    _write_images(tmp_path / 'train', {'a.png': _noise(1), 'b.png': _noise(2)})
+    _write_images(tmp_path / 'val', {'c.png': _noise(3)})
+    splits = {'train': str(tmp_path / 'train'), 'validation': str(tmp_path / 'val')}
+    assert run_duplicate_check(splits, num_workers=1) == 0
+
+    cv2.imwrite(str(tmp_path / 'val' / 'a_copy.png'), _noise(1))
+    lists_dir = tmp_path / 'lists'
+    assert run_duplicate_check(splits, report_path=str(tmp_path / 'report.json'), lists_dir=str(lists_dir),
+                               num_workers=1) == 1
+    # The validation copy is kept, the training original is dropped
+    assert 'a.png' not in (lists_dir / 'train_dedup.txt').read_text()
+    assert 'a_copy.png' in (lists_dir / 'validation_dedup.txt').read_text()
+
+
+def test_duplicates_within_a_split_are_not_leakage(tmp_path):
+    _write_images(tmp_path / 'train', {'a.png': _noise(1), 'a_copy.png': _noise(1)})
+    _write_images(tmp_path / 'val', {'c.png': _noise(3)})
+    splits = {'train': str(tmp_path / 'train'), 'validation': str(tmp_path / 'val')}
+    assert run_duplicate_check(splits, num_workers=1) == 0
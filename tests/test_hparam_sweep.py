@@ -0,0 +1,90 @@
+import json
+import sys
+
+import pytest
+
+from hparam_sweep import SuccessiveHalving, read_results, rung_epochs
+
+
+def _rows(*fitness):
+    return [{'epoch': i + 1, 'fitness': f} for i, f in enumerate(fitness)]
+
+
+def test_rung_epochs():
+    assert rung_epochs(3, 30, eta=3) == [3, 9, 27]
+    assert rung_epochs(2, 6, eta=2) == [2, 4]
+    assert rung_epochs(5, 5) == []
+
+
+def test_read_results(tmp_path):
+    results = tmp_path / 'results.csv'
+    results.write_text("  epoch,  metrics/mAP50(B),  metrics/mAP50-95(B)\n"
+                       "1,0.5,0.2\n"
+                       "2,0.6,0.3\n"
+                       "3,0.7")  # last line still being written
+    rows = read_results(results)
+    assert [r['epoch'] for r in rows] == [1.0, 2.0]
+    assert rows[1]['metrics/mAP50(B)'] == 0.6
+    assert rows[1]['fitness'] == pytest.approx(0.1 * 0.6 + 0.9 * 0.3)
+
+
+def test_read_results_missing_or_empty(tmp_path):
+    assert read_results(tmp_path / 'missing.csv') == []
+    (tmp_path / 'empty.csv').write_text('')
+    assert read_results(tmp_path / 'empty.csv') == []
+
+
+def test_successive_halving_keeps_top_trials():
+    halving = SuccessiveHalving([2, 6], eta=3)
+    # Fewer than eta trials at a rung: nothing to compare against yet
+    assert halving.report('a', _rows(0.5, 0.6))
+    assert halving.report('b', _rows(0.1, 0.2))
+    # Third trial fills the rung: only the top third (trial a) may continue
+    assert not halving.report('c', _rows(0.3, 0.1))
+    assert halving.report('d', _rows(0.7, 0.4))
+    assert halving.records[2] == {'a': 0.6, 'b': 0.2, 'c': 0.3, 'd': 0.7}
+
+
+def test_successive_halving_records_each_rung_once():
+    halving = SuccessiveHalving([1, 2], eta=2)
+    assert halving.report('a', _rows(0.9))
+    assert not halving.report('b', _rows(0.1))
+    # Uses the best fitness up to the rung, not later epochs; rung 1 is not re-evaluated
+    assert halving.report('b', _rows(0.1, 0.95))
+    assert halving.records == {1: {'a': 0.9, 'b': 0.1}, 2: {'b': 0.95}}
+
+
+def test_successive_halving_before_first_rung():
+    halving = SuccessiveHalving([3], eta=3)
+    assert halving.report('a', _rows(0.1, 0.1))
+    assert halving.records[3] == {}
+
+
+def _run_quick_sweep(monkeypatch, tmp_path, base_args, search_space):
+    import hparam_sweep
+    monkeypatch.setattr(hparam_sweep, 'trial_command', lambda spec_path: [sys.executable, '-c', 'pass'])
+    return hparam_sweep.run_sweep('yolo11n.pt', base_args, search_space, tmp_path, devices=('cpu',),
+                                  trials_per_device=2, min_epochs=1, poll_interval=0.05)
+
+
+def test_trial_specs_do_not_tune_lr0_with_auto_optimizer(monkeypatch, tmp_path):
+    search_space = {'lr0': [0.005, 0.02], 'optimizer': ['SGD', 'AdamW']}
+    leaderboard = _run_quick_sweep(monkeypatch, tmp_path, {'epochs': 3}, search_space)
+    assert len(leaderboard) == 4
+    specs = sorted(tmp_path.glob('trial_*.json'))
+    assert len(specs) == 4
+    for spec_path in specs:
+        train_args = json.loads(spec_path.read_text(encoding='utf-8'))['train_args']
+        assert train_args['optimizer'] != 'auto'
+        assert train_args['lr0'] in (0.005, 0.02)
+
+
+@pytest.mark.parametrize('base_args, search_space', [
+    ({'epochs': 3}, {'lr0': [0.005, 0.02]}),
+    ({'epochs': 3, 'optimizer': 'auto'}, {'lr0': [0.005, 0.02]}),
+    ({'epochs': 3}, {'momentum': [0.9, 0.95], 'optimizer': ['auto', 'SGD']}),
+])
+def test_tuning_lr0_with_auto_optimizer_is_rejected(monkeypatch, tmp_path, base_args, search_space):
+    with pytest.raises(ValueError, match="optimizer='auto'"):
+        _run_quick_sweep(monkeypatch, tmp_path, base_args, search_space)
+    assert not list(tmp_path.glob('trial_*.json'))
@@ -0,0 +1,55 @@
+import json
+
+import numpy as np
+
+from convert_coco_to_yolo import convert_splits, format_label_lines
+from label_store import LabelStore, export_yolo_txt, label_store_path, write_label_store
+
+
+def _write_coco(path):
+    coco = {
+        'images': [{'id': i, 'file_name': f"img_{i}.jpg", 'width': 640, 'height': 480} for i in range(4)],
+        'categories': [{'id': 1, 'name': 'hand'}, {'id': 2, 'name': 'person'}],
+        'annotations': [
+            {'id': 1, 'image_id': 0, 'category_id': 1, 'bbox': [10.5, 20.25, 100, 80]},
+            {'id': 2, 'image_id': 0, 'category_id': 2, 'bbox': [600, 400, 100, 100]},
+            {'id': 3, 'image_id': 1, 'category_id': 1, 'bbox': [0, 0, 640, 480]},
+            {'id': 4, 'image_id': 3, 'category_id': 2, 'bbox': [1.1, 2.2, 3.3, 4.4]},
+            # img_2 has no annotations
+        ],
+    }
+    path.write_text(json.dumps(coco), encoding='utf-8')
+
+
+def test_export_reproduces_converted_txt(tmp_path):
+    _write_coco(tmp_path / 'train.json')
+    labels_dir = tmp_path / 'labels'
+    convert_splits({'train': (tmp_path / 'train.json', labels_dir)}, num_workers=1, label_format='both')
+
+    store = LabelStore(label_store_path(labels_dir))
+    assert isinstance(store.labels, np.memmap)
+    assert len(store) == 3
+    assert store.get('img_2.jpg') is None
+    assert store.get('img_0.txt').shape == (2, 5)
+
+    exported_dir = tmp_path / 'exported'
+    assert export_yolo_txt(store, exported_dir) == 3
+    original = sorted(p.name for p in labels_dir.glob('*.txt'))
+    assert sorted(p.name for p in exported_dir.glob('*.txt')) == original == ['img_0.txt', 'img_1.txt', 'img_3.txt']
+    for name in original:
+        assert (exported_dir / name).read_bytes() == (labels_dir / name).read_bytes()
+
+
+def test_image_with_empty_label_file(tmp_path):
+    class_ids = np.array([0, 1, 0], dtype=np.int64)
+    boxes = np.array([[0.5, 0.5, 0.2, 0.3], [0.123456, 0.654321, 0.01, 0.02], [0.25, 0.75, 0.5, 0.5]])
+    index = {'class_names': ['hand', 'person'], 'file_names': ['a.jpg', 'empty.jpg', 'b.jpg'],
+             'offsets': np.array([0, 2, 2, 3]), 'class_ids': class_ids, 'boxes': boxes}
+    write_label_store(index, tmp_path / 'store')
+
+    store = LabelStore(tmp_path / 'store')
+    assert store.get('empty.jpg').shape == (0, 5)
+    export_yolo_txt(store, tmp_path / 'exported')
+    assert (tmp_path / 'exported' / 'a.txt').read_text() == format_label_lines(class_ids[:2], boxes[:2])
+    assert (tmp_path / 'exported' / 'empty.txt').read_bytes() == b''
+    assert (tmp_path / 'exported' / 'b.txt').read_text() == format_label_lines(class_ids[2:], boxes[2:])
@@ -0,0 +1,48 @@
+import numpy as np
+
+from tiled_inference import merge_detections, nms
+
+
+def _detections(*rows):
+    rows = np.array(rows, dtype=np.float32)
+    return rows[:, :4], rows[:, 4], rows[:, 5].astype(np.int64)
+
+
+def test_seam_cut_box_is_merged_into_full_box():
+    # Full hand from the whole-image pass, and the left part of it from a tile cut at x=180
+    boxes, scores, classes = _detections([100, 100, 300, 300, 0.90, 0],
+                                         [100, 100, 180, 300, 0.95, 0])
+    # IoU is only 0.4, so plain NMS keeps the duplicate
+    assert len(nms(boxes, scores, classes, 0.5)) == 2
+    merged, merged_scores, merged_classes = merge_detections(boxes, scores, classes, 0.5)
+    np.testing.assert_allclose(merged, [[100, 100, 300, 300]])
+    np.testing.assert_allclose(merged_scores, [0.95])
+    assert merged_classes.tolist() == [0]
+
+
+def test_two_halves_from_neighbouring_tiles_are_joined():
+    boxes, scores, classes = _detections([100, 100, 200, 300, 0.8, 0],
+                                         [140, 100, 300, 300, 0.9, 0])
+    merged, _, _ = merge_detections(boxes, scores, classes, 0.5)
+    np.testing.assert_allclose(merged, [[100, 100, 300, 300]])
+
+
+def test_separate_hands_and_other_classes_are_kept():
+    boxes, scores, classes = _detections([0, 0, 100, 100, 0.9, 0],
+                                         [90, 0, 190, 100, 0.8, 0],   # touches the first one
+                                         [10, 10, 60, 60, 0.7, 1])    # inside, but another class
+    merged, merged_scores, merged_classes = merge_detections(boxes, scores, classes, 0.5)
+    assert len(merged) == 3
+    assert merged_classes.tolist() == [0, 0, 1]
+
+
+def test_nms_ios_suppresses_contained_box():
+    boxes, scores, classes = _detections([100, 100, 300, 300, 0.9, 0],
+                                         [100, 100, 180, 300, 0.6, 0])
+    assert nms(boxes, scores, classes, 0.5, metric='ios').tolist() == [0]
+
+
+def test_merge_empty():
+    boxes, scores, classes = _detections([0, 0, 1, 1, 1, 0])
+    merged, merged_scores, _ = merge_detections(boxes[:0], scores[:0], classes[:0])
+    assert merged.shape == (0, 4) and merged_scores.shape == (0,)
@@ -0,0 +1,37 @@
+import io
+import os
+import sys
+
+import pytest
+
+from training_log import AsyncLogSink
+
+
+def test_lines_are_written_and_progress_collapsed(tmp_path):
+    console = io.StringIO()
+    with AsyncLogSink(tmp_path / 'log.txt', flush_interval=0.05) as sink:
+        stream = sink.stream(console)
+        stream.write("epoch 1\n")
+        stream.write("  10%\r  50%\r 100%\n")
+        stream.write("done")
+    assert console.getvalue() == "epoch 1\n  10%\r  50%\r 100%\ndone"
+    assert (tmp_path / 'log.txt').read_text(encoding='utf-8') == "epoch 1\n 100%\ndone\n"
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason="needs fork")
+def test_forked_child_only_writes_to_console(tmp_path):
+    with AsyncLogSink(tmp_path / 'log.txt', flush_interval=0.05) as sink:
+        stream = sink.stream(sys.__stdout__)
+        stream.write("parent\n")
+        pid = os.fork()
+        if pid == 0:  # child: the writer thread does not exist here
+            try:
+                queued = sink._queue.qsize()
+                stream.write("child\n")
+                code = 0 if sink._queue.qsize() == queued else 1
+            except BaseException:
+                code = 2
+            os._exit(code)
+        _, status = os.waitpid(pid, 0)
+        assert os.WEXITSTATUS(status) == 0
+    assert (tmp_path / 'log.txt').read_text(encoding='utf-8') == "parent\n"
@@ -0,0 +1,52 @@
+import pytest
+
+from validation_schedule import ValidationSchedule
+
+# (schedule arguments, epochs, {0-based epoch: expected kind})
+CASES = [
+    # Default ultralytics behaviour
+    (dict(full_every=1), 5, {0: 'full', 1: 'full', 4: 'full'}),
+    # full_every: every 5th epoch in full, subsets in between
+    (dict(full_every=5, subset_fraction=0.25), 20, {0: 'subset', 3: 'subset', 4: 'full', 5: 'subset', 9: 'full'}),
+    # subset_fraction=0: epochs in between are skipped
+    (dict(full_every=5, subset_fraction=0.0), 20, {0: 'skip', 4: 'full', 8: 'skip', 9: 'full'}),
+    # skip_first: no validation at all at the start, including full_every epochs
+    (dict(full_every=5, skip_first=10), 100, {0: 'skip', 4: 'skip', 9: 'skip', 10: 'subset', 14: 'full'}),
+    # sparse_epochs: every epoch in full afterwards
+    (dict(full_every=5, sparse_epochs=80), 100, {78: 'subset', 79: 'full', 80: 'full', 81: 'full', 98: 'full'}),
+    # The final epoch is always validated in full, even inside skip_first
+    (dict(full_every=5, skip_first=10), 7, {5: 'skip', 6: 'full'}),
+    (dict(full_every=4, subset_fraction=0.5), 10, {8: 'subset', 9: 'full'}),
+    # Past the end (resumed with fewer epochs) still counts as final
+    (dict(full_every=5), 10, {12: 'full'}),
+]
+
+
+@pytest.mark.parametrize('schedule, epochs, expected', CASES)
+def test_kind(schedule, epochs, expected):
+    s = ValidationSchedule(**schedule)
+    assert {epoch: s.kind(epoch, epochs) for epoch in expected} == expected
+
+
+@pytest.mark.parametrize('epoch', [0, 3, 12])
+def test_possible_stop_forces_full(epoch):
+    s = ValidationSchedule(full_every=5, skip_first=10)
+    assert s.kind(epoch, 100, possible_stop=True) == 'full'
+
+
+def test_invalid_arguments():
+    with pytest.raises(ValueError):
+        ValidationSchedule(full_every=0)
+    with pytest.raises(ValueError):
+        ValidationSchedule(subset_fraction=1.5)
+
+
+def test_subset_keeps_whole_batches_and_is_reproducible():
+    batch_of_image = [i // 4 for i in range(40)]  # 10 batches of 4 images
+    s = ValidationSchedule(subset_fraction=0.3, seed=1)
+    indices = s.subset_indices(batch_of_image)
+    assert len(indices) == 12
+    chosen = {batch_of_image[i] for i in indices}
+    assert len(chosen) == 3
+    assert indices == [i for i, b in enumerate(batch_of_image) if b in chosen]
+    assert indices == ValidationSchedule(subset_fraction=0.3, seed=1).subset_indices(batch_of_image)
@@ -0,0 +1,141 @@
+import time
+
+import numpy as np
+
+from hand_renderer import extract_detections
+
+
+def tile_starts(length, tile_size, overlap):
+    """计算一个方向上各切片的起点，保证最后一片贴齐图像边缘"""
+    if length <= tile_size:
+        return [0]
+    step = max(1, int(tile_size * (1.0 - overlap)))
+    starts = list(range(0, length - tile_size + 1, step))
+    if starts[-1] != length - tile_size:
+        starts.append(length - tile_size)
+    return starts
+
+
+def make_tiles(frame, tile_size=640, overlap=0.2):
+    """
+    把大图切成相互重叠的切片
+    返回 [(x0, y0, 切片图像), ...]，切片是原图的视图，不拷贝像素
+    """
+    h, w = frame.shape[:2]
+    return [(x0, y0, frame[y0:y0 + tile_size, x0:x0 + tile_size])
+            for y0 in tile_starts(h, tile_size, overlap)
+            for x0 in tile_starts(w, tile_size, overlap)]
+
+
+def box_overlap(box, others, metric='iou'):
+    """
+    一个框与一组框的重叠程度
+    metric: 'iou' 交并比；'ios' 交集除以较小框的面积（被切片切断的半个框落在完整框内部时接近 1）
+    """
+    iw = (np.minimum(box[2], others[:, 2]) - np.maximum(box[0], others[:, 0])).clip(0)
+    ih = (np.minimum(box[3], others[:, 3]) - np.maximum(box[1], others[:, 1])).clip(0)
+    inter = iw * ih
+    area = max(box[2] - box[0], 0) * max(box[3] - box[1], 0)
+    areas = (others[:, 2] - others[:, 0]).clip(0) * (others[:, 3] - others[:, 1]).clip(0)
+    if metric == 'ios':
+        return inter / (np.minimum(area, areas) + 1e-9)
+    return inter / (area + areas - inter + 1e-9)
+
+
+def nms(boxes, scores, classes, iou_threshold=0.5, metric='iou'):
+    """按类别做非极大值抑制，返回保留下来的下标（按置信度从高到低）；metric 见 box_overlap"""
+    if len(boxes) == 0:
+        return np.zeros((0,), dtype=np.int64)
+
+    # 不同类别的框加上足够大的偏移，一次 NMS 即可实现按类别抑制
+    offset = classes.astype(np.float32)[:, None] * (boxes.max() + 1)
+    shifted = boxes + offset
+
+    order = scores.argsort()[::-1]
+    keep = []
+    while order.size:
+        i = order[0]
+        keep.append(i)
+        rest = order[1:]
+        order = rest[box_overlap(shifted[i], shifted[rest], metric) <= iou_threshold]
+    return np.array(keep, dtype=np.int64)
+
+
+def merge_detections(boxes, scores, classes, threshold=0.5):
+    """
+    合并切片检测结果（贪心合并，与 SAHI 的 NMM 相同思路）
+    按置信度从高到低，把同类别中 IoS 超过 threshold 的框并入当前框（取外接框），
+    这样切片接缝处被切断的半个手和完整的框合成一个完整的框，而不是只保留其中一个。
+    返回合并后的 (boxes, scores, classes)，置信度取组内最高值
+    """
+    if len(boxes) == 0:
+        return boxes, scores, classes
+
+    order = scores.argsort()[::-1]
+    keep, merged = [], []
+    while order.size:
+        i = order[0]
+        rest = order[1:]
+        same = rest[classes[rest] == classes[i]]
+        matched = same[box_overlap(boxes[i], boxes[same], 'ios') > threshold]
+        group = boxes[np.append(i, matched)]
+        merged.append(np.concatenate([group[:, :2].min(0), group[:, 2:].max(0)]))
+        keep.append(i)
+        order = rest[~np.isin(rest, matched)]
+    keep = np.array(keep, dtype=np.int64)
+    return np.array(merged, dtype=boxes.dtype).reshape(-1, 4), scores[keep], classes[keep]
+
+
+def detect_tiled(model, frame, tile_size=640, overlap=0.2, conf_threshold=0.4,
+                 match_threshold=0.5, batch_size=8, include_full_image=True):
+    """
+    切片推理：大图切成重叠切片，按批送入模型，检测框映射回原图坐标后统一合并（见 merge_detections）
+
+    Args:
+        model: YOLO 模型
+        frame: BGR 原图
+        tile_size: 切片边长（像素），同时作为推理输入尺寸
+        overlap: 相邻切片的重叠比例（0-1）
+        match_threshold: 同一目标的判定阈值（IoS，交集除以较小框面积）
+        batch_size: 每批推理的切片数
+        include_full_image: 额外对整图推理一次，避免切片把大手切断后漏检
+    Returns:
+        (boxes[N,4], confidences[N], classes[N], 统计信息字典)
+    """
+    start_time = time.time()
+    tiles = make_tiles(frame, tile_size, overlap)
+
+    all_boxes, all_confs, all_classes = [], [], []
+    for i in range(0, len(tiles), batch_size):
+        chunk = tiles[i:i + batch_size]
+        results = model([np.ascontiguousarray(tile) for _, _, tile in chunk],
+                        conf=conf_threshold, imgsz=tile_size, verbose=False)
+        for (x0, y0, _), result in zip(chunk, results):
+            boxes, confidences, classes = extract_detections(result)
+            all_boxes.append(boxes + np.array([x0, y0, x0, y0], dtype=np.float32))
+            all_confs.append(confidences)
+            all_classes.append(classes)
+    tile_seconds = time.time() - start_time
+
+    if include_full_image and len(tiles) > 1:
+        boxes, confidences, classes = extract_detections(
+            model(frame, conf=conf_threshold, imgsz=tile_size, verbose=False)[0])
+        all_boxes.append(boxes)
+        all_confs.append(confidences)
+        all_classes.append(classes)
+
+    boxes = np.concatenate(all_boxes) if all_boxes else np.zeros((0, 4), dtype=np.float32)
+    confidences = np.concatenate(all_confs) if all_confs else np.zeros((0,), dtype=np.float32)
+    classes = np.concatenate(all_classes) if all_classes else np.zeros((0,), dtype=np.int64)
+
+    raw_detections = len(confidences)
+    boxes, confidences, classes = merge_detections(boxes, confidences, classes, match_threshold)
+    total_seconds = time.time() - start_time
+    stats = {
+        'tiles': len(tiles),
+        'raw_detections': raw_detections,
+        'detections': len(confidences),
+        'tiles_per_sec': round(len(tiles) / tile_seconds, 2) if tile_seconds > 0 else 0.0,
+        'seconds': round(total_seconds, 3),
+    }
+    return boxes, confidences, classes, stats
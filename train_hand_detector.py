@@ -5,31 +5,18 @@ from datetime import timedelta
 from ultralytics import YOLO
 import yaml
 
-class TeeLogger:
-    """
-    A class that redirects writes to both stdout and a log file.
-    """
-    def __init__(self, filename, stream=sys.stdout):
-        self.file = open(filename, 'w', encoding='utf-8') # Open log file with utf-8 encoding
-        self.stream = stream
-
-    def write(self, data):
-        self.file.write(data)
-        self.stream.write(data)
-        # Ensure data is written immediately to the file
-        self.file.flush()
-        self.stream.flush()
-
-    def flush(self):
-        # Required for compatibility with file-like objects
-        self.file.flush()
-        self.stream.flush()
-
-    def close(self):
-        self.file.close()
-
-
-def create_dataset_yaml(data_dir, yaml_path):
+from check_dataset import check_yolo_dataset
+from distillation import distillation_trainer
+from image_shards import ShardCachedTrainer, build_image_shards
+from model_pruning import is_pruned_model, pruned_model_trainer
+from preemption import Preempted, add_preemption_guard, find_resumable_run
+from resource_planner import plan_training_resources, print_plan
+from training_log import AsyncLogSink, add_metrics_jsonl_callback
+from training_profiler import add_training_profiler
+from validation_schedule import scheduled_validation_trainer
+
+
+def create_dataset_yaml(data_dir, yaml_path, train='train/images', val='validation/images'):
     """
     Creates the dataset YAML configuration file required by YOLOv8.
 
@@ -47,11 +34,13 @@ def create_dataset_yaml(data_dir, yaml_path):
                             ├── images/
                             └── labels/
         yaml_path (str): Path where the dataset.yaml file will be saved.
+        train (str): Training images folder or image list file (relative to data_dir or absolute).
+        val (str): Validation images folder or image list file. List files are written by dataset_splits.py.
     """
     dataset_config = {
         'path': data_dir,  # Root path to the dataset
-        'train': 'train/images',  # Path to training images (relative to 'path')
-        'val': 'validation/images',  # Path to validation images (relative to 'path')
+        'train': train,  # Path to training images or image list (relative to 'path')
+        'val': val,  # Path to validation images or image list (relative to 'path')
         'test': '',  # Optional, leave empty if no separate test set
         'nc': 1,  # Number of classes
         'names': ['hand']  # Class names, ordered by index (index 0 corresponds to 'hand')
@@ -72,20 +61,69 @@ def main():
 
     # Name for the model checkpoint to save during training
     model_save_name = "yolo11n_hand_detect.pt"
+    # Starting weights: the pre-trained model, or e.g. a pruned checkpoint from model_pruning.py to fine-tune
+    base_weights = "yolo11n.pt"
+
+    # Knowledge distillation (see distillation.py): a larger trained hand detector (e.g. a yolo11s trained
+    # with this script) teaches the model being trained. The student can be base_weights at a smaller imgsz
+    # or a pruned checkpoint. None trains without a teacher.
+    distill_teacher_weights = None  # e.g. "runs/detect/yolo11s_hand_detect.pt/weights/best.pt"
+    distill_weight = 1.0            # Weight of the distillation loss relative to the detection loss
+    distill_temperature = 2.0       # Softens teacher and student outputs before comparing them
+    # Runs are saved in <runs_project>/<model_save_name>
+    runs_project = "runs/detect"
+
+    # Preemption safety (see preemption.py): a termination signal (or Ctrl+C) finishes the current epoch,
+    # saves last.pt and stops; the next launch resumes the unfinished run automatically.
+    auto_resume = True
+    preemption_grace_seconds = None  # Seconds between signal and kill on preemptible machines (None = finish the epoch)
+    keep_last_checkpoints = 3        # Periodic epochN.pt checkpoints (save_period) to keep
+
+    # Optional list-file split written by dataset_splits.py (e.g. "split_seed0" or "fold0of5");
+    # None trains on train/images and validates on validation/images
+    split_lists_name = None
+
+    # Record where epoch time goes (dataloader wait, compute, optimizer, validation, checkpoints)
+    # in profile.csv next to results.csv, with a bottleneck summary at the end of training.
+    # Profiling synchronizes CUDA around every batch, which itself slows GPU training a little.
+    profile_training = False
+
+    # Validation schedule (see validation_schedule.py). None validates fully after every epoch.
+    # Skipped and subset epochs have no fitness, which also affects early stopping and best.pt.
+    # Example: full validation every 5 epochs, on a fixed 25% subset of the validation set in between
+    # (a new best subset score triggers a full validation), no validation during the first 10 epochs
+    # and full validation every epoch for the last 20:
+    #     validation_schedule = dict(full_every=5, subset_fraction=0.25, sparse_epochs=80, skip_first=10)
+    validation_schedule = None
 
     # Log file path
     log_file_path = "终端.txt"
 
-    # --- Setup Logging ---
-    # Redirect both stdout and stderr to the log file AND the console
-    original_stdout = sys.stdout
-    original_stderr = sys.stderr
-
-    tee_logger = TeeLogger(log_file_path, original_stdout)
-    tee_logger_err = TeeLogger(log_file_path, original_stderr) # Also log errors
+    # Pre-resized image shard cache (see image_shards.py): images are decoded and resized to imgsz once
+    # instead of every epoch. The cache is rebuilt automatically when the image folders change.
+    # Writes a pre-resized copy of both image folders (several GiB for this dataset) before training.
+    use_image_shards = False
+    imgsz = 640
+
+    # Pick device, batch size, dataloader workers and image caching from the machine and dataset size
+    # (see resource_planner.py); falls back to CPU when no GPU is usable. Only the values below (and
+    # use_image_shards) that are set to None are taken from the plan; the others are kept as they are.
+    auto_plan_resources = False
+    device = "0"          # Use GPU 0. Change to 'cpu' if needed (very slow).
+    batch = 16            # RTX 4060 8GB might handle 16 okay; reduce (e.g., 8, 4) on Out Of Memory errors.
+    workers = 8           # Number of worker processes for data loading
+    cache = False         # Cache images in memory (True can speed up but uses more RAM).
+
+    # Integrity check before training (see check_dataset.py); training is skipped if it finds errors
+    check_dataset_before_training = True
+    dataset_check_report_path = "dataset_check_report.json"
 
-    sys.stdout = tee_logger
-    sys.stderr = tee_logger_err
+    # --- Setup Logging ---
+    # Redirect both stdout and stderr (and the ultralytics logger) to the log file AND the console.
+    # The file is written by a background thread in batches, so logging does not slow training down.
+    # A resumed run appends to the log of the interrupted one.
+    resume_checkpoint = find_resumable_run(runs_project, model_save_name) if auto_resume else None
+    log_sink = AsyncLogSink(log_file_path, mode='a' if resume_checkpoint else 'w').install()
 
     start_time = time.time() # Record the start time of the entire process
 
@@ -94,13 +132,67 @@ def main():
         # IMPORTANT: Make sure your data is in YOLO format before running this!
         # Expected folders: dataset_root_dir/train/images, dataset_root_dir/train/labels,
         #                   dataset_root_dir/validation/images, dataset_root_dir/validation/labels
-        create_dataset_yaml(dataset_root_dir, dataset_yaml_path)
+        if split_lists_name:
+            create_dataset_yaml(dataset_root_dir, dataset_yaml_path,
+                                train=f"lists/{split_lists_name}_train.txt", val=f"lists/{split_lists_name}_val.txt")
+        else:
+            create_dataset_yaml(dataset_root_dir, dataset_yaml_path)
+
+        if check_dataset_before_training:
+            print("Checking dataset integrity...")
+            report = check_yolo_dataset(dataset_yaml_path, dataset_check_report_path)
+            if not report['ok']:
+                print(f"Dataset check failed, training aborted. See {dataset_check_report_path} for details.")
+                return
+
+        images_dirs = [os.path.join(dataset_root_dir, split, 'images') for split in ('train', 'validation')]
+        if auto_plan_resources:
+            plan = plan_training_resources(images_dirs, imgsz=imgsz)
+            print_plan(plan)
+            manual = {'device': device, 'batch': batch, 'workers': workers, 'cache': cache,
+                      'use_image_shards': use_image_shards}
+            for name, value in manual.items():
+                if value is None:
+                    print(f"Resource plan: {name}={plan[name]!r}")
+                elif value != plan[name]:
+                    print(f"Resource plan: keeping {name}={value!r} (planner suggests {plan[name]!r})")
+            chosen = {name: plan[name] if value is None else value for name, value in manual.items()}
+            device, batch, workers, cache = chosen['device'], chosen['batch'], chosen['workers'], chosen['cache']
+            use_image_shards = chosen['use_image_shards']
+
+        trainer = None
+        if use_image_shards:
+            for images_dir in images_dirs:
+                print(f"Preparing image shard cache for {images_dir} (imgsz={imgsz})...")
+                stats = build_image_shards(images_dir, imgsz=imgsz)
+                if stats['up_to_date']:
+                    print(f"Image shard cache is up to date: {stats['cache_dir']}")
+                else:
+                    print(f"Image shard cache written in {timedelta(seconds=int(stats['seconds']))}: "
+                          f"{stats['images']} images, {stats['bytes'] / 2 ** 30:.2f} GiB, {stats['failed']} failed")
+            trainer = ShardCachedTrainer
+        if validation_schedule:
+            trainer = scheduled_validation_trainer(trainer, **validation_schedule)
 
         # --- Training Setup ---
         # 3. Load a pre-trained YOLO11n model (recommended for transfer learning)
         #    This loads general features from COCO dataset, helping converge faster.
-        print("Loading pre-trained YOLO11n model...")
-        model = YOLO("yolo11n.pt") # Downloads if not present
+        if resume_checkpoint:
+            print(f"Resuming training from {resume_checkpoint}...")
+            model = YOLO(resume_checkpoint)
+        else:
+            print(f"Loading pre-trained model {base_weights}...")
+            model = YOLO(base_weights) # Downloads if not present
+        if is_pruned_model(model.model):
+            # Train the pruned network as loaded instead of rebuilding the full-size one from its YAML
+            trainer = pruned_model_trainer(trainer)
+        if distill_teacher_weights:
+            trainer = distillation_trainer(trainer, distill_teacher_weights, distill_weight, distill_temperature)
+        guard = add_preemption_guard(model, preemption_grace_seconds, keep_last_checkpoints)
+        # Per-epoch losses/metrics/learning rates as JSON lines next to results.csv
+        add_metrics_jsonl_callback(model)
+        if profile_training:
+            add_training_profiler(model)
 
         # --- Training Execution ---
         # 4. Start training
@@ -109,15 +201,17 @@ def main():
         train_start_time = time.time() # Record start time of training specifically
         train_results = model.train(
             data=dataset_yaml_path,      # Path to your dataset YAML file
+            trainer=trainer,             # Shard cache, validation schedule, pruned model and/or distillation; None = default trainer
             epochs=100,                  # Number of training epochs. Adjust based on results.
-            imgsz=640,                   # Input image size (you can try 320 for faster training with potential accuracy trade-off)
-            batch=16,                    # Batch size. Adjust according to your GPU memory. RTX 4060 8GB might handle 16 okay, but monitor.
-                                         # If you encounter Out Of Memory errors, reduce this (e.g., 8, 4).
-            device="0",                  # Use GPU 0. Change to 'cpu' if needed (very slow).
+            imgsz=imgsz,                 # Input image size (you can try 320 for faster training with potential accuracy trade-off)
+            batch=batch,                 # Batch size, or a GPU memory fraction for AutoBatch (e.g. 0.70)
+            device=device,               # GPU index or 'cpu'
+            workers=workers,             # Number of worker processes for data loading
+            project=runs_project,        # Folder for runs
             name=model_save_name,        # Name for saving checkpoints and results in runs/detect/
-            cache=False,                 # Cache images in memory (True can speed up but uses more RAM/GPU memory).
+            resume=bool(resume_checkpoint),  # Continue the unfinished run found above (its saved arguments are reused)
+            cache=cache,                 # 'ram' caches resized images in memory; False reads from disk / shards
             optimizer='auto',            # Use auto optimizer selection (usually AdamW for YOLO11)
-            # resume=False,              # Set to True to resume training from the last saved checkpoint
             # freeze=[0, 9],             # Example: Freeze first 10 layers (0-9). Useful for feature extraction.
                                          # Uncomment and adjust if you want to freeze early layers initially.
 
@@ -135,7 +229,7 @@ def main():
             # dropout=0.0,               # Dropout rate (applied to the classification head usually)
 
             # Validation settings
-            val=True,                    # Enable validation during training (default is True)
+            val=True,                    # Enable validation during training (required by validation_schedule)
             save_period=10,              # Save checkpoint every N epochs (set to -1 to disable periodic saves)
             plots=True,                  # Generate training plots (default is True)
             # patience=100,              # Epochs to wait for no observable improvement for early stopping (default is 100)
@@ -143,14 +237,18 @@ def main():
             # Advanced
             # half=False,                # Use FP16 half precision (can speed up training and reduce memory usage slightly)
             # amp=True,                  # Automatic Mixed Precision (AMP) training (default is True, usually beneficial)
-            # workers=8,                 # Number of worker threads for data loading (default is usually 8)
         )
         train_end_time = time.time() # Record end time of training
         total_train_duration = train_end_time - train_start_time
 
+        if guard.preempted:
+            print(f"Training stopped by {guard.preempted} after epoch {model.trainer.epoch + 1}. "
+                  f"Run this script again to resume from {model.trainer.last}.")
+            return
+
         print("Training completed successfully!")
         print(f"Trained model saved as: {model_save_name}")
-        print(f"Training logs and results saved in: runs/detect/{model_save_name}")
+        print(f"Training logs and results saved in: {model.trainer.save_dir}")
         print(f"Total training duration: {timedelta(seconds=int(total_train_duration))}")
         # Training results (losses, metrics over epochs) are stored in train_results object
         # You can access them if needed, e.g., train_results.results_dict
@@ -174,19 +272,16 @@ def main():
         #     results[0].save(filename=f'prediction_example_{os.path.basename(test_image_path)}')
         #     print(f"Prediction result saved.")
 
+    except (Preempted, KeyboardInterrupt) as e:
+        print(f"\nTraining interrupted ({e or 'KeyboardInterrupt'}). Run this script again to resume from the last saved epoch.")
     except Exception as e:
         print(f"\nAn error occurred during execution: {e}")
         import traceback
         traceback.print_exc(file=sys.stdout) # Print traceback to both console and log
-        sys.stderr.write(f"\nAn error occurred during execution: {e}\n")
-        traceback.print_exc(file=sys.stderr) # Also print traceback to stderr log
     finally:
         # --- Restore Original Streams and Close Logger ---
         # Always restore the original stdout/stderr, even if an error occurs
-        sys.stdout = original_stdout
-        sys.stderr = original_stderr
-        tee_logger.close()
-        tee_logger_err.close()
+        log_sink.close()
         end_time = time.time() # Record the end time of the entire process
         total_duration = end_time - start_time
         print(f"\nScript execution finished.")
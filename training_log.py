@@ -0,0 +1,202 @@
+"""
+Training log sink and per-epoch metrics log.
+
+AsyncLogSink replaces the old TeeLogger. Writes go to the console directly and onto a queue for the
+log file; a background thread drains the queue in batches and flushes the file at most every
+flush_interval seconds, so the training loop never waits on disk I/O. stdout and stderr share one
+sink (one file handle, one writer), so their output is interleaved instead of clobbering each other.
+Progress-bar redraws (carriage returns) are collapsed to the final state of each line in the file.
+
+add_metrics_jsonl_callback() records one JSON line per epoch (losses, metrics, learning rates and
+epoch time) next to results.csv.
+"""
+
+import json
+import logging
+import os
+import queue
+import sys
+import threading
+import time
+from pathlib import Path
+
+
+class _SinkStream:
+    """File-like object handed out as sys.stdout / sys.stderr."""
+
+    def __init__(self, sink, console):
+        self._sink = sink
+        self._console = console
+
+    def write(self, data):
+        self._console.write(data)
+        self._sink.put(data)
+        return len(data)
+
+    def flush(self):
+        # Only the console; the file is flushed by the writer thread
+        self._console.flush()
+
+    def isatty(self):
+        return self._console.isatty()
+
+    def fileno(self):
+        return self._console.fileno()
+
+    @property
+    def encoding(self):
+        return getattr(self._console, 'encoding', 'utf-8')
+
+
+class AsyncLogSink:
+    """
+    Asynchronous, batched log file writer shared by stdout and stderr.
+
+    Usage:
+        with AsyncLogSink("终端.txt").install():
+            model.train(...)
+    """
+
+    def __init__(self, path, mode='w', flush_interval=1.0, collapse_progress=True):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.collapse_progress = collapse_progress
+        self._file = open(path, mode, encoding='utf-8')
+        # Forked children (e.g. DataLoader workers on Linux) inherit sys.stdout but not the writer thread
+        self._owner_pid = os.getpid()
+        self._queue = queue.SimpleQueue()
+        self._partial = ''  # incomplete last line, kept until its newline arrives
+        self._saved = None
+        self._thread = threading.Thread(target=self._run, name='log-sink', daemon=True)
+        self._thread.start()
+
+    def put(self, data):
+        """Queues data for the log file; in other processes than the one that created the sink, does nothing."""
+        if data and os.getpid() == self._owner_pid:
+            self._queue.put(data)
+
+    def stream(self, console):
+        return _SinkStream(self, console)
+
+    def _collapse(self, text):
+        """Keeps only what a terminal would finally show for lines redrawn with carriage returns."""
+        text = self._partial + text
+        lines = text.split('\n')
+        self._partial = lines.pop()
+        if '\r' in self._partial:
+            # A progress bar redrawing the same line: only its latest state matters
+            self._partial = self._partial.rstrip('\r').rsplit('\r', 1)[-1]
+        out = [line.rstrip('\r').rsplit('\r', 1)[-1] + '\n' for line in lines]
+        return ''.join(out)
+
+    def _write_batch(self, chunks):
+        text = ''.join(chunks)
+        if self.collapse_progress:
+            text = self._collapse(text)
+        if text:
+            self._file.write(text)
+
+    def _run(self):
+        last_flush = time.monotonic()
+        while True:
+            try:
+                chunk = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                chunk = ''
+            chunks = [chunk]
+            stop = chunk is None
+            # Drain whatever else is already queued into the same batch
+            while not stop:
+                try:
+                    chunk = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if chunk is None:
+                    stop = True
+                else:
+                    chunks.append(chunk)
+            self._write_batch([c for c in chunks if c])
+            now = time.monotonic()
+            if stop or now - last_flush >= self.flush_interval:
+                self._file.flush()
+                last_flush = now
+            if stop:
+                return
+
+    def install(self):
+        """Redirects sys.stdout/sys.stderr and console logging handlers (e.g. ultralytics' LOGGER) to the sink."""
+        stdout, stderr = sys.stdout, sys.stderr
+        out_stream, err_stream = self.stream(stdout), self.stream(stderr)
+        handlers = []
+        loggers = [logging.getLogger()] + [l for l in logging.Logger.manager.loggerDict.values()
+                                           if isinstance(l, logging.Logger)]
+        for logger in loggers:
+            for handler in logger.handlers:
+                if type(handler) is logging.StreamHandler and handler.stream in (stdout, stderr):
+                    original = handler.setStream(out_stream if handler.stream is stdout else err_stream)
+                    handlers.append((handler, original))
+        self._saved = (stdout, stderr, handlers)
+        sys.stdout, sys.stderr = out_stream, err_stream
+        return self
+
+    def uninstall(self):
+        if self._saved is None:
+            return
+        stdout, stderr, handlers = self._saved
+        sys.stdout, sys.stderr = stdout, stderr
+        for handler, original in handlers:
+            handler.setStream(original)
+        self._saved = None
+
+    def close(self):
+        """Restores the streams, writes everything still queued and closes the file."""
+        self.uninstall()
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+        if self._partial:
+            self._file.write(self._partial + '\n')
+            self._partial = ''
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return value
+
+
+def epoch_record(trainer):
+    """Losses, validation metrics, learning rates and timing of the epoch that just finished."""
+    record = {'epoch': trainer.epoch + 1, 'time': round(time.time(), 3)}
+    if getattr(trainer, 'tloss', None) is not None:
+        record.update({k: _to_float(v) for k, v in trainer.label_loss_items(trainer.tloss, prefix='train').items()})
+    record.update({k: _to_float(v) for k, v in (trainer.metrics or {}).items()})
+    record.update({k: _to_float(v) for k, v in (getattr(trainer, 'lr', None) or {}).items()})
+    if getattr(trainer, 'epoch_time', None) is not None:
+        record['epoch_seconds'] = round(float(trainer.epoch_time), 3)
+    if getattr(trainer, 'val_kind', None) is not None:
+        record['val_kind'] = trainer.val_kind  # full / subset / skip (validation_schedule.py)
+    if getattr(trainer, 'distill_loss', None) is not None:
+        record['distill_loss'] = round(trainer.distill_loss, 6)  # distillation.py
+    return record
+
+
+def add_metrics_jsonl_callback(model, filename='metrics.jsonl'):
+    """
+    Appends one JSON line per epoch to <save_dir>/<filename> (next to results.csv).
+    The file is opened once per epoch, which costs nothing compared to an epoch.
+    """
+    def on_fit_epoch_end(trainer):
+        with open(Path(trainer.save_dir) / filename, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(epoch_record(trainer)) + '\n')
+
+    model.add_callback('on_fit_epoch_end', on_fit_epoch_end)
+    return on_fit_epoch_end
@@ -0,0 +1,161 @@
+"""
+Training step profiler: attributes each epoch's wall time to data loading, compute and validation.
+
+Registered as ultralytics trainer callbacks, it measures per epoch:
+    dataloader_wait  time the training loop waits for the next batch (incl. the first batch of the epoch)
+    compute          forward + loss + backward of every batch
+    optimizer        optimizer step, gradient clipping and EMA update
+    validation       the per-epoch validation run
+    checkpoint       saving last.pt / best.pt / periodic checkpoints
+    other            the rest (scheduler, metrics/CSV bookkeeping, plots, ...)
+
+On CUDA the GPU is synchronized at each boundary, otherwise asynchronous kernels would be billed to
+whatever happens to wait for them. Rows are written to profile.csv next to results.csv, and a
+bottleneck summary is printed (and saved as profile_summary.json) when training ends.
+"""
+
+import csv
+import json
+import time
+from pathlib import Path
+
+COLUMNS = ('dataloader_wait', 'compute', 'optimizer', 'validation', 'checkpoint', 'other')
+
+HINTS = {
+    'dataloader_wait': "data loading bound: raise workers, use the image shard cache (image_shards.py) or cache='ram'",
+    'compute': "compute bound: a larger batch, AMP, or a smaller imgsz/model reduce step time",
+    'optimizer': "optimizer bound: gradient accumulation (nbs) or fewer parameter groups reduce step overhead",
+    'validation': "validation bound: validate less often or on a subset",
+    'checkpoint': "checkpoint bound: raise save_period or save to a faster disk",
+    'other': "overhead outside the training steps dominates (plots, logging, scheduler)",
+}
+
+
+class TrainingProfiler:
+    """Collects per-epoch timings through trainer callbacks; see add_training_profiler."""
+
+    def __init__(self, sync_cuda=True, filename='profile.csv'):
+        self.sync_cuda = sync_cuda
+        self.filename = filename
+        self.rows = []
+        self._sync = False
+        self._current = dict.fromkeys(COLUMNS, 0.0)
+        self._epoch_start = self._last = self._batch_start = 0.0
+        self._batches = 0
+
+    def _now(self, trainer):
+        if self._sync:
+            import torch
+            torch.cuda.synchronize(trainer.device)
+        return time.perf_counter()
+
+    def _wrap(self, trainer, method_name, column):
+        """Times a trainer method by replacing it on the instance with a timed wrapper."""
+        original = getattr(trainer, method_name)
+
+        def timed(*args, **kwargs):
+            start = self._now(trainer)
+            try:
+                return original(*args, **kwargs)
+            finally:
+                self._current[column] += self._now(trainer) - start
+
+        setattr(trainer, method_name, timed)
+
+    def on_train_start(self, trainer):
+        self._sync = self.sync_cuda and getattr(trainer.device, 'type', 'cpu') == 'cuda'
+        self._wrap(trainer, 'optimizer_step', 'optimizer')
+        self._wrap(trainer, 'validate', 'validation')
+        self._wrap(trainer, 'save_model', 'checkpoint')
+
+    def on_train_epoch_start(self, trainer):
+        self._current = dict.fromkeys(COLUMNS, 0.0)
+        self._batches = 0
+        self._epoch_start = self._last = self._now(trainer)
+
+    def on_train_batch_start(self, trainer):
+        now = self._now(trainer)
+        self._current['dataloader_wait'] += now - self._last
+        self._batch_start = now
+
+    def on_train_batch_end(self, trainer):
+        now = self._now(trainer)
+        self._current['compute'] += now - self._batch_start
+        self._last = now
+        self._batches += 1
+
+    def on_fit_epoch_end(self, trainer):
+        total = self._now(trainer) - self._epoch_start
+        current = self._current
+        # The optimizer step runs inside the batch, so it was also counted as compute
+        current['compute'] -= current['optimizer']
+        current['other'] = max(0.0, total - sum(current[c] for c in COLUMNS if c != 'other'))
+        row = {'epoch': trainer.epoch + 1, 'batches': self._batches, 'epoch_seconds': round(total, 3)}
+        row.update({c: round(current[c], 3) for c in COLUMNS})
+        row['dataloader_wait_per_batch_ms'] = round(1000 * current['dataloader_wait'] / max(self._batches, 1), 2)
+        row['compute_per_batch_ms'] = round(1000 * current['compute'] / max(self._batches, 1), 2)
+        self.rows.append(row)
+
+        path = Path(trainer.save_dir) / self.filename
+        write_header = not path.exists()
+        with open(path, 'a', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=list(row))
+            if write_header:
+                writer.writeheader()
+            writer.writerow(row)
+
+    def summary(self):
+        """Totals and shares over all profiled epochs, plus the dominant component."""
+        if not self.rows:
+            return None
+        totals = {c: sum(r[c] for r in self.rows) for c in COLUMNS}
+        wall = sum(r['epoch_seconds'] for r in self.rows)
+        bottleneck = max(COLUMNS, key=totals.get)
+        return {
+            'epochs': len(self.rows),
+            'seconds': round(wall, 2),
+            'seconds_per_epoch': round(wall / len(self.rows), 2),
+            'totals': {c: round(v, 2) for c, v in totals.items()},
+            'shares': {c: round(v / wall, 3) if wall else 0.0 for c, v in totals.items()},
+            'bottleneck': bottleneck,
+            'hint': HINTS[bottleneck],
+        }
+
+    def on_train_end(self, trainer):
+        summary = self.summary()
+        if summary is None:
+            return
+        with open(Path(trainer.save_dir) / 'profile_summary.json', 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=2)
+        print_profile_summary(summary)
+
+
+def print_profile_summary(summary):
+    print("\n--- Training Time Profile ---")
+    print(f"{summary['epochs']} epochs, {summary['seconds_per_epoch']:.1f} s/epoch on average")
+    for column in COLUMNS:
+        print(f"  {column:<16} {summary['totals'][column]:>10.1f} s  {100 * summary['shares'][column]:5.1f}%")
+    print(f"Bottleneck: {summary['bottleneck']} -> {summary['hint']}")
+
+
+def add_training_profiler(model, sync_cuda=True, filename='profile.csv'):
+    """Registers a TrainingProfiler on a YOLO model (before model.train) and returns it."""
+    profiler = TrainingProfiler(sync_cuda=sync_cuda, filename=filename)
+    for event in ('on_train_start', 'on_train_epoch_start', 'on_train_batch_start', 'on_train_batch_end',
+                  'on_fit_epoch_end', 'on_train_end'):
+        model.add_callback(event, getattr(profiler, event))
+    return profiler
+
+
+def main():
+    # Smoke test on CPU with ultralytics' 8-image coco8 dataset (downloaded automatically)
+    from ultralytics import YOLO
+
+    model = YOLO("yolo11n.pt")
+    add_training_profiler(model)
+    model.train(data="coco8.yaml", epochs=2, imgsz=320, batch=4, device="cpu", workers=0, plots=False,
+                name="profiler_smoke_test")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""
+Sparse / subset validation schedule for training.
+
+With val=True ultralytics runs a full validation pass after every epoch. Early in a long run that is
+mostly wasted time: the model changes a lot between epochs and only the best epochs near the end decide
+best.pt. ValidationSchedule decides per epoch what to run instead:
+
+    full    the whole validation set (metrics and fitness decide best.pt and early stopping as usual)
+    subset  a fixed random subset of the validation set; its fitness is never compared with full
+            validation fitness, but a new best subset score triggers a full validation right away
+    skip    no validation (metrics of the previous validation are carried over)
+
+Full validation always runs on the final epoch and when early stopping is about to trigger; after the
+first skip_first epochs it also runs every full_every epochs and on every epoch after sparse_epochs. The subset is a random choice of whole
+validation batches (validation batches are grouped by aspect ratio), so it keeps the batch shapes of the
+full pass and is the same images every time, which keeps subset scores comparable between epochs.
+
+Use scheduled_validation_trainer() to add the schedule to DetectionTrainer or another trainer class
+such as ShardCachedTrainer, and pass the result as model.train(..., trainer=..., val=True).
+"""
+
+import numpy as np
+
+
+class ValidationSchedule:
+    """
+    Decides the validation kind for each epoch.
+
+    Args:
+        full_every: Full validation every N epochs (1 = every epoch, i.e. the default ultralytics behaviour).
+        subset_fraction: Share of the validation batches used on the epochs in between (0 = skip those epochs).
+        sparse_epochs: Epochs the sparse schedule applies to; afterwards every epoch is fully validated
+                       (None = the whole run).
+        skip_first: Epochs at the start that are not validated at all (scores rise on almost every
+                    early epoch, so subset new-bests there would trigger full validations constantly).
+        seed: Seed for choosing the subset.
+    """
+
+    def __init__(self, full_every=5, subset_fraction=0.25, sparse_epochs=None, skip_first=0, seed=0):
+        if full_every < 1:
+            raise ValueError("full_every must be >= 1")
+        if not 0 <= subset_fraction <= 1:
+            raise ValueError("subset_fraction must be in [0, 1]")
+        self.full_every = full_every
+        self.subset_fraction = subset_fraction
+        self.sparse_epochs = sparse_epochs
+        self.skip_first = skip_first
+        self.seed = seed
+
+    def kind(self, epoch, epochs, possible_stop=False):
+        """'full', 'subset' or 'skip' for the 0-based epoch of a run with `epochs` epochs."""
+        if epoch + 1 >= epochs or possible_stop:
+            return 'full'
+        if epoch < self.skip_first:
+            return 'skip'
+        if (epoch + 1) % self.full_every == 0:
+            return 'full'
+        if self.sparse_epochs is not None and epoch >= self.sparse_epochs:
+            return 'full'
+        if self.subset_fraction <= 0:
+            return 'skip'
+        return 'subset'
+
+    def subset_indices(self, batch_of_image):
+        """
+        Dataset indices of the subset: a seeded random choice of whole validation batches.
+        batch_of_image[i] is the batch image i belongs to (contiguous, as in rect validation datasets).
+        """
+        batch_of_image = np.asarray(batch_of_image)
+        batch_ids = np.unique(batch_of_image)
+        num = max(1, int(round(len(batch_ids) * self.subset_fraction)))
+        chosen = np.random.default_rng(self.seed).choice(batch_ids, size=num, replace=False)
+        return np.flatnonzero(np.isin(batch_of_image, chosen)).tolist()
+
+    def __repr__(self):
+        return (f"ValidationSchedule(full_every={self.full_every}, subset_fraction={self.subset_fraction}, "
+                f"sparse_epochs={self.sparse_epochs}, skip_first={self.skip_first}, seed={self.seed})")
+
+
+class ScheduledValidationMixin:
+    """
+    Trainer mixin overriding validate() with a ValidationSchedule (class attribute val_schedule).
+    Sets trainer.val_kind to the kind of validation that ran in the current epoch.
+    """
+
+    val_schedule = ValidationSchedule()
+    val_kind = None
+    _subset_loader = None
+    _best_subset_fitness = None
+
+    def _build_subset_loader(self):
+        from torch.utils.data import DataLoader
+
+        loader = self.test_loader
+        dataset = loader.dataset
+        batch_size = dataset.batch_size
+        if getattr(dataset, 'rect', False):
+            batch_of_image = dataset.batch
+        else:
+            batch_of_image = np.arange(len(dataset)) // batch_size
+        indices = self.val_schedule.subset_indices(batch_of_image)
+        print(f"Validation subset: {len(indices)} of {len(dataset)} images ({self.val_schedule})")
+        # Sorted indices of whole batches: loader batches line up with the dataset's rect batch shapes
+        return DataLoader(dataset, batch_size=batch_size, sampler=indices, num_workers=loader.num_workers,
+                          pin_memory=loader.pin_memory, collate_fn=getattr(dataset, 'collate_fn', None))
+
+    def _validate_subset(self):
+        if self._subset_loader is None:
+            self._subset_loader = self._build_subset_loader()
+        full_loader, best_fitness = self.validator.dataloader, self.best_fitness
+        self.validator.dataloader = self._subset_loader
+        try:
+            metrics, fitness = super().validate()
+        finally:
+            # Subset fitness must not compete with full-validation fitness for best.pt
+            self.validator.dataloader, self.best_fitness = full_loader, best_fitness
+        return metrics, fitness
+
+    def validate(self):
+        stopper = getattr(self, 'stopper', None)
+        kind = self.val_schedule.kind(self.epoch, self.epochs, getattr(stopper, 'possible_stop', False))
+        if kind == 'skip':
+            self.val_kind = 'skip'
+            print(f"Epoch {self.epoch + 1}: validation skipped (schedule)")
+            return self.metrics, None
+        if kind == 'subset':
+            metrics, fitness = self._validate_subset()
+            if fitness is not None and (self._best_subset_fitness is None or fitness > self._best_subset_fitness):
+                self._best_subset_fitness = fitness
+                print(f"Epoch {self.epoch + 1}: new best subset fitness {float(fitness):.5f}, running full validation")
+            else:
+                self.val_kind = 'subset'
+                # No fitness: best.pt and early stopping only consider full validations
+                return metrics, None
+        self.val_kind = 'full'
+        return super().validate()
+
+
+def scheduled_validation_trainer(base=None, **schedule):
+    """
+    Returns a trainer class (subclass of base, default DetectionTrainer) that validates according to
+    ValidationSchedule(**schedule), e.g. scheduled_validation_trainer(ShardCachedTrainer, full_every=5).
+    """
+    if base is None:
+        from ultralytics.models.yolo.detect import DetectionTrainer
+        base = DetectionTrainer
+    return type(f"ScheduledValidation{base.__name__}", (ScheduledValidationMixin, base),
+                {'val_schedule': ValidationSchedule(**schedule)})
+
+
+def main():
+    # Smoke test on CPU with ultralytics' 8-image coco8 dataset (downloaded automatically)
+    from ultralytics import YOLO
+
+    trainer = scheduled_validation_trainer(full_every=3, subset_fraction=0.5)
+    model = YOLO("yolo11n.pt")
+    model.train(data="coco8.yaml", trainer=trainer, epochs=4, imgsz=320, batch=4, device="cpu", workers=0,
+                plots=False, val=True, name="validation_schedule_smoke_test")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Direct access to the dataset archive (to_coco.zip) without extracting it first.
+
+Annotation JSON members are streamed through coco_stream, image sizes are read from the image
+headers of individual members, and images can be written straight into the YOLO layout.
+"""
+
+import io
+import os
+import shutil
+import threading
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from PIL import Image
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.tiff', '.webp')
+
+
+def find_member(zf, suffix):
+    """Returns the member name ending with suffix (e.g. 'annotations/instances_val2017.json'), or None."""
+    suffix = suffix.replace('\\', '/').lstrip('/')
+    for name in zf.namelist():
+        if name == suffix or name.endswith('/' + suffix):
+            return name
+    return None
+
+
+def image_members(zf, split_dir):
+    """All image members inside a directory named split_dir (e.g. 'val2017'), wherever it sits in the archive."""
+    marker = split_dir.strip('/') + '/'
+    return [info for info in zf.infolist()
+            if not info.is_dir()
+            and (info.filename.startswith(marker) or '/' + marker in info.filename)
+            and info.filename.lower().endswith(IMAGE_EXTENSIONS)]
+
+
+def open_text_member(zf, member):
+    """Opens a member as a UTF-8 text stream (decompressed on the fly, nothing written to disk)."""
+    return io.TextIOWrapper(zf.open(member), encoding='utf-8')
+
+
+def member_fingerprint(zf, member):
+    """Cheap content fingerprint from the archive directory (CRC-32 and size), no decompression needed."""
+    info = zf.getinfo(member)
+    return f"zip-crc32:{info.CRC:08x}:{info.file_size}"
+
+
+def probe_image_size(fileobj):
+    """Reads (width, height) from the image header only; PIL does not decode pixels until asked."""
+    with Image.open(fileobj) as img:
+        return img.size
+
+
+def _member_mtime(info):
+    return time.mktime(info.date_time + (0, 0, -1))
+
+
+def extract_images(zip_path, split_dir, dst_dir, num_workers=8):
+    """
+    Writes the images of one split straight from the archive into dst_dir (flat, by base name).
+
+    Images already present with the same size and modification time are skipped, so reruns only
+    extract what is new or changed. Each worker thread reads through its own ZipFile handle.
+
+    Returns:
+        dict: {'extracted': n, 'skipped': n, 'failed': n}
+    """
+    os.makedirs(dst_dir, exist_ok=True)
+    local = threading.local()
+    handles = []
+
+    def extract_one(info):
+        dst = os.path.join(dst_dir, os.path.basename(info.filename))
+        mtime = _member_mtime(info)
+        try:
+            st = os.stat(dst)
+            if st.st_size == info.file_size and int(st.st_mtime) == int(mtime):
+                return 'skipped'
+        except OSError:
+            pass
+        if not hasattr(local, 'zf'):
+            local.zf = zipfile.ZipFile(zip_path)
+            handles.append(local.zf)
+        tmp = dst + '.tmp'
+        with local.zf.open(info) as src, open(tmp, 'wb') as out:
+            shutil.copyfileobj(src, out, 1 << 20)
+        os.utime(tmp, (mtime, mtime))
+        os.replace(tmp, dst)
+        return 'extracted'
+
+    with zipfile.ZipFile(zip_path) as zf:
+        members = image_members(zf, split_dir)
+
+    counts = {'extracted': 0, 'skipped': 0, 'failed': 0}
+    try:
+        with ThreadPoolExecutor(max_workers=num_workers) as pool:
+            futures = {pool.submit(extract_one, info): info for info in members}
+            for future in as_completed(futures):
+                try:
+                    counts[future.result()] += 1
+                except (OSError, zipfile.BadZipFile) as e:
+                    print(f"Warning: Failed to extract {futures[future].filename}: {e}")
+                    counts['failed'] += 1
+    finally:
+        for zf in handles:
+            zf.close()
+    return counts